@@ -1,24 +1,208 @@
 # database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from schema import Base  # ORM Base
 from schema import PaymentOrderORM  # noqa: F401 ensure model import
 import os
-from dotenv import load_dotenv
-
-load_dotenv(os.path.join(os.path.dirname(__file__), './config', '.env'))
+import settings  # noqa: F401 .env 로드
+from services.pool_metrics import PoolMetrics
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-print(DATABASE_URL)
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 기동 시 없는 테이블 생성 여부 (기존 테이블은 그대로 - 스키마를 마이그레이션으로 관리하는 배포에서만 false)
+DB_CREATE_SCHEMA = os.getenv("DB_CREATE_SCHEMA", "true").lower() == "true"
+
+# 동기 드라이버 -> 같은 DB의 비동기 드라이버
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mariadb": "mariadb+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """DATABASE_URL을 비동기 드라이버 URL로 변환 (mysql+pymysql -> mysql+aiomysql 등)"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None or parsed.drivername == driver:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+# 비동기 라우트용 URL (지정하지 않으면 DATABASE_URL에서 변환)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# 커넥션 풀 설정 (엔진별 적용 - 워커 수 x (POOL_SIZE + MAX_OVERFLOW) x 2 가 DB max_connections 이내가 되도록)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# MariaDB wait_timeout(기본 8시간)보다 짧게 연결 재생성
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+
+def _pool_options(url: str, base_pool, metrics: PoolMetrics) -> dict:
+    """계측 풀 클래스와 크기/재사용 설정 (메모리 SQLite는 단일 연결 풀 그대로 사용)"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": metrics.pool_class(base_pool),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# 엔진은 init_engines()에서 처음 필요할 때 생성 (import 시 드라이버 로드/DB 연결 없음)
+# 동기 엔진: 스레드에서 실행되는 백그라운드 작업(미터링 반영, 헬스 점검)용
+engine = None
+# 비동기 엔진: async 라우트/서비스용 (이벤트 루프를 막지 않음)
+async_engine = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def init_engines() -> None:
+    """동기/비동기 엔진 생성 및 세션 팩토리 바인딩 (최초 1회)"""
+    global engine, async_engine
+    if engine is not None:
+        return
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL이 설정되지 않았습니다.")
+    async_url = ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+
+    sync_engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL, QueuePool, sync_pool_metrics))
+    sync_pool_metrics.attach(sync_engine.pool)
+    new_async_engine = create_async_engine(
+        async_url, **_pool_options(async_url, AsyncAdaptedQueuePool, async_pool_metrics)
+    )
+    async_pool_metrics.attach(new_async_engine.sync_engine.pool)
+
+    SessionLocal.configure(bind=sync_engine)
+    AsyncSessionLocal.configure(bind=new_async_engine)
+    engine, async_engine = sync_engine, new_async_engine
+
+
+def get_engine():
+    init_engines()
+    return engine
+
 
-# 테이블 생성
-Base.metadata.create_all(bind=engine)
+def get_async_engine():
+    init_engines()
+    return async_engine
+
+
+def create_schema() -> None:
+    """ORM 모델 기준 테이블 생성 (없는 테이블만)"""
+    Base.metadata.create_all(bind=get_engine())
+
+
+async def dispose_engines() -> None:
+    """풀의 연결 종료 (앱 종료 시)"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
 
 def get_db():
+    init_engines()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    init_engines()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_pool_metrics() -> dict:
+    """엔진별 풀 설정과 계측 지표"""
+    return {
+        "config": {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+        },
+        "engines": {
+            metrics.name: metrics.snapshot() for metrics in (sync_pool_metrics, async_pool_metrics)
+        },
+    }
+
+
+if __name__ == "__main__":
+    # 느린 쿼리 중 이벤트 루프 지연 비교 (동기 Session vs AsyncSession): python database.py
+    import asyncio
+    import tempfile
+    import time
+
+    from sqlalchemy import event, text
+
+    QUERY_SECONDS = 1.5
+    CONCURRENT_QUERIES = 4
+    TICK_SECONDS = 0.01
+
+    def _register_sleep(dbapi_connection, _record):
+        # SELECT sleep(ms) - SQLite에서 느린 쿼리 재현
+        dbapi_connection.create_function("sleep", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+    async def _ticker(stop: asyncio.Event, lags: list) -> None:
+        """SSE 스트림 대신 TICK_SECONDS마다 깨어나는 태스크 - 예정보다 늦게 깨어난 시간이 루프 지연"""
+        while not stop.is_set():
+            expected = time.perf_counter() + TICK_SECONDS
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(time.perf_counter() - expected)
+
+    async def _run(label: str, query) -> None:
+        stop, lags = asyncio.Event(), []
+        ticker = asyncio.create_task(_ticker(stop, lags))
+        started = time.perf_counter()
+        await asyncio.gather(*(query() for _ in range(CONCURRENT_QUERIES)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await ticker
+        print(f"{label}: 최대 루프 지연 {max(lags) * 1000:,.1f}ms, {elapsed:.1f}초 동안 틱 {len(lags)}회")
+
+    async def _bench(path: str) -> None:
+        url = f"sqlite:///{path}"
+        sync_engine = create_engine(url, poolclass=QueuePool, pool_size=CONCURRENT_QUERIES)
+        bench_async_engine = create_async_engine(
+            to_async_url(url), poolclass=AsyncAdaptedQueuePool, pool_size=CONCURRENT_QUERIES
+        )
+        event.listen(sync_engine, "connect", _register_sleep)
+        event.listen(bench_async_engine.sync_engine, "connect", _register_sleep)
+        sync_sessions = sessionmaker(bind=sync_engine)
+        async_sessions = async_sessionmaker(bind=bench_async_engine)
+        slow_query = text(f"SELECT sleep({QUERY_SECONDS * 1000:.0f})")
+
+        async def sync_route():
+            # 변경 전 async 라우트: 동기 Session 쿼리가 끝날 때까지 루프가 멈춤
+            with sync_sessions() as db:
+                db.execute(slow_query)
+
+        async def async_route():
+            async with async_sessions() as db:
+                await db.execute(slow_query)
+
+        try:
+            await _run("동기 Session", sync_route)
+            await _run("AsyncSession", async_route)
+        finally:
+            await bench_async_engine.dispose()
+            sync_engine.dispose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_bench(os.path.join(tmp, "bench.db")))
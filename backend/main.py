@@ -1,12 +1,35 @@
+import asyncio
+from contextlib import asynccontextmanager
+import settings  # noqa: F401 .env 로드 (프로세스당 한 번)
+from services.startup_report import ROUTER_MODULES, STARTUP_PROFILE_IMPORTS, startup_report
+if STARTUP_PROFILE_IMPORTS:
+    startup_report.enable_import_profiling()
 from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from routers import payments, monitoring, auth, proxy_and_waf_automation
-from dotenv import load_dotenv
 
-load_dotenv(os.path.join(os.path.dirname(__file__), 'config', '.env'))
+# 라우터 모듈 import (모듈별 소요 시간 기록)
+payments, monitoring, auth, proxy_and_waf_automation = (
+    startup_report.timed_import(module_name) for module_name in ROUTER_MODULES
+)
+
+from services.monitor_stream import monitor_event_stream
+from services.usage_metering_service import usage_meter
+from services.log_analytics_service import log_analytics_service
+from services.rate_detection_service import rate_detection_service
+from services.log_search_service import log_search_service
+from services.monitoring_service import MonitoringService
+from services.health_service import health_prober
+from services.session_service import session_service
+from services.payment_queue import payment_queue
+from services.user_cache import user_cache
+from services.jwt_service import get_jwt_service
+from services.google_auth_service import GoogleJWKS
+from services.toss_client import TossClient
+from services.proxy_and_waf_service import waf_service
+from database import DB_CREATE_SCHEMA, create_schema, dispose_engines, get_pool_metrics, init_engines
 
 # 환경변수에서 직접 설정 로드
 DEBUG = os.getenv("DEBUG")
@@ -14,11 +37,53 @@ HOST = os.getenv("HOST")
 PORT = int(os.getenv("PORT"))
 CORS_ORIGINS = os.getenv("CORS_ORIGINS").split(",")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """기동 시 DB 엔진과 백그라운드 작업 초기화, 종료 시 역순 정리"""
+    with startup_report.step("database"):
+        init_engines()
+    if DB_CREATE_SCHEMA:
+        with startup_report.step("schema"):
+            await asyncio.to_thread(create_schema)
+
+    # 모니터 이벤트 스트림 소비 및 처리 단계 시작
+    with startup_report.step("stream_pipeline"):
+        monitor_event_stream.add_stage(usage_meter.record)
+        monitor_event_stream.add_stage(log_analytics_service.record)
+        monitor_event_stream.add_stage(rate_detection_service.record)
+        monitor_event_stream.add_stage(log_search_service.record)
+        usage_meter.start()
+        log_analytics_service.start()
+        monitor_event_stream.start()
+    with startup_report.step("health_prober"):
+        health_prober.start()
+    session_service.start()
+    payment_queue.start()
+    startup_report.mark_ready()
+    startup_report.print_summary()
+    # 기동 완료 후 무거운 SDK를 스레드에서 로드 (기동 시간/이벤트 루프에 영향 없음)
+    waf_service.start_warm_up()
+
+    yield
+
+    # 스트림 소비 중단 후 남은 사용량 반영
+    await monitor_event_stream.stop()
+    await usage_meter.stop()
+    await log_analytics_service.stop()
+    await health_prober.stop()
+    await session_service.stop()
+    await payment_queue.stop()
+    await MonitoringService.aclose()
+    await GoogleJWKS.aclose()
+    await TossClient.aclose()
+    await dispose_engines()
+
 # FastAPI 앱 초기화
 app = FastAPI(
     title="KST Project API", 
     version="1.0.0",
-    description="토스 페이먼츠와 WAF 자동화 시스템"
+    description="토스 페이먼츠와 WAF 자동화 시스템",
+    lifespan=lifespan
 )
 
 # CORS 미들웨어 설정
@@ -40,6 +105,32 @@ app.include_router(proxy_and_waf_automation.router, prefix="/api/waf", tags=["wa
 app.include_router(monitoring.router, prefix="/api/monitoring", tags=["monitoring"])
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 
+@app.get("/health")
+async def health():
+    """캐시된 의존성 헬스 문서 (로드밸런서 폴링용 - 정상/일부 장애 200, 그 외 503)"""
+    report = health_prober.report()
+    status_code = 200 if report.status in ("healthy", "degraded") else 503
+    return JSONResponse(status_code=status_code, content=report.dict())
+
+@app.get("/metrics/db-pool")
+async def db_pool_metrics():
+    """DB 커넥션 풀 지표 (체크아웃 대기 히스토그램, 사용 중 연결 수, 오버플로, 연결 수명)"""
+    return get_pool_metrics()
+
+@app.get("/metrics/sessions")
+async def session_metrics():
+    """세션 지표 (유효 세션 수, 만료/제거 누계, 로컬 캐시 크기)"""
+    return {
+        **await session_service.metrics(),
+        "user_cache": user_cache.snapshot(),
+        "jwt_verify_cache": get_jwt_service().cache_stats(),
+    }
+
+@app.get("/metrics/startup")
+async def startup_metrics():
+    """기동 소요 시간 (모듈별 import, 초기화 단계별)"""
+    return startup_report.to_dict()
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """메인 페이지 반환 - React 앱"""
@@ -0,0 +1,138 @@
+import sys
+from typing import Any, Dict, Optional
+
+from models.monitoring import LogItem, TrafficData
+
+# traffic 딕셔너리를 튜플로 보관할 때의 필드 순서
+TRAFFIC_FIELDS = tuple(TrafficData.model_fields)
+_TRAFFIC_FIELD_SET = frozenset(TRAFFIC_FIELDS)
+
+_STR_FIELDS = (
+    "timestamp", "client_ip", "host", "uri", "method", "proxy_target", "waf_action",
+    "user_agent", "request_id", "rule_id", "log_type", "received_at", "source",
+)
+# 값의 종류가 적어 인턴하면 레코드 간에 공유되는 필드
+_INTERNED_FIELDS = frozenset(("host", "method", "proxy_target", "waf_action", "rule_id", "log_type", "source"))
+_KNOWN_FIELDS = frozenset(_STR_FIELDS) | {"status", "traffic"}
+
+
+def _as_str(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+class LogRecord:
+    """프로세스 내부 로그 버퍼용 경량 레코드 (API 응답 시에만 LogItem으로 변환)"""
+
+    __slots__ = _STR_FIELDS + ("status", "_traffic", "_extra")
+
+    def __init__(self):
+        for name in _STR_FIELDS:
+            setattr(self, name, None)
+        self.status: Optional[int] = None
+        # 알려진 traffic 필드는 TRAFFIC_FIELDS 순서의 튜플, 그 외 키가 있으면 원본 딕셔너리
+        self._traffic = None
+        # LogItem의 추가 필드 (extra="allow")
+        self._extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "LogRecord":
+        """모니터 서버 로그 이벤트 payload에서 생성 (pydantic 검증 생략)"""
+        record = cls()
+        for name in _STR_FIELDS:
+            value = _as_str(payload.get(name))
+            if value is not None and name in _INTERNED_FIELDS:
+                value = sys.intern(value)
+            setattr(record, name, value)
+
+        status = payload.get("status")
+        if status is not None:
+            try:
+                record.status = int(status)
+            except (TypeError, ValueError):
+                record.status = None
+
+        traffic = payload.get("traffic")
+        if isinstance(traffic, dict) and traffic:
+            if _TRAFFIC_FIELD_SET.issuperset(traffic):
+                record._traffic = tuple(traffic.get(name) for name in TRAFFIC_FIELDS)
+            else:
+                record._traffic = dict(traffic)
+
+        extra = {k: v for k, v in payload.items() if k not in _KNOWN_FIELDS}
+        if extra:
+            record._extra = extra
+        return record
+
+    @classmethod
+    def from_log_item(cls, log: LogItem) -> "LogRecord":
+        """LogItem에서 생성"""
+        return cls.from_payload(log.dict())
+
+    @property
+    def traffic(self) -> Optional[Dict[str, Any]]:
+        """traffic 딕셔너리 (None 값 필드 제외)"""
+        if self._traffic is None:
+            return None
+        if isinstance(self._traffic, dict):
+            return self._traffic
+        return {name: value for name, value in zip(TRAFFIC_FIELDS, self._traffic) if value is not None}
+
+    def __getattr__(self, name: str) -> Any:
+        # 추가 필드 접근 (예: 레거시 'domain')
+        extra = object.__getattribute__(self, "_extra")
+        if extra is not None and name in extra:
+            return extra[name]
+        raise AttributeError(name)
+
+    def to_log_item(self) -> LogItem:
+        """API 응답용 LogItem으로 변환"""
+        data: Dict[str, Any] = {name: getattr(self, name) for name in _STR_FIELDS}
+        data["status"] = self.status
+        data["traffic"] = self.traffic
+        if self._extra:
+            data.update(self._extra)
+        return LogItem(**data)
+
+
+if __name__ == "__main__":
+    # 버퍼 메모리/생성 처리량 비교: python -m models.log_record
+    import json
+    import time
+    import tracemalloc
+
+    events = 20000
+    raw_events = [
+        json.dumps({
+            "timestamp": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "client_ip": f"203.0.113.{i % 250}",
+            "host": f"site{i % 20}.example.com",
+            "uri": f"/api/v1/items/{i % 500}?page={i % 7}",
+            "method": ("GET", "POST")[i % 2],
+            "status": (200, 403, 404)[i % 3],
+            "proxy_target": "http://127.0.0.1:8080",
+            "waf_action": ("pass", "block")[i % 2],
+            "user_agent": f"Mozilla/5.0 (bench {i % 30})",
+            "request_id": f"req-{i:08d}",
+            "rule_id": str(942100 + i % 10),
+            "log_type": "access",
+            "traffic": {"request_size": 512, "response_size": 2048 + i % 100, "total_bytes": 2560 + i % 100},
+        })
+        for i in range(events)
+    ]
+    # 스트림 처리와 같이 디코딩한 payload의 문자열을 레코드가 공유
+    payloads = [json.loads(raw) for raw in raw_events]
+
+    for label, build in (("LogItem", lambda p: LogItem(**p)), ("LogRecord", LogRecord.from_payload)):
+        started = time.perf_counter()
+        buffered = [build(payload) for payload in payloads]
+        elapsed = time.perf_counter() - started
+        del buffered
+        # 메모리는 처리량과 따로 측정 (tracemalloc 추적 비용이 시간에 섞이지 않도록)
+        tracemalloc.start()
+        buffered = [build(payload) for payload in payloads]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del buffered
+        print(f"{label}: 이벤트당 {size / events:,.0f} bytes, {events / elapsed:,.0f} events/s")
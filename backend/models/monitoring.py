@@ -28,6 +28,12 @@ class LogItem(BaseModel):
     class Config:
         extra = "allow"  # 추가 필드 허용
 
+class LogSearchResponse(BaseModel):
+    """최근 로그 색인 검색 결과"""
+    count: int
+    took_ms: float
+    logs: List[LogItem]
+
 class TrafficData(BaseModel):
     """트래픽 상세 데이터"""
     request_size: Optional[int] = None
@@ -75,6 +81,34 @@ class TrafficSummary(BaseModel):
     bytes: int
     mb: float
 
+class DomainUsageSnapshot(BaseModel):
+    """실시간 미터링 기반 현재 결제 주기 사용량"""
+    domain: str
+    period_start: str
+    period_end: str
+    requests: int
+    bytes: int
+    traffic_gb: float
+    points: int
+    projected_points: int
+
+class TopKItem(BaseModel):
+    """상위 K 항목 (근사 빈도)"""
+    value: str
+    count: int
+    error: int = 0
+
+class DomainAnalytics(BaseModel):
+    """스트리밍 스케치 기반 도메인 근사 분석"""
+    domain: str
+    window: str
+    window_start: str
+    events: int
+    unique_client_ips: int
+    top_uris: List[TopKItem] = []
+    top_user_agents: List[TopKItem] = []
+    top_rule_ids: List[TopKItem] = []
+
 class DomainTrafficStats(BaseModel):
     """도메인별 트래픽 통계"""
     domain: str
@@ -128,12 +162,37 @@ class DomainStatsResponse(BaseModel):
 
 class SSEEvent(BaseModel):
     """SSE 이벤트 모델"""
-    type: str  # "log", "traffic", "system_traffic", "error"
+    type: str  # "log", "traffic", "system_traffic", "error", "alert"
     payload: Any
 
+class AttackAlert(BaseModel):
+    """요청률/차단율 급증 알림 (SSE "alert" 이벤트 payload)"""
+    domain: str
+    kind: str  # "rate_spike", "block_surge", "error_surge", "ip_rate"
+    client_ip: Optional[str] = None
+    value: float
+    threshold: float
+    window_seconds: int
+    detected_at: str
+
 class MonitoringHealthResponse(BaseModel):
     """모니터링 서버 헬스 체크 응답"""
     status: str
     monitor_server: str
     response: Optional[Dict[str, Any]] = None
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+    shards: Optional[Dict[str, Any]] = None
+
+class ComponentHealth(BaseModel):
+    """의존성 구성 요소 하나의 최근 점검 결과"""
+    status: str  # "healthy", "degraded", "unhealthy", "skipped"
+    latency_ms: Optional[float] = None
+    checked_at: Optional[str] = None
+    error: Optional[str] = None
+    detail: Optional[Dict[str, Any]] = None
+
+class HealthReport(BaseModel):
+    """백그라운드 점검 결과를 모은 헬스 문서"""
+    status: str  # "starting", "healthy", "degraded", "unhealthy", "stale"
+    checked_at: Optional[str] = None
+    components: Dict[str, ComponentHealth] = {}
\ No newline at end of file
@@ -1,11 +1,11 @@
 # routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlalchemy.orm import Session
-from services.google_auth_service import GoogleAuthService
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.google_auth_service import google_auth_service
 from services.session_service import session_service
 from services.session_auth import get_current_user_by_session, get_current_session_id
 from schema.user import User
-from database import get_db
+from database import get_async_db
 from pydantic import BaseModel
 
 router = APIRouter()  # 내부 prefix 제거
@@ -26,21 +26,19 @@ class SessionValidationResponse(BaseModel):
 @router.post("/google/login", response_model=LoginResponse)
 async def google_login(
     request: GoogleLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Google 로그인"""
     try:
         
         # Google 토큰 검증
-        google_auth = GoogleAuthService()
-        
-        google_data = await google_auth.verify_google_token(request.id_token)
+        google_data = await google_auth_service.verify_google_token(request.id_token)
         
         # 사용자 조회 또는 생성
-        user = await google_auth.get_or_create_user(db, google_data)
+        user = await google_auth_service.get_or_create_user(db, google_data)
         
         # 세션 생성
-        session_id = session_service.create_session(
+        session_id = await session_service.create_session(
             user_id=user.id,
             email=user.email,
             name=user.name,
@@ -48,7 +46,7 @@ async def google_login(
         )
         
         # 세션 정보 조회
-        session = session_service.validate_session(session_id)
+        session = await session_service.validate_session(session_id)
         
         response = LoginResponse(
             session_id=session_id,
@@ -63,6 +61,8 @@ async def google_login(
         
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -74,7 +74,7 @@ async def logout(
     """로그아웃"""
     try:
         # 세션 삭제
-        deleted = session_service.delete_session(session_id)
+        deleted = await session_service.delete_session(session_id)
         if deleted:
             return {"message": "로그아웃되었습니다"}
         else:
@@ -88,7 +88,7 @@ async def validate_session(
 ):
     """세션 유효성 검증"""
     try:
-        session = session_service.validate_session(session_id)
+        session = await session_service.validate_session(session_id)
         if session:
             return SessionValidationResponse(
                 valid=True,
@@ -116,9 +116,9 @@ async def refresh_session(
 ):
     """세션 갱신"""
     try:
-        new_session_id = session_service.refresh_session(session_id)
+        new_session_id = await session_service.refresh_session(session_id)
         if new_session_id:
-            session = session_service.validate_session(new_session_id)
+            session = await session_service.validate_session(new_session_id)
             return {
                 "session_id": new_session_id,
                 "expires_at": session["expires_at"]
@@ -128,6 +128,40 @@ async def refresh_session(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/sessions")
+async def list_sessions(
+    session_id: str = Depends(get_current_session_id)
+):
+    """현재 사용자의 활성 세션 목록 (다른 세션 ID는 노출하지 않음)"""
+    session = await session_service.validate_session(session_id)
+    if not session:
+        raise HTTPException(status_code=401, detail="유효하지 않거나 만료된 세션입니다")
+    sessions = await session_service.get_user_sessions(session["user_id"])
+    return {
+        "sessions": [
+            {
+                "created_at": s["created_at"],
+                "expires_at": s["expires_at"],
+                "current": s["session_id"] == session_id
+            }
+            for s in sorted(sessions, key=lambda s: s["created_at"])
+        ]
+    }
+
+@router.post("/logout-all")
+async def logout_all(
+    session_id: str = Depends(get_current_session_id)
+):
+    """모든 기기에서 로그아웃 (현재 사용자의 세션 전체 삭제)"""
+    session = await session_service.validate_session(session_id)
+    if not session:
+        raise HTTPException(status_code=401, detail="유효하지 않거나 만료된 세션입니다")
+    try:
+        revoked = await session_service.revoke_user_sessions(session["user_id"])
+        return {"message": "모든 기기에서 로그아웃되었습니다", "revoked": revoked}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/me")
 async def get_current_user(current_user: User = Depends(get_current_user_by_session)):
     """현재 사용자 정보 조회"""
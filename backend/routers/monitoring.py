@@ -2,29 +2,54 @@ from fastapi import APIRouter, Request, HTTPException, Query, Depends
 from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from services.monitoring_service import MonitoringService
+from services.usage_metering_service import usage_meter
+from services.log_analytics_service import log_analytics_service, WINDOWS, TOP_FIELDS
+from services.rate_detection_service import rate_detection_service
+from services.monitor_stream import monitor_event_stream
+from services.log_search_service import log_search_service
+from services.health_service import health_prober
 from models.monitoring import (
     LogItem, DomainInfo, TrafficStats, DomainTrafficStats, 
-    DomainStatsResponse, MonitoringHealthResponse, DomainBillingInfo, DomainBillingSummary
+    DomainStatsResponse, MonitoringHealthResponse, DomainBillingInfo, DomainBillingSummary,
+    DomainUsageSnapshot, DomainAnalytics, TopKItem, AttackAlert, LogSearchResponse
 )
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from schema.user import UserDomain
 from services.session_auth import get_current_user_by_session
 import logging
 from datetime import datetime
 import json
+import time
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+async def _get_owned_domain(db: AsyncSession, user_id: str, domain: str) -> UserDomain:
+    """사용자가 소유한 (삭제되지 않은) 도메인 조회 - 없으면 403"""
+    user_domain = await db.scalar(select(UserDomain).where(
+        UserDomain.user_id == user_id,
+        UserDomain.domain == domain,
+        UserDomain.deleted_at == None
+    ))
+    
+    if not user_domain:
+        raise HTTPException(status_code=403, detail=f"도메인 '{domain}'을 소유하지 않습니다.")
+    
+    return user_domain
+
 @router.get("/health", response_model=MonitoringHealthResponse)
 async def health_check():
-    """모니터링 서버 연결 상태 확인"""
+    """모니터링 서버 연결 상태 확인 (백그라운드 점검 결과 캐시, 첫 점검 전에는 직접 확인)"""
+    cached = health_prober.get_component("monitor")
+    if cached is not None:
+        return cached.detail
     return await MonitoringService.health_check()
 
 @router.get("/domains", response_model=List[DomainInfo])
-async def get_managed_domains(current_user = Depends(get_current_user_by_session), db: Session = Depends(get_db)):
+async def get_managed_domains(current_user = Depends(get_current_user_by_session), db: AsyncSession = Depends(get_async_db)):
     """관리 중인 도메인 목록 조회 - 로그인 사용자 소유만 표시 (결제 예정 금액 포함)"""
     try:
         # 인증된 사용자 확인
@@ -34,10 +59,10 @@ async def get_managed_domains(current_user = Depends(get_current_user_by_session
         
         logger.info(f"사용자 {current_user.id}의 도메인 목록 조회 시작")
         
-        rows = db.query(UserDomain).filter(
+        rows = (await db.scalars(select(UserDomain).where(
             UserDomain.user_id == current_user.id, 
             UserDomain.deleted_at == None
-        ).all()
+        ))).all()
         
         logger.info(f"사용자 {current_user.id}의 도메인 수: {len(rows)}")
         
@@ -77,6 +102,41 @@ async def get_all_logs(n: int = Query(20, description="조회할 로그 개수")
     """전체 최근 로그 조회"""
     return await MonitoringService.get_all_logs(count=n)
 
+@router.get("/logs/search", response_model=LogSearchResponse)
+async def search_logs(
+    domain: Optional[str] = Query(None, description="도메인 (미지정 시 소유한 도메인 전체)"),
+    client_ip: Optional[str] = Query(None, description="클라이언트 IP"),
+    uri_prefix: Optional[str] = Query(None, description="URI 경로 접두사 (예: /api/v1)"),
+    status: Optional[int] = Query(None, description="응답 상태 코드"),
+    method: Optional[str] = Query(None, description="HTTP 메서드"),
+    rule_id: Optional[str] = Query(None, description="WAF 룰 ID"),
+    since: Optional[int] = Query(None, ge=1, description="최근 N초 이내 로그만"),
+    limit: int = Query(100, ge=1, le=1000, description="최대 결과 수"),
+    current_user = Depends(get_current_user_by_session), 
+    db: AsyncSession = Depends(get_async_db)
+):
+    """최근 로그 검색 - 이벤트 스트림으로 유지되는 도메인별 역색인 사용 (최신순, 로그인 사용자 소유 도메인만)"""
+    if domain:
+        domains = [(await _get_owned_domain(db, current_user.id, domain)).domain]
+    else:
+        domains = (await db.scalars(select(UserDomain.domain).where(
+            UserDomain.user_id == current_user.id,
+            UserDomain.deleted_at == None
+        ))).all()
+    started = time.perf_counter()
+    logs = log_search_service.search(
+        domains=domains,
+        client_ip=client_ip,
+        uri_prefix=uri_prefix,
+        status=status,
+        method=method,
+        rule_id=rule_id,
+        since_seconds=since,
+        limit=limit
+    )
+    took_ms = (time.perf_counter() - started) * 1000
+    return LogSearchResponse(count=len(logs), took_ms=round(took_ms, 3), logs=logs)
+
 @router.get("/logs/{domain}", response_model=List[LogItem])
 async def get_domain_logs(
     domain: str, 
@@ -96,7 +156,7 @@ async def get_domain_stats(domain: str):
 @router.get("/traffic/summary", response_model=List[DomainTrafficStats])
 async def get_traffic_summary(
     current_user = Depends(get_current_user_by_session), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """사용자별 트래픽 요약 조회 - 사용자가 소유한 도메인만"""
     try:
@@ -108,10 +168,10 @@ async def get_traffic_summary(
         print(f"사용자 {current_user.id}의 트래픽 요약 조회 시작")
         
         # 현재 사용자가 소유한 도메인 목록 조회
-        user_domains = db.query(UserDomain).filter(
+        user_domains = (await db.scalars(select(UserDomain).where(
             UserDomain.user_id == current_user.id,
             UserDomain.deleted_at == None
-        ).all()
+        ))).all()
         
         print(f"사용자 {current_user.id}의 도메인 수: {len(user_domains)}")
         
@@ -185,7 +245,7 @@ async def get_domain_traffic(
 @router.get("/billing/summary", response_model=List[DomainBillingSummary])
 async def get_billing_summary(
     current_user = Depends(get_current_user_by_session), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """사용자별 도메인별 결제 예정 금액 요약 조회 - 사용자가 소유한 도메인만"""
     try:
@@ -197,10 +257,10 @@ async def get_billing_summary(
         print(f"사용자 {current_user.id}의 결제 예정 금액 요약 조회 시작")
         
         # 현재 사용자가 소유한 도메인 목록 조회
-        user_domains = db.query(UserDomain).filter(
+        user_domains = (await db.scalars(select(UserDomain).where(
             UserDomain.user_id == current_user.id,
             UserDomain.deleted_at == None
-        ).all()
+        ))).all()
         
         print(f"사용자 {current_user.id}의 도메인 수: {len(user_domains)}")
         
@@ -237,7 +297,7 @@ async def get_billing_summary(
 async def get_domain_billing_info(
     domain: str,
     current_user = Depends(get_current_user_by_session), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """특정 도메인의 결제 예정 상세 정보 조회"""
     try:
@@ -249,11 +309,11 @@ async def get_domain_billing_info(
         print(f"사용자 {current_user.id}의 도메인 '{domain}' 결제 예정 상세 정보 조회 시작")
         
         # 현재 사용자가 소유한 도메인인지 확인
-        user_domain = db.query(UserDomain).filter(
+        user_domain = await db.scalar(select(UserDomain).where(
             UserDomain.user_id == current_user.id,
             UserDomain.domain == domain,
             UserDomain.deleted_at == None
-        ).first()
+        ))
         
         if not user_domain:
             print(f"사용자 {current_user.id}는 도메인 '{domain}'을 소유하지 않습니다.")
@@ -279,10 +339,73 @@ async def get_domain_billing_info(
         print(f"도메인 결제 예정 상세 정보 조회 실패: {e}")
         raise HTTPException(status_code=500, detail="도메인 결제 예정 상세 정보 조회 중 오류가 발생했습니다.")
 
+@router.get("/usage/{domain}", response_model=DomainUsageSnapshot)
+async def get_domain_usage(
+    domain: str,
+    current_user = Depends(get_current_user_by_session), 
+    db: AsyncSession = Depends(get_async_db)
+):
+    """실시간 미터링 기반 현재 결제 주기 사용량 및 예상 포인트 조회 (원격 조회 없음)"""
+    user_domain = await _get_owned_domain(db, current_user.id, domain)
+    
+    if not user_domain.created_at or not user_domain.billing_date:
+        raise HTTPException(status_code=404, detail=f"도메인 '{domain}'의 결제 주기 정보가 없습니다.")
+    
+    return usage_meter.get_period_snapshot(
+        domain=domain,
+        created_at=user_domain.created_at,
+        billing_date=user_domain.billing_date
+    )
+
+@router.get("/analytics/{domain}", response_model=DomainAnalytics)
+async def get_domain_analytics(
+    domain: str,
+    window: str = Query("day", description="집계 윈도우 (hour, day)"),
+    k: int = Query(20, ge=1, le=100, description="상위 항목 개수"),
+    current_user = Depends(get_current_user_by_session), 
+    db: AsyncSession = Depends(get_async_db)
+):
+    """도메인 근사 분석 조회 - 고유 클라이언트 IP 수, 상위 URI/User-Agent/룰"""
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"지원되지 않는 윈도우입니다. 사용 가능한 윈도우: {list(WINDOWS)}")
+    
+    await _get_owned_domain(db, current_user.id, domain)
+    return log_analytics_service.get_analytics(domain, window=window, k=k)
+
+@router.get("/analytics/{domain}/top/{field}", response_model=List[TopKItem])
+async def get_domain_top_items(
+    domain: str,
+    field: str,
+    window: str = Query("hour", description="집계 윈도우 (hour, day)"),
+    k: int = Query(20, ge=1, le=100, description="상위 항목 개수"),
+    current_user = Depends(get_current_user_by_session), 
+    db: AsyncSession = Depends(get_async_db)
+):
+    """도메인의 특정 필드(uri, user_agent, rule_id) 상위 K 항목 조회"""
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"지원되지 않는 윈도우입니다. 사용 가능한 윈도우: {list(WINDOWS)}")
+    if field not in TOP_FIELDS:
+        raise HTTPException(status_code=400, detail=f"지원되지 않는 필드입니다. 사용 가능한 필드: {list(TOP_FIELDS)}")
+    
+    await _get_owned_domain(db, current_user.id, domain)
+    return log_analytics_service.get_top(domain, field, window=window, k=k)
+
+@router.get("/alerts/{domain}", response_model=List[AttackAlert])
+async def get_domain_alerts(
+    domain: str,
+    current_user = Depends(get_current_user_by_session), 
+    db: AsyncSession = Depends(get_async_db)
+):
+    """도메인의 최근 공격 의심 알림 조회 (최신순)"""
+    await _get_owned_domain(db, current_user.id, domain)
+    return rate_detection_service.get_recent_alerts(domain)
+
 @router.get("/events")
 async def sse_events(request: Request):
-    """전체 도메인 실시간 이벤트 스트림 (SSE) - 향상된 버전"""
-    event_gen = MonitoringService.enhanced_event_generator(request)
+    """전체 도메인 실시간 이벤트 스트림 (SSE) - 향상된 버전 (알림 이벤트 포함)"""
+    event_gen = monitor_event_stream.merge_local_events(
+        request, MonitoringService.enhanced_event_generator(request)
+    )
     headers = {
         "Cache-Control": "no-cache",
         "Content-Type": "text/event-stream",
@@ -293,8 +416,10 @@ async def sse_events(request: Request):
 
 @router.get("/events/{domain}")
 async def sse_domain_events(request: Request, domain: str):
-    """특정 도메인 실시간 이벤트 스트림 (SSE) - 향상된 버전"""
-    event_gen = MonitoringService.enhanced_event_generator(request, domain=domain)
+    """특정 도메인 실시간 이벤트 스트림 (SSE) - 향상된 버전 (알림 이벤트 포함)"""
+    event_gen = monitor_event_stream.merge_local_events(
+        request, MonitoringService.enhanced_event_generator(request, domain=domain), domain=domain
+    )
     headers = {
         "Cache-Control": "no-cache",
         "Content-Type": "text/event-stream", 
@@ -1,18 +1,24 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
-from fastapi.responses import RedirectResponse
+import csv
+import io
+from typing import Optional
 
-from schema.payment import PaymentPrepareRequest, PaymentPrepareResponse, UserBalance, DeductPointsRequest
-from services.payment_service import payment_service
-from services.session_auth import get_current_user_by_session
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, HTTPException, Request, Depends, Header, Query
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+from schema.payment import PaymentPrepareRequest, PaymentPrepareResponse, UserBalance, DeductPointsRequest, PaymentHistoryPage
+from services.payment_service import PaymentConfirmError, payment_service
+from services.payment_queue import PaymentKeyConflictError, payment_queue
+from services.session_auth import get_current_admin_user, get_current_user_by_session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 
 # 라우터 생성
 router = APIRouter()
 
-"""결제 성공 페이지 - 결제 승인 후 React 앱으로 리다이렉트"""
+"""결제 성공 페이지 - 승인 작업을 큐에 넣고 바로 React 앱으로 리다이렉트 (승인/충전은 워커가 처리)"""
 @router.get("/success")
-async def payment_success(request: Request, db: Session = Depends(get_db)):
+async def payment_success(request: Request, db: AsyncSession = Depends(get_async_db)):
     # URL 파라미터 추출
     payment_key = request.query_params.get('paymentKey')
     order_id = request.query_params.get('orderId')
@@ -22,14 +28,19 @@ async def payment_success(request: Request, db: Session = Depends(get_db)):
         return RedirectResponse(url="http://localhost:5173/", status_code=302)
     
     try:
-        # 결제 승인 처리
-        success = await payment_service.confirm_payment(db, payment_key, order_id, int(amount))
+        # 결제 승인 작업 등록 (토스 응답을 기다리지 않음, 주문 금액/상태가 맞지 않으면 거부)
+        await payment_queue.enqueue(db, payment_key, order_id, int(amount))
             
+    except PaymentKeyConflictError as e:
+        # 먼저 등록된 결제 키를 유지 - 다른 키로 온 리다이렉트는 리다이렉트하지 않고 거부
+        raise HTTPException(status_code=409, detail=str(e))
+    except PaymentConfirmError as e:
+        print(f"결제 승인 작업 등록 거부: {e}")
     except Exception as e:
         import traceback
         print(f"스택 트레이스: {traceback.format_exc()}")
     
-    # 결과와 상관없이 React 앱으로 리다이렉트
+    # 결제 키 충돌 외에는 결과와 상관없이 React 앱으로 리다이렉트
     return RedirectResponse(url="http://localhost:5173/", status_code=302)
 
 """결제 실패 페이지 - React 앱으로 리다이렉트"""
@@ -39,7 +50,7 @@ async def payment_fail():
 
 """결제 준비"""
 @router.post("/payment/prepare", response_model=PaymentPrepareResponse)
-async def prepare_payment(request: PaymentPrepareRequest, current_user = Depends(get_current_user_by_session), db: Session = Depends(get_db)):
+async def prepare_payment(request: PaymentPrepareRequest, current_user = Depends(get_current_user_by_session), db: AsyncSession = Depends(get_async_db)):
     try:
         result = await payment_service.prepare_payment(db, current_user.id, request)
         return result
@@ -48,19 +59,10 @@ async def prepare_payment(request: PaymentPrepareRequest, current_user = Depends
 
 """사용자 포인트 잔액 조회"""
 @router.get("/user/balance", response_model=UserBalance)
-async def get_user_balance(current_user = Depends(get_current_user_by_session), db: Session = Depends(get_db)):
+async def get_user_balance(current_user = Depends(get_current_user_by_session), db: AsyncSession = Depends(get_async_db)):
     try:
         # remaining_points가 None인지 확인
-        if current_user.remaining_points is None:
-            # 데이터베이스에서 직접 업데이트
-            from sqlalchemy import text
-            update_query = text("UPDATE users SET remaining_points = 0 WHERE id = :user_id")
-            db.execute(update_query, {"user_id": current_user.id})
-            db.commit()
-            
-            # 세션에서 사용자 객체를 새로고침
-            db.refresh(current_user)
-        
+        # (None 보정은 get_user_balance에서 DB 값 기준으로 처리 - current_user는 캐시된 값일 수 있음)
         result = await payment_service.get_user_balance(db, current_user.id)
         
         return result
@@ -69,20 +71,57 @@ async def get_user_balance(current_user = Depends(get_current_user_by_session),
         import traceback
         raise HTTPException(status_code=500, detail=str(e))
 
+"""사용자 결제 내역 조회 (최신순, nextCursor를 cursor로 넘기면 다음 페이지)"""
+@router.get("/user/payment-history", response_model=PaymentHistoryPage)
+async def get_payment_history(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user = Depends(get_current_user_by_session),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        return await payment_service.get_payment_history(db, current_user.id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="잘못된 cursor입니다.")
+
+"""사용자 결제 내역 CSV 내보내기 (페이지 단위로 읽어 바로 전송 - 전체를 메모리에 모으지 않음)"""
+@router.get("/user/payment-history/export")
+async def export_payment_history(current_user = Depends(get_current_user_by_session)):
+    user_id = current_user.id
+    
+    async def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM: 엑셀에서 한글 주문명이 깨지지 않도록
+        writer.writerow(["\ufefforderId", "orderName", "amount", "status", "createdAt", "approvedAt", "paymentKey"])
+        async for order in payment_service.stream_payment_history(user_id):
+            writer.writerow([order.orderId, order.orderName, order.amount, order.status, order.createdAt, order.approvedAt, order.paymentKey])
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    return StreamingResponse(
+        generate_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="payment_history.csv"'}
+    )
+
 @router.get("/debug/payment-status/{order_id}")
-async def debug_payment_status(order_id: str, db: Session = Depends(get_db)):
+async def debug_payment_status(order_id: str, db: AsyncSession = Depends(get_async_db)):
     """결제 상태 디버깅용 엔드포인트"""
     try:
         from schema.payment_db import PaymentOrderORM
         from schema.user import User
         
         # 주문 정보 조회
-        order = db.query(PaymentOrderORM).filter(PaymentOrderORM.order_id == order_id).first()
+        order = await db.scalar(select(PaymentOrderORM).where(PaymentOrderORM.order_id == order_id))
         if not order:
             return {"error": "주문을 찾을 수 없습니다", "order_id": order_id}
         
         # 사용자 정보 조회
-        user = db.query(User).filter(User.id == order.user_id).first()
+        user = await db.scalar(select(User).where(User.id == order.user_id))
         
         return {
             "order_id": order_id,
@@ -98,12 +137,12 @@ async def debug_payment_status(order_id: str, db: Session = Depends(get_db)):
         return {"error": str(e)}
 
 @router.get("/debug/user-points/{user_id}")
-async def debug_user_points(user_id: str, db: Session = Depends(get_db)):
+async def debug_user_points(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """사용자 포인트 디버깅용 엔드포인트"""
     try:
         from schema.user import User
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.scalar(select(User).where(User.id == user_id))
         if not user:
             return {"error": "사용자를 찾을 수 없습니다", "user_id": user_id}
         
@@ -120,31 +159,41 @@ async def debug_user_points(user_id: str, db: Session = Depends(get_db)):
         return {"error": str(e)}
 
 @router.post("/user/deduct-points")
-async def deduct_points(request: DeductPointsRequest, current_user = Depends(get_current_user_by_session), db: Session = Depends(get_db)):
+async def deduct_points(
+    request: DeductPointsRequest,
+    current_user = Depends(get_current_user_by_session),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=128)
+):
+    """포인트 차감 (같은 Idempotency-Key로 재시도하면 한 번만 차감)"""
+    if request.amount <= 0:
+        raise HTTPException(status_code=400, detail="차감할 포인트는 0보다 커야 합니다.")
     try:
-        ok = await payment_service.deduct_user_points(db, current_user.id, request.amount)
+        key = f"deduct:{current_user.id}:{idempotency_key}" if idempotency_key else None
+        ok = await payment_service.deduct_user_points(db, current_user.id, request.amount, idempotency_key=key)
         if not ok:
             raise HTTPException(status_code=400, detail="포인트가 부족합니다.")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"포인트 차감 중 오류: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/admin/manual-add-points")
-async def manual_add_points(user_id: str, amount: int, db: Session = Depends(get_db)):
-    """관리자용 수동 포인트 충전 엔드포인트"""
+@router.post("/admin/manual-add-points", dependencies=[Depends(get_current_admin_user)])
+async def manual_add_points(user_id: str, amount: int, idempotency_key: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    """관리자용 수동 포인트 충전 엔드포인트 (idempotency_key를 주면 같은 키로는 한 번만 충전)"""
     try:
         print(f"수동 포인트 충전 요청: user_id={user_id}, amount={amount}")
-        await payment_service.add_user_points(db, user_id, amount)
-        
-        # 업데이트된 사용자 정보 조회
-        from schema.user import User
-        user = db.query(User).filter(User.id == user_id).first()
+        current_points = await payment_service.add_user_points(
+            db, user_id, amount, reason="manual",
+            idempotency_key=f"manual:{idempotency_key}" if idempotency_key else None
+        )
         
         return {
             "success": True,
             "message": f"포인트 충전 완료: {amount}원",
             "user_id": user_id,
-            "current_points": user.remaining_points if user else 0
+            "current_points": current_points
         }
     except Exception as e:
         print(f"수동 포인트 충전 실패: {str(e)}")
@@ -153,32 +202,33 @@ async def manual_add_points(user_id: str, amount: int, db: Session = Depends(get
             "error": str(e)
         }
 
-@router.get("/admin/check-payment/{order_id}")
-async def check_payment_status(order_id: str, db: Session = Depends(get_db)):
+@router.get("/admin/check-payment/{order_id}", dependencies=[Depends(get_current_admin_user)])
+async def check_payment_status(order_id: str, db: AsyncSession = Depends(get_async_db)):
     """결제 상태 확인 및 수동 처리 엔드포인트"""
     try:
         from schema.payment_db import PaymentOrderORM
         from schema.user import User
         
         # 주문 정보 조회
-        order = db.query(PaymentOrderORM).filter(PaymentOrderORM.order_id == order_id).first()
+        order = await db.scalar(select(PaymentOrderORM).where(PaymentOrderORM.order_id == order_id))
         if not order:
             return {"error": "주문을 찾을 수 없습니다", "order_id": order_id}
         
         # 사용자 정보 조회
-        user = db.query(User).filter(User.id == order.user_id).first()
+        user = await db.scalar(select(User).where(User.id == order.user_id))
         
         # 결제가 성공했지만 포인트가 충전되지 않은 경우 수동 처리
         if order.status == "DONE" and user and user.remaining_points is None:
             print(f"결제 성공했지만 포인트가 None인 경우 수동 처리: {order_id}")
-            user.remaining_points = order.amount
-            db.commit()
+            current_points = await payment_service.add_user_points(
+                db, order.user_id, order.amount, idempotency_key=f"order:{order_id}", reference=order_id
+            )
             return {
                 "message": "포인트 수동 충전 완료",
                 "order_id": order_id,
                 "amount": order.amount,
                 "user_id": order.user_id,
-                "current_points": user.remaining_points
+                "current_points": current_points
             }
         
         return {
@@ -194,14 +244,14 @@ async def check_payment_status(order_id: str, db: Session = Depends(get_db)):
     except Exception as e:
         return {"error": str(e)}
 
-@router.post("/admin/recover-failed-payment/{order_id}")
-async def recover_failed_payment(order_id: str, db: Session = Depends(get_db)):
+@router.post("/admin/recover-failed-payment/{order_id}", dependencies=[Depends(get_current_admin_user)])
+async def recover_failed_payment(order_id: str, db: AsyncSession = Depends(get_async_db)):
     """실패한 결제를 복구하는 관리자 엔드포인트"""
     try:
         from schema.payment_db import PaymentOrderORM
         
         # 주문 정보 조회
-        order = db.query(PaymentOrderORM).filter(PaymentOrderORM.order_id == order_id).first()
+        order = await db.scalar(select(PaymentOrderORM).where(PaymentOrderORM.order_id == order_id))
         if not order:
             return {"error": "주문을 찾을 수 없습니다", "order_id": order_id}
         
@@ -209,20 +259,29 @@ async def recover_failed_payment(order_id: str, db: Session = Depends(get_db)):
             return {"error": "이 주문은 실패 상태가 아닙니다", "status": order.status}
         
         print(f"실패한 결제 복구 시작: {order_id}")
+        # 충전 중 원장 키 충돌이면 롤백으로 order 속성이 만료되므로 필요한 값은 미리 복사
+        user_id, amount = order.user_id, order.amount
         
-        # 포인트 충전 시도
-        await payment_service.add_user_points(db, order.user_id, order.amount)
+        # 포인트 충전 시도 (승인 때 이미 충전된 주문이면 원장 키로 걸러져 중복 충전되지 않음)
+        await payment_service.add_user_points(
+            db, user_id, amount, idempotency_key=f"order:{order_id}", reference=order_id
+        )
         
-        # 주문 상태를 DONE으로 변경
-        order.status = "DONE"
-        db.commit()
+        # 주문 상태를 DONE으로 변경 (아직 FAILED일 때만)
+        await db.execute(
+            update(PaymentOrderORM)
+            .where(PaymentOrderORM.order_id == order_id, PaymentOrderORM.status == "FAILED")
+            .values(status="DONE")
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
         
         return {
             "success": True,
-            "message": f"결제 복구 완료: {order.amount}원",
+            "message": f"결제 복구 완료: {amount}원",
             "order_id": order_id,
-            "user_id": order.user_id,
-            "amount": order.amount
+            "user_id": user_id,
+            "amount": amount
         }
     except Exception as e:
         print(f"결제 복구 실패: {str(e)}")
@@ -231,13 +290,18 @@ async def recover_failed_payment(order_id: str, db: Session = Depends(get_db)):
             "error": str(e)
         }
 
-@router.get("/admin/list-failed-payments")
-async def list_failed_payments(db: Session = Depends(get_db)):
-    """실패한 결제 목록을 조회하는 관리자 엔드포인트"""
+@router.get("/admin/list-failed-payments", dependencies=[Depends(get_current_admin_user)])
+async def list_failed_payments(limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_async_db)):
+    """실패한 결제 목록을 조회하는 관리자 엔드포인트 (최신순, (status, created_at) 인덱스 사용)"""
     try:
         from schema.payment_db import PaymentOrderORM
         
-        failed_orders = db.query(PaymentOrderORM).filter(PaymentOrderORM.status == "FAILED").all()
+        failed_orders = (await db.scalars(
+            select(PaymentOrderORM)
+            .where(PaymentOrderORM.status == "FAILED")
+            .order_by(PaymentOrderORM.created_at.desc())
+            .limit(limit)
+        )).all()
         
         return {
             "failed_orders": [
@@ -254,3 +318,26 @@ async def list_failed_payments(db: Session = Depends(get_db)):
         }
     except Exception as e:
         return {"error": str(e)}
+
+@router.get("/admin/payment-jobs", dependencies=[Depends(get_current_admin_user)])
+async def list_payment_jobs(limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    """결제 승인 큐 상태와 재시도를 포기한(DEAD) 작업 목록을 조회하는 관리자 엔드포인트"""
+    try:
+        return {
+            "counts": await payment_queue.counts(db),
+            "workers": payment_queue.snapshot(),
+            "confirmations": payment_service.confirm_stats(),
+            "dead_jobs": await payment_queue.list_dead(db, limit)
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+@router.post("/admin/payment-jobs/{job_id}/retry", dependencies=[Depends(get_current_admin_user)])
+async def retry_payment_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """DEAD 결제 승인 작업을 다시 대기열에 넣는 관리자 엔드포인트"""
+    try:
+        if not await payment_queue.retry(db, job_id):
+            return {"success": False, "error": "DEAD 상태의 작업을 찾을 수 없습니다", "job_id": job_id}
+        return {"success": True, "message": "승인 작업을 다시 대기열에 넣었습니다", "job_id": job_id}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
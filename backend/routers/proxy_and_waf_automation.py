@@ -6,8 +6,9 @@ import logging
 from models.proxy_and_waf import SubdomainRegisterRequest, SubdomainUnregisterRequest, WAFResponse
 from services.proxy_and_waf_service import waf_service
 from services.session_auth import get_current_user_by_session
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from schema.user import UserDomain
 from datetime import datetime, timedelta
 
@@ -19,7 +20,7 @@ router = APIRouter()
 # === 프록시/WAF 관리 API ===
 
 @router.post("/register", response_model=WAFResponse)
-async def register_subdomain(request: SubdomainRegisterRequest, current_user = Depends(get_current_user_by_session), db: Session = Depends(get_db)):
+async def register_subdomain(request: SubdomainRegisterRequest, current_user = Depends(get_current_user_by_session), db: AsyncSession = Depends(get_async_db)):
     """서브도메인을 Cloudflare에 등록하고 WAF 서버에 등록 요청 + DB 기록"""
     try:
         result = await waf_service.register_subdomain(request)
@@ -37,22 +38,22 @@ async def register_subdomain(request: SubdomainRegisterRequest, current_user = D
             deleted_at=None,
         )
         db.add(record)
-        db.commit()
+        await db.commit()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/unregister", response_model=WAFResponse)
-async def unregister_subdomain(request: SubdomainUnregisterRequest, current_user = Depends(get_current_user_by_session), db: Session = Depends(get_db)):
+async def unregister_subdomain(request: SubdomainUnregisterRequest, current_user = Depends(get_current_user_by_session), db: AsyncSession = Depends(get_async_db)):
     """Cloudflare에서 서브도메인을 삭제하고 WAF 서버에 삭제 요청"""
     try:
         result = await waf_service.unregister_subdomain(request)
         # DB 업데이트: 해당 도메인 삭제일 기록
         full_domain = f"{request.subdomain}.{waf_service.base_domain}"
-        row = db.query(UserDomain).filter(UserDomain.user_id == current_user.id, UserDomain.domain == full_domain, UserDomain.deleted_at == None).first()
+        row = await db.scalar(select(UserDomain).where(UserDomain.user_id == current_user.id, UserDomain.domain == full_domain, UserDomain.deleted_at == None))
         if row:
             row.deleted_at = datetime.now()
-            db.commit()
+            await db.commit()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
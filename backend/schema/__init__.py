@@ -1,17 +1,28 @@
 from schema.user import Base, User, UserDomain  # re-export for convenience
 from schema.payment_db import PaymentOrderORM  # ensure model is imported
-from schema.payment import PaymentPrepareRequest, PaymentPrepareResponse, UserBalance, DeductPointsRequest, PaymentOrder
+from schema.usage_db import DomainUsageORM, UsageWriterLeaseORM  # ensure model is imported
+from schema.session_db import SessionORM, SessionRevocationORM  # ensure model is imported
+from schema.point_ledger_db import PointLedgerORM  # ensure model is imported
+from schema.payment_job_db import PaymentConfirmJobORM  # ensure model is imported
+from schema.payment import PaymentPrepareRequest, PaymentPrepareResponse, UserBalance, DeductPointsRequest, PaymentOrder, PaymentHistoryPage
 
 __all__ = [
     "Base",
     "User",
     "UserDomain",
     "PaymentOrderORM",
+    "DomainUsageORM",
+    "UsageWriterLeaseORM",
+    "SessionORM",
+    "SessionRevocationORM",
+    "PointLedgerORM",
+    "PaymentConfirmJobORM",
     "PaymentPrepareRequest",
     "PaymentPrepareResponse", 
     "UserBalance",
     "DeductPointsRequest",
     "PaymentOrder",
+    "PaymentHistoryPage",
 ]
 
 
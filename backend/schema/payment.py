@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class PaymentPrepareRequest(BaseModel):
     amount: int
@@ -20,6 +20,10 @@ class PaymentOrder(BaseModel):
     paymentKey: Optional[str] = None
     approvedAt: Optional[str] = None
 
+class PaymentHistoryPage(BaseModel):
+    items: List[PaymentOrder]
+    nextCursor: Optional[str] = None  # 다음 페이지 요청 시 cursor로 전달 (없으면 마지막 페이지)
+
 class UserBalance(BaseModel):
     balance: int = 0  # 기본값 0으로 설정
 
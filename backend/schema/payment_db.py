@@ -1,10 +1,16 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from datetime import datetime
 from schema.user import Base
 
 
 class PaymentOrderORM(Base):
     __tablename__ = "payment_orders"
+    __table_args__ = (
+        # 사용자별 결제 내역 키셋 페이지네이션 (user_id 일치 + created_at, id 역순)
+        Index("ix_payment_orders_user_created_id", "user_id", "created_at", "id"),
+        # 관리자 상태별 조회 (FAILED 목록 등)
+        Index("ix_payment_orders_status_created", "status", "created_at"),
+    )
 
     id = Column(String(36), primary_key=True)
     user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, Index
+from datetime import datetime
+from schema.user import Base
+
+
+class PaymentConfirmJobORM(Base):
+    """결제 승인 작업 큐 (성공 리다이렉트는 작업만 넣고, 워커가 토스 승인과 포인트 충전을 처리)
+
+    status: PENDING(대기) -> RUNNING(처리 중, locked_until까지 점유) -> DONE / DEAD(재시도 포기, 관리자 확인 대상)
+    """
+    __tablename__ = "payment_confirm_jobs"
+    __table_args__ = (
+        Index("ix_payment_confirm_jobs_status_next_run_at", "status", "next_run_at"),
+    )
+
+    id = Column(String(36), primary_key=True)
+    order_id = Column(String(64), unique=True, nullable=False)  # 주문당 작업 1개
+    payment_key = Column(String(128), nullable=False)
+    amount = Column(Integer, nullable=False)
+    status = Column(String(16), nullable=False, default="PENDING")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_run_at = Column(DateTime, nullable=False)
+    locked_until = Column(DateTime, nullable=True)  # 워커가 죽으면 이 시각 이후 다른 워커가 다시 가져감
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
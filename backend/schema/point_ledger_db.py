@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from datetime import datetime
+from schema.user import Base
+
+
+class PointLedgerORM(Base):
+    """포인트 증감 원장 (추가만 하고 수정/삭제하지 않음 - users.remaining_points 변경과 같은 트랜잭션에 기록)"""
+    __tablename__ = "point_ledger"
+
+    id = Column(String(36), primary_key=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    delta = Column(Integer, nullable=False)  # 충전은 양수, 차감은 음수
+    balance_after = Column(Integer, nullable=False)
+    reason = Column(String(32), nullable=False)  # charge, deduct, refund, manual
+    reference = Column(String(128), nullable=True)  # 주문 ID 등
+    idempotency_key = Column(String(191), unique=True, nullable=True)  # 같은 키로는 한 번만 반영
+    created_at = Column(DateTime, default=datetime.utcnow)
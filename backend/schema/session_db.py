@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Text, DateTime
+from datetime import datetime
+from schema.user import Base
+
+
+class SessionORM(Base):
+    """로그인 세션 (SESSION_STORE=database 일 때 워커 간 공유 저장소)"""
+    __tablename__ = "user_sessions"
+
+    session_id = Column(String(64), primary_key=True)
+    user_id = Column(String(36), nullable=False, index=True)
+    data = Column(Text, nullable=False)  # 세션 정보 JSON
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SessionRevocationORM(Base):
+    """폐기된 서명 세션 토큰 (SESSION_TOKEN_MODE=signed, 워커 간 폐기 전파용)"""
+    __tablename__ = "session_revocations"
+
+    revocation_key = Column(String(96), primary_key=True)  # 토큰 ID 또는 user:<user_id>
+    revoked_at = Column(DateTime, nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)  # 이후에는 기록 불필요
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Date, DateTime, UniqueConstraint
+from datetime import datetime
+from schema.user import Base
+
+
+class DomainUsageORM(Base):
+    """도메인별 일 단위 사용량 (실시간 미터링 결과 적재)"""
+    __tablename__ = "domain_usage"
+    __table_args__ = (
+        UniqueConstraint("domain", "usage_date", name="uq_domain_usage_domain_date"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    domain = Column(String(255), nullable=False, index=True)
+    usage_date = Column(Date, nullable=False)
+    request_count = Column(BigInteger, default=0, nullable=False)
+    total_bytes = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class UsageWriterLeaseORM(Base):
+    """사용량 DB 반영 담당 워커 점유 (여러 워커가 같은 스트림을 소비해도 한 워커만 반영)"""
+    __tablename__ = "usage_writer_leases"
+
+    name = Column(String(64), primary_key=True)
+    holder = Column(String(128), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
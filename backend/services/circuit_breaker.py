@@ -0,0 +1,131 @@
+# services/circuit_breaker.py
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(HTTPException):
+    """회로가 열려 원격 호출 없이 즉시 실패 (503 + Retry-After)"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"'{name}' 연결이 일시적으로 차단되었습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+        self.name = name
+
+
+class CircuitBreaker:
+    """최근 호출 결과(오류율, 지연) 기반 회로 차단기 - closed -> open -> half_open -> closed"""
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 50,
+        min_calls: int = 10,
+        failure_ratio: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        slow_call_ratio: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_ratio = slow_call_ratio
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        # (성공 여부, 지연 시간) 최근 호출 기록
+        self._calls: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """호출 허용 여부 (half_open 상태에서는 제한된 수의 시험 호출만 허용)"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def check(self) -> None:
+        """호출 허용되지 않으면 CircuitOpenError"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def release(self) -> None:
+        """결과 없이 끝난 호출(취소 등)의 시험 호출 슬롯 반환"""
+        if self._state == HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+        print(f"회로 차단기 열림: {self.name}")
+
+    def record_success(self, latency: float) -> None:
+        if self._state == HALF_OPEN:
+            # 시험 호출 성공 -> 정상 복귀
+            self._state = CLOSED
+            self._calls.clear()
+            print(f"회로 차단기 닫힘: {self.name}")
+        self._calls.append((True, latency))
+        self._evaluate()
+
+    def record_failure(self, latency: float) -> None:
+        if self._state == HALF_OPEN:
+            self._open()
+            return
+        self._calls.append((False, latency))
+        self._evaluate()
+
+    def _evaluate(self) -> None:
+        if self._state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        total = len(self._calls)
+        failures = sum(1 for ok, _ in self._calls if not ok)
+        slow = sum(1 for _, latency in self._calls if latency >= self.slow_call_seconds)
+        if failures / total >= self.failure_ratio or slow / total >= self.slow_call_ratio:
+            self._open()
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """최근 성공 호출 지연 시간 백분위수 (표본 부족 시 None)"""
+        latencies = sorted(latency for ok, latency in self._calls if ok)
+        if len(latencies) < self.min_calls:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        return latencies[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = len(self._calls)
+        failures = sum(1 for ok, _ in self._calls if not ok)
+        return {
+            "state": self.state,
+            "recent_calls": total,
+            "failure_ratio": round(failures / total, 3) if total else 0.0,
+            "retry_after": round(self.retry_after(), 1) if self._state == OPEN else 0.0,
+        }
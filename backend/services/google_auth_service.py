@@ -1,97 +1,218 @@
+import asyncio
+import logging
 import os
+import re
+import time
 import httpx
 from fastapi import HTTPException
+from jose import JWTError, jwt
 from schema.user import User
-from sqlalchemy.orm import Session
+from sqlalchemy import case, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 from datetime import datetime
-from services.jwt_service import JWTService
+from typing import Dict, Optional
+from services.jwt_service import JWTService, get_jwt_service
+from services.user_cache import user_cache
 
-from dotenv import load_dotenv
+import settings  # noqa: F401 .env 로드
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+# Cache-Control max-age가 없을 때 JWKS 캐시 시간(초)
+GOOGLE_JWKS_DEFAULT_TTL = float(os.getenv("GOOGLE_JWKS_DEFAULT_TTL", "3600"))
+# 모르는 kid로 인한 JWKS 재조회 최소 간격(초) - 위조 토큰으로 Google을 반복 호출하지 않도록
+GOOGLE_JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("GOOGLE_JWKS_MIN_REFRESH_INTERVAL", "30"))
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+EMAIL_CONFLICT_DETAIL = "이미 다른 Google 계정에 연결된 이메일입니다"
+# 인증 경로 공유 HTTP 클라이언트 연결 풀 크기
+AUTH_HTTP_MAX_CONNECTIONS = int(os.getenv("AUTH_HTTP_MAX_CONNECTIONS", "20"))
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleJWKS:
+    """Google 서명 공개키(JWKS) 메모리 캐시
+
+    Cache-Control max-age 동안 재사용하고, 키 교체로 모르는 kid가 오면 즉시 다시 가져옴
+    """
+
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def _http(cls) -> httpx.AsyncClient:
+        """인증 경로 공유 클라이언트 (연결 재사용)"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(
+                    max_connections=AUTH_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=AUTH_HTTP_MAX_CONNECTIONS,
+                ),
+            )
+        return cls._client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """공유 클라이언트 종료 (앱 종료 시)"""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    def __init__(self, url: str = GOOGLE_JWKS_URL):
+        self.url = url
+        self._keys: Dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._attempted_at = 0.0
+        self._lock = asyncio.Lock()
+        self.fetches = 0
+
+    async def _fetch(self) -> None:
+        resp = await self._http().get(self.url)
+        resp.raise_for_status()
+        keys = {key["kid"]: key for key in resp.json().get("keys", []) if "kid" in key}
+        match = _MAX_AGE.search(resp.headers.get("cache-control", ""))
+        ttl = float(match.group(1)) if match else GOOGLE_JWKS_DEFAULT_TTL
+        self._keys = keys
+        self._expires_at = time.monotonic() + ttl
+        self.fetches += 1
+        logger.debug("Google JWKS 갱신: kid=%s, ttl=%ss", list(keys), ttl)
+
+    async def get_key(self, kid: str) -> Optional[dict]:
+        """kid에 해당하는 공개키 (캐시 만료 또는 모르는 kid면 재조회, 조회 실패 시 기존 키 유지)"""
+        now = time.monotonic()
+        if kid in self._keys and now < self._expires_at:
+            return self._keys[kid]
+        async with self._lock:
+            now = time.monotonic()
+            expired = now >= self._expires_at
+            unknown = kid not in self._keys and now - self._attempted_at >= GOOGLE_JWKS_MIN_REFRESH_INTERVAL
+            if expired or unknown:
+                self._attempted_at = now
+                try:
+                    await self._fetch()
+                except Exception as e:
+                    print(f"Google JWKS 조회 실패: {e}")
+                    if not self._keys:
+                        raise
+                    # 조회 실패 시 기존 키로 버티고 최소 간격 후 재시도
+                    self._expires_at = now + GOOGLE_JWKS_MIN_REFRESH_INTERVAL
+            return self._keys.get(kid)
 
-load_dotenv(os.path.join(os.path.dirname(__file__), '../config', '.env'))
 
 class GoogleAuthService:
-    def __init__(self):
-        print(f"DEBUG: ===== GoogleAuthService 초기화 시작 =====")
+    def __init__(self, jwks: Optional[GoogleJWKS] = None):
         self.client_id = os.getenv("GOOGLE_CLIENT_ID")
-        print(f"DEBUG: GOOGLE_CLIENT_ID: {self.client_id}")
         self.client_secret = os.getenv("GOOGLE_CLIENT_SECRET")
-        print(f"DEBUG: GOOGLE_CLIENT_SECRET: {self.client_secret[:10] if self.client_secret else 'None'}...")
-        self.jwt_service = JWTService()
-        print(f"DEBUG: JWTService 인스턴스: {self.jwt_service}")
-        print(f"DEBUG: ===== GoogleAuthService 초기화 완료 =====")
+        self.jwks = jwks or GoogleJWKS()
+
+    @property
+    def jwt_service(self) -> JWTService:
+        return get_jwt_service()
     
     async def verify_google_token(self, id_token: str) -> dict:
-        """Google ID 토큰 검증"""
+        """Google ID 토큰 검증 (캐시된 JWKS로 서명/aud/iss/exp를 로컬에서 확인)"""
         try:
-            print(f"DEBUG: ===== Google 토큰 검증 시작 =====")
-            print(f"DEBUG: 입력 id_token 길이: {len(id_token)}")
-            print(f"DEBUG: 입력 id_token 미리보기: {id_token[:50]}...")
-            print(f"DEBUG: Google API URL: https://oauth2.googleapis.com/tokeninfo?id_token={id_token[:30]}...")
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                print(f"DEBUG: HTTP 요청 시작")
-                resp = await client.get(
-                    f"https://oauth2.googleapis.com/tokeninfo?id_token={id_token}"
-                )
-                print(f"DEBUG: HTTP 응답 상태 코드: {resp.status_code}")
-                print(f"DEBUG: HTTP 응답 헤더: {dict(resp.headers)}")
-                
-                try:
-                    resp.raise_for_status()
-                    print(f"DEBUG: HTTP 응답 성공")
-                except httpx.HTTPStatusError as he:
-                    print(f"DEBUG: HTTP 응답 실패: {he}")
-                    detail = resp.text[:500]
-                    print(f"DEBUG: 응답 내용: {detail}")
-                    raise HTTPException(status_code=400, detail=f"Google tokeninfo HTTP {resp.status_code}: {detail}") from he
-                
-                data = resp.json()
-                print(f"DEBUG: Google API 응답 데이터: {data}")
-                
-                # 필수 필드 확인
-                aud = data.get("aud")
-                iss = data.get("iss")
-                email_verified = str(data.get("email_verified", "false")).lower() in ("true", "1")
-                
-                print(f"DEBUG: aud (client_id): {aud}")
-                print(f"DEBUG: iss (issuer): {iss}")
-                print(f"DEBUG: email_verified: {email_verified}")
-                print(f"DEBUG: 예상 client_id: {self.client_id}")
-                
-                if not aud:
-                    print("DEBUG: aud 필드 누락")
-                    raise HTTPException(status_code=400, detail="Token missing 'aud' claim")
-                if aud != self.client_id:
-                    print(f"DEBUG: client_id 불일치 - 예상: {self.client_id}, 실제: {aud}")
-                    raise HTTPException(status_code=400, detail=f"Invalid client ID (aud mismatch). expected={self.client_id}, got={aud}")
-                if iss not in ("https://accounts.google.com", "accounts.google.com"):
-                    print(f"DEBUG: issuer 불일치: {iss}")
-                    raise HTTPException(status_code=400, detail=f"Invalid issuer: {iss}")
-                if not email_verified:
-                    print("DEBUG: 이메일 미인증")
-                    raise HTTPException(status_code=400, detail="Email not verified on Google account")
-                
-                print(f"DEBUG: ===== Google 토큰 검증 성공 =====")
-                return data
-        except HTTPException:
-            print(f"DEBUG: HTTPException 발생 - 재발생")
-            raise
+            header = jwt.get_unverified_header(id_token)
+        except JWTError:
+            raise HTTPException(status_code=400, detail="Malformed Google ID token")
+        
+        kid = header.get("kid")
+        try:
+            key = await self.jwks.get_key(kid) if kid else None
         except Exception as e:
-            print(f"DEBUG: 예상치 못한 에러: {str(e)}")
-            print(f"DEBUG: 에러 타입: {type(e)}")
-            raise HTTPException(status_code=400, detail=f"Token verification failed: {str(e)}")
+            raise HTTPException(status_code=503, detail=f"Google signing keys unavailable: {e}")
+        if key is None:
+            logger.debug("Google ID 토큰 kid 불일치: %s", kid)
+            raise HTTPException(status_code=400, detail="Unknown Google signing key")
+        
+        try:
+            data = jwt.decode(
+                id_token,
+                key,
+                algorithms=[key.get("alg", "RS256")],
+                audience=self.client_id,
+                issuer=GOOGLE_ISSUERS,
+                options={"verify_at_hash": False},
+            )
+        except JWTError as e:
+            logger.debug("Google ID 토큰 검증 실패: %s", e)
+            raise HTTPException(status_code=400, detail=f"Token verification failed: {e}")
+        
+        if not data.get("email_verified"):
+            raise HTTPException(status_code=400, detail="Email not verified on Google account")
+        
+        return data
     
-    async def get_or_create_user(self, db: Session, google_data: dict) -> User:
-        """사용자 조회 또는 생성"""
+    @staticmethod
+    def _upsert_statement(dialect_name: str, values: dict, now: datetime):
+        """google_id 기준 INSERT, 이미 있으면 last_login만 갱신하는 단일 문장 (지원하지 않는 DB면 None)"""
+        if dialect_name in ("mysql", "mariadb"):
+            statement = mysql_insert(User).values(**values)
+            # email 유니크 충돌이면 다른 Google 계정의 행이 대상이 되므로, google_id가 같은 행만 갱신
+            return statement.on_duplicate_key_update(
+                last_login=case((User.google_id == statement.inserted.google_id, now), else_=User.last_login)
+            )
+        if dialect_name in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialect_name == "sqlite" else postgresql_insert
+            return insert(User).values(**values).on_conflict_do_update(
+                index_elements=[User.google_id],
+                set_={"last_login": now},
+            )
+        return None
+
+    async def get_or_create_user(self, db: AsyncSession, google_data: dict) -> User:
+        """사용자 조회 또는 생성 (upsert 1회 + 조회 1회, 커밋 1회)
+
+        이메일이 이미 다른 Google 계정에 연결되어 있으면 아무것도 반영하지 않고 409
+        """
+        try:
+            return await self._upsert_user(db, google_data)
+        except IntegrityError:
+            # SQLite/PostgreSQL의 ON CONFLICT(google_id)는 email 충돌을 처리하지 않고,
+            # 그 외 DB는 동시 최초 로그인으로 google_id가 먼저 생성됐을 수 있음
+            await db.rollback()
+            user = await db.scalar(select(User).where(User.google_id == google_data["sub"]))
+            if user is None:
+                raise HTTPException(status_code=409, detail=EMAIL_CONFLICT_DETAIL)
+            return user
+
+    async def _upsert_user(self, db: AsyncSession, google_data: dict) -> User:
+        now = datetime.utcnow()
+        statement = self._upsert_statement(db.get_bind().dialect.name, {
+            "id": str(uuid.uuid4()),
+            "email": google_data["email"],
+            "name": google_data.get("name", google_data.get("email", "")),
+            "picture": google_data.get("picture"),
+            "google_id": google_data["sub"],
+            "last_login": now,
+        }, now)
+        if statement is not None:
+            await db.execute(statement)
+            user = await db.scalar(
+                select(User).where(User.google_id == google_data["sub"]).execution_options(populate_existing=True)
+            )
+            if user is None:
+                # MySQL은 email 유니크 충돌에도 UPDATE로 처리되므로 다른 Google 계정이 쓰는 이메일이면 여기로 옴
+                await db.rollback()
+                raise HTTPException(status_code=409, detail=EMAIL_CONFLICT_DETAIL)
+            await db.commit()
+            user_cache.invalidate(user.id)
+            return user
+        
         # 기존 사용자 검색
-        user = db.query(User).filter(User.google_id == google_data["sub"]).first()
+        user = await db.scalar(select(User).where(User.google_id == google_data["sub"]))
         
         if user:
             # 마지막 로그인 시간 업데이트
             user.last_login = datetime.utcnow()
-            db.commit()
+            await db.commit()
+            user_cache.invalidate(user.id)
             return user
         
         # 새 사용자 생성
@@ -104,10 +225,127 @@ class GoogleAuthService:
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         return new_user
     
     def create_access_token(self, user: User) -> str:
         """사용자 정보로 JWT 액세스 토큰 생성"""
-        return self.jwt_service.create_access_token(data={"sub": user.id})
\ No newline at end of file
+        return self.jwt_service.create_access_token(data={"sub": user.id})
+
+# 전역 인스턴스 (JWKS 캐시를 요청 간 공유)
+google_auth_service = GoogleAuthService()
+
+if __name__ == "__main__":
+    # 로그인 부하/충돌 확인: python -m services.google_auth_service
+    # (Google JWKS 대신 로컬 HTTP 서버, 임시 SQLite 파일 사용 - 외부 호출 없음)
+    import json
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jose import jwk
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from database import Base
+
+    ACCOUNTS = 50
+    LOGINS = 500
+    CONCURRENCY = 20
+    CLIENT_ID = "load-test-client"
+
+    private_pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_jwk = {**jwk.construct(private_pem, "RS256").public_key().to_dict(), "kid": "load-test"}
+    jwks_requests = []
+
+    class JWKSHandler(BaseHTTPRequestHandler):
+        """Google 인증서 엔드포인트 대역"""
+
+        def do_GET(self):
+            jwks_requests.append(self.path)
+            body = json.dumps({"keys": [public_jwk]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "public, max-age=300")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    def _id_token(sub: str, email: str) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": GOOGLE_ISSUERS[0], "aud": CLIENT_ID, "sub": sub, "email": email,
+            "email_verified": True, "name": sub, "iat": now, "exp": now + 3600,
+        }
+        return jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": "load-test"})
+
+    async def _login(service: GoogleAuthService, sessions, id_token: str) -> User:
+        google_data = await service.verify_google_token(id_token)
+        async with sessions() as db:
+            return await service.get_or_create_user(db, google_data)
+
+    async def _main(path: str) -> None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), JWKSHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+        service = GoogleAuthService(jwks=GoogleJWKS(f"http://127.0.0.1:{server.server_port}/certs"))
+        service.client_id = CLIENT_ID
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+
+            # 1) 계정 ACCOUNTS개로 LOGINS회 동시 로그인 (첫 로그인 포함)
+            # 토큰 서명은 Google 쪽 비용이므로 계정별로 미리 만들어 둠
+            account_tokens = [_id_token(f"sub-{i}", f"user{i}@example.com") for i in range(ACCOUNTS)]
+            tokens = [account_tokens[i % ACCOUNTS] for i in range(LOGINS)]
+            gate = asyncio.Semaphore(CONCURRENCY)
+
+            async def limited(token: str) -> User:
+                async with gate:
+                    return await _login(service, sessions, token)
+
+            started = time.perf_counter()
+            users = await asyncio.gather(*(limited(token) for token in tokens))
+            elapsed = time.perf_counter() - started
+            async with sessions() as db:
+                rows = (await db.scalars(select(User))).all()
+            assert len(rows) == ACCOUNTS and len({user.id for user in users}) == ACCOUNTS
+            assert len(jwks_requests) == 1, jwks_requests
+            print(f"로그인 {LOGINS}회 (동시 {CONCURRENCY}, 계정 {ACCOUNTS}개): {LOGINS / elapsed:,.0f}/s, "
+                  f"사용자 {len(rows)}명 생성, JWKS 조회 {len(jwks_requests)}회 (SQLite는 쓰기가 직렬화되어 MySQL 처리량과 다름)")
+
+            # 2) 새 계정의 동시 첫 로그인 - 모두 같은 사용자 1명
+            token = _id_token("sub-new", "new@example.com")
+            users = await asyncio.gather(*(_login(service, sessions, token) for _ in range(10)))
+            assert len({user.id for user in users}) == 1
+            print("새 계정 동시 첫 로그인 10회: 사용자 1명")
+
+            # 3) 다른 Google 계정이 쓰는 이메일 - 409, 기존 사용자 행은 변경 없음
+            async with sessions() as db:
+                before = await db.scalar(select(User.last_login).where(User.google_id == "sub-0"))
+            try:
+                await _login(service, sessions, _id_token("sub-other", "user0@example.com"))
+            except HTTPException as e:
+                assert e.status_code == 409, e.detail
+            else:
+                raise AssertionError("이메일 충돌이 409가 아님")
+            async with sessions() as db:
+                after = await db.scalar(select(User.last_login).where(User.google_id == "sub-0"))
+                assert await db.scalar(select(User).where(User.google_id == "sub-other")) is None
+            assert before == after
+            print("다른 계정의 이메일로 로그인: 409, 기존 사용자 last_login 변경 없음")
+        finally:
+            await GoogleJWKS.aclose()
+            await engine.dispose()
+            server.shutdown()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_main(f"{tmp}/login.db"))
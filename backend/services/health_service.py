@@ -0,0 +1,183 @@
+# services/health_service.py
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from sqlalchemy import text
+
+from database import AsyncSessionLocal, get_async_engine, init_engines
+from models.monitoring import ComponentHealth, HealthReport
+from services.monitoring_service import MonitoringService
+
+# 점검 주기와 점검별 제한 시간(초)
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+# 커넥션 풀 사용률이 이 값 이상이면 degraded
+HEALTH_POOL_SATURATION = float(os.getenv("HEALTH_POOL_SATURATION", "0.9"))
+CLOUDFLARE_VERIFY_URL = "https://api.cloudflare.com/client/v4/user/tokens/verify"
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+UNHEALTHY = "unhealthy"
+SKIPPED = "skipped"
+
+# 장애 시 전체 상태를 unhealthy로 만드는 구성 요소 (나머지는 degraded)
+CRITICAL_COMPONENTS = ("database",)
+
+
+def _pool_status() -> Dict[str, Any]:
+    """요청 경로가 쓰는 비동기 엔진의 풀 상태"""
+    pool = get_async_engine().sync_engine.pool
+    status: Dict[str, Any] = {"pool": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        size = pool.size()
+        max_overflow = max(0, getattr(pool, "_max_overflow", 0))
+        checked_out = pool.checkedout()
+        status.update({
+            "size": size,
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "saturation": round(checked_out / (size + max_overflow), 3) if size + max_overflow else 0.0,
+        })
+    return status
+
+
+class HealthProber:
+    """외부 의존성(모니터 서버, DB, Cloudflare, WAF 서버) 주기 점검 및 캐시된 헬스 문서 제공"""
+
+    def __init__(self):
+        self._components: Dict[str, ComponentHealth] = {}
+        self._checks: Dict[str, Callable[[], Awaitable[ComponentHealth]]] = {
+            "monitor": self._check_monitor,
+            "database": self._check_database,
+            "cloudflare": self._check_cloudflare,
+            "waf": self._check_waf,
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._last_run: Optional[float] = None
+
+    async def _check_monitor(self) -> ComponentHealth:
+        result = await MonitoringService.health_check()
+        return ComponentHealth(status=result["status"], error=result.get("error"), detail=result)
+
+    async def _check_database(self) -> ComponentHealth:
+        # 비동기 엔진으로 확인 - 시간 초과로 취소되면 쿼리도 함께 중단 (스레드에 남지 않음)
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+        pool = _pool_status()
+        saturated = pool.get("saturation", 0.0) >= HEALTH_POOL_SATURATION
+        return ComponentHealth(status=DEGRADED if saturated else HEALTHY, detail=pool)
+
+    async def _check_cloudflare(self) -> ComponentHealth:
+        token = os.getenv("CLOUDFLARE_API_TOKEN")
+        if not token:
+            return ComponentHealth(status=SKIPPED, error="CLOUDFLARE_API_TOKEN 미설정")
+        response = await self._client.get(CLOUDFLARE_VERIFY_URL, headers={"Authorization": f"Bearer {token}"})
+        if response.status_code >= 500:
+            return ComponentHealth(status=UNHEALTHY, error=f"HTTP {response.status_code}")
+        # 토큰이 거부되어도 API 자체는 도달 가능
+        valid = response.status_code == 200
+        return ComponentHealth(
+            status=HEALTHY if valid else DEGRADED,
+            error=None if valid else f"토큰 검증 실패 (HTTP {response.status_code})"
+        )
+
+    async def _check_waf(self) -> ComponentHealth:
+        waf_server_ip = os.getenv("WAF_SERVER_IP")
+        if not waf_server_ip:
+            return ComponentHealth(status=SKIPPED, error="WAF_SERVER_IP 미설정")
+        # 파라미터 없이 호출 - 응답만 오면 도달 가능 (등록/해제는 일어나지 않음)
+        response = await self._client.get(f"http://{waf_server_ip}/manage")
+        if response.status_code >= 500:
+            return ComponentHealth(status=UNHEALTHY, error=f"HTTP {response.status_code}")
+        return ComponentHealth(status=HEALTHY)
+
+    async def _run_check(self, name: str) -> None:
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._checks[name](), HEALTH_PROBE_TIMEOUT)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                error = f"점검 시간 초과 ({HEALTH_PROBE_TIMEOUT:g}초)"
+            else:
+                error = str(e) or repr(e)
+            # 실패해도 detail을 채워 조회 측이 직접 점검하지 않고 캐시를 그대로 사용
+            detail: Dict[str, Any] = {"status": UNHEALTHY, "error": error}
+            if name == "monitor":
+                detail["monitor_server"] = "disconnected"
+            result = ComponentHealth(status=UNHEALTHY, error=error, detail=detail)
+        result.latency_ms = round((time.monotonic() - started) * 1000, 1)
+        result.checked_at = datetime.now().isoformat()
+        self._components[name] = result
+
+    async def probe(self) -> None:
+        """모든 구성 요소를 동시에 점검해 캐시 갱신"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=HEALTH_PROBE_TIMEOUT)
+        await asyncio.gather(*(self._run_check(name) for name in self._checks))
+        self._last_run = time.monotonic()
+
+    async def _probe_loop(self):
+        while not self._stopping.is_set():
+            await self.probe()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), HEALTH_PROBE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_component(self, name: str) -> Optional[ComponentHealth]:
+        return self._components.get(name)
+
+    def report(self) -> HealthReport:
+        """캐시된 헬스 문서 (점검 결과가 없거나 오래되면 unhealthy)"""
+        components = dict(self._components)
+        if self._last_run is None:
+            status = "starting"
+        elif time.monotonic() - self._last_run > 3 * HEALTH_PROBE_INTERVAL + HEALTH_PROBE_TIMEOUT:
+            status = "stale"
+        elif any(c.status == UNHEALTHY for n, c in components.items() if n in CRITICAL_COMPONENTS):
+            status = UNHEALTHY
+        elif any(c.status in (UNHEALTHY, DEGRADED) for c in components.values()):
+            status = DEGRADED
+        else:
+            status = HEALTHY
+        return HealthReport(
+            status=status,
+            checked_at=max((c.checked_at for c in components.values() if c.checked_at), default=None),
+            components=components
+        )
+
+    def start(self) -> None:
+        """주기적 점검 태스크 시작"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self) -> None:
+        """점검 태스크 종료 (진행 중인 점검은 끝까지 기다림 - 점검마다 제한 시간이 있어 길어야 HEALTH_PROBE_TIMEOUT)
+
+        DB 점검을 연결 도중 취소하면 연결이 풀로 돌아오지 않고 남아 (aiosqlite는 연결 스레드 때문에) 프로세스가 종료되지 않음
+        """
+        if self._task is not None:
+            self._stopping.set()
+            done, _ = await asyncio.wait({self._task}, timeout=HEALTH_PROBE_TIMEOUT + 1)
+            if not done:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# 전역 인스턴스
+health_prober = HealthProber()
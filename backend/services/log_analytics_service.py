@@ -0,0 +1,306 @@
+# services/log_analytics_service.py
+import asyncio
+import json
+import os
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Tuple
+
+from models.log_record import LogRecord
+from models.monitoring import DomainAnalytics, TopKItem
+from services.monitor_stream import log_domain, uri_path
+from services.sketches import HyperLogLog, SpaceSaving
+
+# 스케치 크기 (도메인/버킷당 HLL 2^p 바이트 + 차원별 최대 capacity 항목)
+ANALYTICS_HLL_PRECISION = int(os.getenv("ANALYTICS_HLL_PRECISION", "12"))
+ANALYTICS_TOPK_CAPACITY = int(os.getenv("ANALYTICS_TOPK_CAPACITY", "100"))
+# 윈도우별 버킷 수 (최근 1시간 / 24시간을 몇 개로 나눌지 - 기본 5분 / 1시간 단위)
+# 기본 크기에서 버킷 하나가 채워지면 약 80KB라 도메인당 최대 (12 + 24) x 80KB
+ANALYTICS_HOUR_BUCKETS = int(os.getenv("ANALYTICS_HOUR_BUCKETS", "12"))
+ANALYTICS_DAY_BUCKETS = int(os.getenv("ANALYTICS_DAY_BUCKETS", "24"))
+# 스케치를 유지할 최대 도메인 수 (초과 시 가장 오래 로그가 없던 도메인부터 제거, 0이면 제한 없음)
+ANALYTICS_MAX_DOMAINS = int(os.getenv("ANALYTICS_MAX_DOMAINS", "500"))
+# 스냅샷 주기(초)와 저장 경로 (빈 값이면 파일 저장 안 함)
+ANALYTICS_SNAPSHOT_INTERVAL = float(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL", "60"))
+ANALYTICS_SNAPSHOT_PATH = os.getenv(
+    "ANALYTICS_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(__file__), "../data", "analytics_snapshot.json")
+)
+
+# 슬라이딩 집계 윈도우 -> (버킷 단위, 버킷 수) : 윈도우 안의 버킷을 합쳐서 계산
+WINDOWS: Dict[str, Tuple[timedelta, int]] = {
+    "hour": (timedelta(hours=1) / ANALYTICS_HOUR_BUCKETS, ANALYTICS_HOUR_BUCKETS),
+    "day": (timedelta(days=1) / ANALYTICS_DAY_BUCKETS, ANALYTICS_DAY_BUCKETS),
+}
+# 버킷 경계 기준 시각
+_BUCKET_EPOCH = datetime(2000, 1, 1)
+# 상위 K 집계 대상 필드
+TOP_FIELDS = ("uri", "user_agent", "rule_id")
+
+
+def _bucket_start(window: str, now: datetime) -> datetime:
+    """now가 속한 버킷의 시작 시각"""
+    unit = WINDOWS[window][0]
+    return _BUCKET_EPOCH + unit * ((now - _BUCKET_EPOCH) // unit)
+
+
+def _window_start(window: str, now: datetime) -> datetime:
+    """윈도우에 포함되는 가장 오래된 버킷의 시작 시각"""
+    unit, size = WINDOWS[window]
+    return _bucket_start(window, now) - unit * (size - 1)
+
+
+class WindowSketches:
+    """하나의 버킷(또는 합친 윈도우)에 대한 스케치 묶음"""
+
+    def __init__(self, start: datetime):
+        self.start = start
+        self.events = 0
+        self.client_ips = HyperLogLog(ANALYTICS_HLL_PRECISION)
+        self.tops: Dict[str, SpaceSaving] = {
+            field: SpaceSaving(ANALYTICS_TOPK_CAPACITY) for field in TOP_FIELDS
+        }
+
+    def add(self, log: LogRecord) -> None:
+        self.events += 1
+        if log.client_ip:
+            self.client_ips.add(log.client_ip)
+        values = {
+            "uri": uri_path(log.uri),
+            "user_agent": log.user_agent,
+            "rule_id": log.rule_id,
+        }
+        for field, value in values.items():
+            if value:
+                self.tops[field].add(value)
+
+    def merge(self, other: "WindowSketches") -> None:
+        self.start = min(self.start, other.start)
+        self.events += other.events
+        self.client_ips.merge(other.client_ips)
+        for field, sketch in other.tops.items():
+            self.tops[field].merge(sketch)
+
+    def copy(self) -> "WindowSketches":
+        sketches = WindowSketches(self.start)
+        sketches.events = self.events
+        sketches.client_ips = self.client_ips.copy()
+        sketches.tops = {field: sketch.copy() for field, sketch in self.tops.items()}
+        return sketches
+
+    def to_dict(self) -> Dict:
+        return {
+            "start": self.start.isoformat(),
+            "events": self.events,
+            "client_ips": self.client_ips.to_dict(),
+            "tops": {field: sketch.to_dict() for field, sketch in self.tops.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "WindowSketches":
+        sketches = cls(datetime.fromisoformat(data["start"]))
+        sketches.events = data["events"]
+        sketches.client_ips = HyperLogLog.from_dict(data["client_ips"])
+        for field, sketch in data["tops"].items():
+            if field in sketches.tops:
+                sketches.tops[field] = SpaceSaving.from_dict(sketch)
+        return sketches
+
+
+class WindowRing:
+    """슬라이딩 윈도우를 구성하는 버킷 스케치 링 (합칠 수 있는 스케치라 버킷을 합쳐 윈도우 결과 계산)"""
+
+    def __init__(self, window: str):
+        self.window = window
+        self.buckets: Deque[WindowSketches] = deque()
+        # 지난 버킷들을 합친 결과 (현재 버킷이 바뀔 때만 다시 계산)
+        self._sealed: Optional[Tuple[datetime, WindowSketches]] = None
+
+    def prune(self, now: datetime) -> None:
+        """윈도우를 벗어난 버킷 제거"""
+        oldest = _window_start(self.window, now)
+        while self.buckets and self.buckets[0].start < oldest:
+            self.buckets.popleft()
+
+    def current(self, now: datetime) -> WindowSketches:
+        start = _bucket_start(self.window, now)
+        if not self.buckets or self.buckets[-1].start != start:
+            self.buckets.append(WindowSketches(start))
+            self.prune(now)
+        return self.buckets[-1]
+
+    def merged(self, now: datetime) -> WindowSketches:
+        """윈도우 전체 버킷을 합친 스케치"""
+        self.prune(now)
+        start = _bucket_start(self.window, now)
+        if self._sealed is None or self._sealed[0] != start:
+            sealed = WindowSketches(_window_start(self.window, now))
+            for bucket in self.buckets:
+                if bucket.start != start:
+                    sealed.merge(bucket)
+            self._sealed = (start, sealed)
+        merged = self._sealed[1].copy()
+        if self.buckets and self.buckets[-1].start == start:
+            merged.merge(self.buckets[-1])
+        merged.start = _window_start(self.window, now)
+        return merged
+
+    def to_list(self) -> List[Dict]:
+        return [bucket.to_dict() for bucket in self.buckets]
+
+    @classmethod
+    def from_list(cls, window: str, data: List[Dict], now: datetime) -> "WindowRing":
+        ring = cls(window)
+        ring.buckets.extend(sorted((WindowSketches.from_dict(raw) for raw in data), key=lambda b: b.start))
+        ring.prune(now)
+        return ring
+
+
+class LogAnalyticsService:
+    """이벤트 스트림 기반 도메인별 근사 분석 (고유 IP 수, 상위 URI/User-Agent/룰)"""
+
+    def __init__(self):
+        # 도메인 -> 윈도우 -> 버킷 링 (마지막 로그가 오래된 도메인부터)
+        self._domains: "OrderedDict[str, Dict[str, WindowRing]]" = OrderedDict()
+        self.evicted_domains = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _peek(self, domain: str, window: str) -> WindowSketches:
+        """조회용 - 윈도우 버킷을 합친 스케치 (도메인이 없으면 저장하지 않고 빈 스케치 반환)"""
+        now = datetime.now()
+        ring = self._domains.get(domain, {}).get(window)
+        if ring is None:
+            return WindowSketches(_window_start(window, now))
+        return ring.merged(now)
+
+    def record(self, log: LogRecord) -> None:
+        """로그 한 건을 스케치에 반영 (이벤트 스트림 처리 단계)"""
+        domain = log_domain(log)
+        if not domain:
+            return
+        now = datetime.now()
+        windows = self._domains.get(domain)
+        if windows is None:
+            windows = self._domains[domain] = {window: WindowRing(window) for window in WINDOWS}
+            self._evict()
+        else:
+            self._domains.move_to_end(domain)
+        for ring in windows.values():
+            ring.current(now).add(log)
+
+    def _evict(self) -> None:
+        """도메인 수가 ANALYTICS_MAX_DOMAINS를 넘으면 가장 오래 로그가 없던 도메인 제거"""
+        while ANALYTICS_MAX_DOMAINS and len(self._domains) > ANALYTICS_MAX_DOMAINS:
+            self._domains.popitem(last=False)
+            self.evicted_domains += 1
+
+    def get_analytics(self, domain: str, window: str = "day", k: int = 20) -> DomainAnalytics:
+        """도메인의 최근 윈도우(최근 1시간/24시간) 분석 결과"""
+        sketches = self._peek(domain, window)
+        tops = {field: [TopKItem(value=v, count=c, error=e) for v, c, e in sketch.top(k)]
+                for field, sketch in sketches.tops.items()}
+        return DomainAnalytics(
+            domain=domain,
+            window=window,
+            window_start=sketches.start.isoformat(),
+            events=sketches.events,
+            unique_client_ips=sketches.client_ips.count(),
+            top_uris=tops["uri"],
+            top_user_agents=tops["user_agent"],
+            top_rule_ids=tops["rule_id"],
+        )
+
+    def get_top(self, domain: str, field: str, window: str = "hour", k: int = 20) -> list:
+        """특정 필드의 상위 K 항목"""
+        sketches = self._peek(domain, window)
+        return [TopKItem(value=v, count=c, error=e) for v, c, e in sketches.tops[field].top(k)]
+
+    def prune(self) -> None:
+        """윈도우를 벗어난 버킷과 활동 없는 도메인 정리"""
+        now = datetime.now()
+        for domain in list(self._domains):
+            windows = self._domains[domain]
+            for ring in windows.values():
+                ring.prune(now)
+            if not any(ring.buckets for ring in windows.values()):
+                del self._domains[domain]
+
+    def snapshot(self) -> Dict:
+        """현재 스케치 상태를 직렬화"""
+        return {
+            domain: {window: ring.to_list() for window, ring in windows.items()}
+            for domain, windows in self._domains.items()
+        }
+
+    def restore(self, data: Dict) -> None:
+        """스냅샷에서 아직 윈도우 안에 있는 버킷만 복원"""
+        now = datetime.now()
+        for domain, windows in data.items():
+            restored = {window: WindowRing(window) for window in WINDOWS}
+            for window, raw in windows.items():
+                # 이전 형식(윈도우당 스케치 하나)은 건너뜀
+                if window in WINDOWS and isinstance(raw, list):
+                    restored[window] = WindowRing.from_list(window, raw, now)
+            if any(ring.buckets for ring in restored.values()):
+                self._domains[domain] = restored
+        self._evict()
+
+    @staticmethod
+    def _write_snapshot(data: Dict) -> None:
+        dirname = os.path.dirname(ANALYTICS_SNAPSHOT_PATH)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        tmp_path = f"{ANALYTICS_SNAPSHOT_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, ANALYTICS_SNAPSHOT_PATH)
+
+    @staticmethod
+    def _read_snapshot() -> Optional[Dict]:
+        if not os.path.exists(ANALYTICS_SNAPSHOT_PATH):
+            return None
+        with open(ANALYTICS_SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    async def save_snapshot(self) -> None:
+        """스냅샷을 파일로 저장 (직렬화는 루프에서, 파일 I/O는 스레드에서)"""
+        self.prune()
+        if not ANALYTICS_SNAPSHOT_PATH:
+            return
+        data = self.snapshot()
+        try:
+            await asyncio.to_thread(self._write_snapshot, data)
+        except Exception as e:
+            print(f"분석 스냅샷 저장 실패: {e}")
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(ANALYTICS_SNAPSHOT_INTERVAL)
+            await self.save_snapshot()
+
+    def start(self) -> None:
+        """이전 스냅샷 복원 후 주기적 스냅샷 태스크 시작 (스트림 소비 시작 전에 호출)"""
+        if self._task is None or self._task.done():
+            if ANALYTICS_SNAPSHOT_PATH:
+                try:
+                    data = self._read_snapshot()
+                    if data:
+                        self.restore(data)
+                except Exception as e:
+                    print(f"분석 스냅샷 복원 실패: {e}")
+            self._task = asyncio.create_task(self._snapshot_loop())
+
+    async def stop(self) -> None:
+        """스냅샷 태스크 종료 후 마지막 스냅샷 저장"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.save_snapshot()
+
+
+# 전역 인스턴스
+log_analytics_service = LogAnalyticsService()
@@ -0,0 +1,199 @@
+# services/log_search_service.py
+import heapq
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.log_record import LogRecord
+from models.monitoring import LogItem
+from services.monitor_stream import log_domain, uri_path
+
+# 도메인별 최근 로그 보관 한도 (건수, 초)
+LOG_SEARCH_MAX_PER_DOMAIN = int(os.getenv("LOG_SEARCH_MAX_PER_DOMAIN", "5000"))
+LOG_SEARCH_MAX_AGE = float(os.getenv("LOG_SEARCH_MAX_AGE", "3600"))
+# URI 경로 접두사 색인 깊이 (/a/b/c/d 까지)
+URI_PREFIX_DEPTH = 4
+
+
+def uri_prefixes(uri: Optional[str]) -> List[str]:
+    """URI 경로의 세그먼트 단위 접두사 목록 (/a/b -> ["/", "/a", "/a/b"])"""
+    path = uri_path(uri)
+    if not path or not path.startswith("/"):
+        return []
+    segments = [s for s in path.split("/") if s][:URI_PREFIX_DEPTH]
+    prefixes = ["/"]
+    current = ""
+    for segment in segments:
+        current += "/" + segment
+        prefixes.append(current)
+    return prefixes
+
+
+def _index_keys(log: LogRecord) -> List[Tuple[str, object]]:
+    keys: List[Tuple[str, object]] = []
+    if log.client_ip:
+        keys.append(("client_ip", log.client_ip))
+    for prefix in uri_prefixes(log.uri):
+        keys.append(("uri_prefix", prefix))
+    if log.status is not None:
+        keys.append(("status", log.status))
+    if log.method:
+        keys.append(("method", log.method.upper()))
+    if log.rule_id:
+        keys.append(("rule_id", log.rule_id))
+    return keys
+
+
+class RecentLogWindow:
+    """도메인 하나의 최근 로그 윈도우와 역색인 (건수/시간 기준 오래된 것부터 제거)"""
+
+    def __init__(self):
+        self._seq = 0
+        # (순번, 수신 시각, 로그) - 순번이 연속이므로 위치 = 순번 - 맨 앞 순번
+        self._entries: Deque[Tuple[int, float, LogRecord]] = deque()
+        # (필드, 값) -> 순번 목록 (오름차순)
+        self._postings: Dict[Tuple[str, object], Deque[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, log: LogRecord, now: float) -> None:
+        seq = self._seq
+        self._seq += 1
+        self._entries.append((seq, now, log))
+        for key in _index_keys(log):
+            posting = self._postings.get(key)
+            if posting is None:
+                posting = self._postings[key] = deque()
+            posting.append(seq)
+        self.evict(now)
+
+    def evict(self, now: float) -> None:
+        cutoff = now - LOG_SEARCH_MAX_AGE
+        while self._entries:
+            seq, received, log = self._entries[0]
+            if len(self._entries) <= LOG_SEARCH_MAX_PER_DOMAIN and received >= cutoff:
+                break
+            self._entries.popleft()
+            # 가장 오래된 항목이므로 각 색인 목록의 맨 앞에 위치
+            for key in _index_keys(log):
+                posting = self._postings.get(key)
+                if posting and posting[0] == seq:
+                    posting.popleft()
+                    if not posting:
+                        del self._postings[key]
+
+    def _get(self, seq: int) -> Optional[Tuple[int, float, LogRecord]]:
+        """순번으로 항목 조회 (제거된 순번이면 None)"""
+        if not self._entries:
+            return None
+        index = seq - self._entries[0][0]
+        if 0 <= index < len(self._entries):
+            return self._entries[index]
+        return None
+
+    def search(self, criteria: Dict[str, object], since: Optional[float] = None) -> Iterator[Tuple[float, LogRecord]]:
+        """조건을 모두 만족하는 로그를 최신순으로 반환"""
+        if criteria:
+            postings = []
+            for key in criteria.items():
+                posting = self._postings.get(key)
+                if not posting:
+                    return
+                postings.append(posting)
+            # 가장 짧은 색인 목록만 순회하고 나머지 조건은 로그에서 직접 확인
+            entries = (self._get(seq) for seq in reversed(min(postings, key=len)))
+        else:
+            entries = reversed(self._entries)
+
+        required = set(criteria.items())
+        for entry in entries:
+            if entry is None:
+                continue
+            _, received, log = entry
+            if since is not None and received < since:
+                break
+            if len(required) <= 1 or required.issubset(_index_keys(log)):
+                yield received, log
+
+
+class LogSearchService:
+    """이벤트 스트림 기반 도메인별 최근 로그 역색인 검색"""
+
+    def __init__(self):
+        self._windows: Dict[str, RecentLogWindow] = {}
+
+    def record(self, log: LogRecord) -> None:
+        """로그 한 건을 최근 윈도우와 색인에 추가 (이벤트 스트림 처리 단계)"""
+        domain = log_domain(log)
+        if not domain:
+            return
+        window = self._windows.get(domain)
+        if window is None:
+            window = self._windows[domain] = RecentLogWindow()
+        window.add(log, time.time())
+
+    def search(
+        self,
+        domains: Iterable[str],
+        client_ip: Optional[str] = None,
+        uri_prefix: Optional[str] = None,
+        status: Optional[int] = None,
+        method: Optional[str] = None,
+        rule_id: Optional[str] = None,
+        since_seconds: Optional[float] = None,
+        limit: int = 100
+    ) -> List[LogItem]:
+        """지정한 도메인들에서 조건에 맞는 최근 로그를 최신순으로 최대 limit 건 조회"""
+        now = time.time()
+        criteria: Dict[str, object] = {}
+        if client_ip:
+            criteria["client_ip"] = client_ip
+        if uri_prefix:
+            prefix = uri_prefix.rstrip("/") or "/"
+            prefixes = uri_prefixes(prefix)
+            if not prefixes:
+                return []
+            criteria["uri_prefix"] = prefixes[-1]
+        if status is not None:
+            criteria["status"] = status
+        if method:
+            criteria["method"] = method.upper()
+        if rule_id:
+            criteria["rule_id"] = rule_id
+        since = now - since_seconds if since_seconds else None
+
+        names = {domain.lower() for domain in domains} & self._windows.keys()
+
+        windows = []
+        for name in names:
+            window = self._windows[name]
+            window.evict(now)
+            if len(window):
+                windows.append(window)
+            else:
+                del self._windows[name]
+        # 도메인별 최신순 결과를 수신 시각 기준으로 병합
+        streams = [window.search(criteria, since) for window in windows]
+        merged = heapq.merge(*streams, key=lambda entry: entry[0], reverse=True)
+
+        results: List[LogItem] = []
+        for _, log in merged:
+            # 색인 깊이를 넘는 접두사는 원본 경로로 최종 확인
+            if uri_prefix and not self._matches_prefix(log, uri_prefix):
+                continue
+            results.append(log.to_log_item())
+            if len(results) >= limit:
+                break
+        return results
+
+    @staticmethod
+    def _matches_prefix(log: LogRecord, uri_prefix: str) -> bool:
+        path = uri_path(log.uri) or ""
+        prefix = uri_prefix.rstrip("/")
+        return not prefix or path == prefix or path.startswith(prefix + "/")
+
+
+# 전역 인스턴스
+log_search_service = LogSearchService()
@@ -0,0 +1,151 @@
+# services/monitor_stream.py
+import asyncio
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import Request
+
+from models.log_record import LogRecord
+from services.monitoring_service import MonitoringService
+
+# 로그 이벤트를 받아 처리하는 단계 (동기 함수, 이벤트 루프를 막지 않도록 가볍게 유지)
+LogStage = Callable[[LogRecord], None]
+
+# SSE 구독자별 로컬 이벤트 대기열 크기 (가득 차면 가장 오래된 이벤트 폐기)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def log_domain(log: LogRecord) -> Optional[str]:
+    """로그 아이템에서 도메인(host) 추출 - 레거시 'domain' 필드도 허용"""
+    domain = log.host or getattr(log, "domain", None)
+    if not domain:
+        return None
+    # 포트가 붙은 host 헤더 정리 (example.com:443 -> example.com)
+    return domain.split(":", 1)[0].lower()
+
+
+def uri_path(uri: Optional[str]) -> Optional[str]:
+    """쿼리 문자열을 제외한 URI 경로"""
+    if not uri:
+        return None
+    return uri.split("?", 1)[0]
+
+
+class MonitorEventStream:
+    """모니터 서버의 전체 이벤트 스트림을 백그라운드에서 소비하여 처리 단계로 분배"""
+
+    def __init__(self):
+        self._stages: List[LogStage] = []
+        self._task: Optional[asyncio.Task] = None
+        # 로컬 이벤트(알림 등) 구독 대기열 -> 구독 도메인 (None이면 전체)
+        self._subscribers: Dict[asyncio.Queue, Optional[str]] = {}
+
+    def add_stage(self, stage: LogStage) -> None:
+        """로그 처리 단계 등록"""
+        if stage not in self._stages:
+            self._stages.append(stage)
+
+    def dispatch(self, log: LogRecord) -> None:
+        """로그 한 건을 등록된 모든 단계에 전달 (단계별 오류는 격리)"""
+        for stage in self._stages:
+            try:
+                stage(log)
+            except Exception as e:
+                print(f"로그 처리 단계 오류 ({getattr(stage, '__qualname__', stage)}): {e}")
+
+    def dispatch_raw(self, data: str) -> None:
+        """SSE data 라인을 파싱하여 로그 이벤트만 분배"""
+        try:
+            parsed = json.loads(data)
+        except Exception:
+            return
+
+        if not isinstance(parsed, dict) or parsed.get("type") != "log":
+            return
+        payload = parsed.get("payload")
+        if not isinstance(payload, dict):
+            return
+
+        # 요청마다 pydantic 모델을 만들지 않고 경량 레코드로 변환
+        self.dispatch(LogRecord.from_payload(payload))
+
+    def subscribe(self, domain: Optional[str] = None) -> asyncio.Queue:
+        """로컬 이벤트 구독 대기열 생성"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[queue] = domain.lower() if domain else None
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """로컬 이벤트 구독 해제"""
+        self._subscribers.pop(queue, None)
+
+    def publish(self, event: Dict[str, Any], domain: Optional[str] = None) -> None:
+        """로컬 이벤트를 해당 도메인(또는 전체) 구독자에게 전달"""
+        for queue, subscribed in self._subscribers.items():
+            if subscribed is not None and domain is not None and subscribed != domain:
+                continue
+            if queue.full():
+                # 느린 구독자는 오래된 이벤트부터 버림
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def merge_local_events(
+        self,
+        request: Request,
+        source: AsyncIterator[str],
+        domain: Optional[str] = None
+    ):
+        """모니터 서버 SSE 스트림에 로컬 이벤트(알림 등)를 합쳐서 전달"""
+        queue = self.subscribe(domain)
+        source_iter = source.__aiter__()
+        next_source = asyncio.ensure_future(source_iter.__anext__())
+        next_local = asyncio.ensure_future(queue.get())
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    {next_source, next_local}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if next_local in done:
+                    s = json.dumps(next_local.result(), ensure_ascii=False)
+                    yield f"data: {s}\n\n"
+                    next_local = asyncio.ensure_future(queue.get())
+                if next_source in done:
+                    try:
+                        chunk = next_source.result()
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+                    next_source = asyncio.ensure_future(source_iter.__anext__())
+                if await request.is_disconnected():
+                    break
+        finally:
+            self.unsubscribe(queue)
+            for task in (next_source, next_local):
+                task.cancel()
+            await asyncio.gather(next_source, next_local, return_exceptions=True)
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def _run(self):
+        async for data in MonitoringService._sse_stream_from_monitor():
+            self.dispatch_raw(data)
+
+    def start(self) -> None:
+        """백그라운드 소비 태스크 시작"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """백그라운드 소비 태스크 종료"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 전역 인스턴스
+monitor_event_stream = MonitorEventStream()
@@ -1,34 +1,214 @@
 import asyncio
+import bisect
+import hashlib
+import heapq
 import json
 import os
-from typing import List, Optional, Dict, Any
+from itertools import islice
+from typing import List, Optional, Dict, Any, Tuple
 import httpx
 from fastapi import Request
 from models.monitoring import LogItem, DomainInfo, TrafficStats, DomainTrafficStats, DomainBillingInfo, DomainBillingSummary
-from dotenv import load_dotenv
 from models.monitoring import TrafficSummary
 from datetime import datetime, timedelta
 import math
+import time
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
 
-load_dotenv(os.path.join(os.path.dirname(__file__), '../config', '.env'))
+import settings  # noqa: F401 .env 로드
 
 # 로그 서버 URL 설정 (환경변수 우선, 없으면 기본값 사용)
 MONITOR_BASE_URL = os.getenv("LOG_MONITORING_SERVER_BASE_URL", "http://115.90.100.34:30148")
+# 여러 로그 서버(샤드) 사용 시 콤마로 구분하여 지정 (없으면 단일 서버)
+MONITOR_BASE_URLS = [
+    url.strip().rstrip("/")
+    for url in os.getenv("LOG_MONITORING_SERVER_BASE_URLS", "").split(",")
+    if url.strip()
+] or [MONITOR_BASE_URL.strip().rstrip("/")]
+# 샤드별 요청 제한 시간(초) - 느린 샤드는 결과에서 제외
+MONITOR_SHARD_TIMEOUT = float(os.getenv("MONITOR_SHARD_TIMEOUT", "10"))
+# 회로 차단기: 최근 호출 중 오류/지연 비율이 임계값을 넘으면 일정 시간 즉시 실패 (503)
+MONITOR_BREAKER_WINDOW = int(os.getenv("MONITOR_BREAKER_WINDOW", "50"))
+MONITOR_BREAKER_MIN_CALLS = int(os.getenv("MONITOR_BREAKER_MIN_CALLS", "10"))
+MONITOR_BREAKER_FAILURE_RATIO = float(os.getenv("MONITOR_BREAKER_FAILURE_RATIO", "0.5"))
+MONITOR_BREAKER_SLOW_SECONDS = float(os.getenv("MONITOR_BREAKER_SLOW_SECONDS", "5"))
+MONITOR_BREAKER_SLOW_RATIO = float(os.getenv("MONITOR_BREAKER_SLOW_RATIO", "0.8"))
+MONITOR_BREAKER_OPEN_SECONDS = float(os.getenv("MONITOR_BREAKER_OPEN_SECONDS", "30"))
+# 헤지 요청: 응답이 최근 지연 백분위수를 넘으면 같은 GET을 한 번 더 보내 먼저 온 응답 사용
+MONITOR_HEDGE_ENABLED = os.getenv("MONITOR_HEDGE_ENABLED", "false").lower() == "true"
+MONITOR_HEDGE_PERCENTILE = float(os.getenv("MONITOR_HEDGE_PERCENTILE", "95"))
 RECONNECT_BACKOFF = 1.0
 MAX_BACKOFF = 10.0
 
+# 과금 기준 (1GB당 10,000 포인트, 1포인트 = 1원)
+BYTES_PER_GB = 1024 * 1024 * 1024
+POINTS_PER_GB = 10000
+
+
+def bytes_to_billing_points(total_bytes: int) -> int:
+    """트래픽 바이트 수를 과금 포인트로 환산"""
+    return math.ceil(total_bytes / BYTES_PER_GB * POINTS_PER_GB)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class MonitorShardRing:
+    """도메인 -> 로그 서버 일관성 해시 라우팅 (샤드 추가/제거 시 일부 도메인만 이동)"""
+
+    def __init__(self, base_urls: List[str], replicas: int = 100):
+        self.base_urls = list(base_urls)
+        points = sorted(
+            (_hash(f"{url}#{i}"), url) for url in self.base_urls for i in range(replicas)
+        )
+        self._hashes = [h for h, _ in points]
+        self._urls = [url for _, url in points]
+
+    def get(self, domain: str) -> str:
+        """도메인을 담당하는 로그 서버 URL"""
+        if len(self.base_urls) == 1:
+            return self.base_urls[0]
+        index = bisect.bisect(self._hashes, _hash(domain.lower())) % len(self._hashes)
+        return self._urls[index]
+
+
+monitor_ring = MonitorShardRing(MONITOR_BASE_URLS)
+
+# 샤드별 회로 차단기
+monitor_breakers: Dict[str, CircuitBreaker] = {
+    base_url: CircuitBreaker(
+        f"monitor:{base_url}",
+        window=MONITOR_BREAKER_WINDOW,
+        min_calls=MONITOR_BREAKER_MIN_CALLS,
+        failure_ratio=MONITOR_BREAKER_FAILURE_RATIO,
+        slow_call_seconds=MONITOR_BREAKER_SLOW_SECONDS,
+        slow_call_ratio=MONITOR_BREAKER_SLOW_RATIO,
+        open_seconds=MONITOR_BREAKER_OPEN_SECONDS
+    )
+    for base_url in MONITOR_BASE_URLS
+}
+
+
+def _log_sort_key(log: LogItem) -> str:
+    return log.timestamp or log.received_at or ""
+
 class MonitoringService:
     """로그 서버와 연동하는 모니터링 서비스"""
 
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def _http(cls) -> httpx.AsyncClient:
+        """로그 서버 조회용 공유 클라이언트 (연결 재사용)"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(timeout=MONITOR_SHARD_TIMEOUT)
+        return cls._client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """공유 클라이언트 종료 (앱 종료 시)"""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    @staticmethod
+    async def _timed_get(url: str, timeout: float, breaker: CircuitBreaker) -> httpx.Response:
+        """단일 GET 요청 후 결과를 회로 차단기에 기록 (5xx/연결 오류/시간 초과는 실패)"""
+        started = time.monotonic()
+        try:
+            # httpx 단계별 제한 시간도 호출별 값으로 (클라이언트 기본값이 더 짧으면 그 값에 먼저 끊김)
+            # wait_for는 전체 시간 상한용
+            response = await asyncio.wait_for(MonitoringService._http().get(url, timeout=timeout), timeout)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record_failure(time.monotonic() - started)
+            raise
+        latency = time.monotonic() - started
+        if response.status_code >= 500:
+            breaker.record_failure(latency)
+        else:
+            breaker.record_success(latency)
+        return response
+
+    @staticmethod
+    async def _get(base_url: str, path: str, timeout: float = MONITOR_SHARD_TIMEOUT) -> httpx.Response:
+        """회로 차단기를 거친 로그 서버 GET (회로가 열려 있으면 즉시 CircuitOpenError)"""
+        breaker = monitor_breakers[base_url]
+        breaker.check()
+        url = f"{base_url}{path}"
+        hedge_after = breaker.latency_percentile(MONITOR_HEDGE_PERCENTILE) if MONITOR_HEDGE_ENABLED else None
+        if hedge_after is None or hedge_after >= timeout:
+            return await MonitoringService._timed_get(url, timeout, breaker)
+
+        # 첫 요청이 백분위수 지연 안에 끝나지 않으면 같은 요청을 한 번 더 보내 먼저 성공한 응답 사용
+        first = asyncio.create_task(MonitoringService._timed_get(url, timeout, breaker))
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+        second = asyncio.create_task(MonitoringService._timed_get(url, timeout - hedge_after, breaker))
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    async def _scatter_get(path: str) -> List[Tuple[str, Any]]:
+        """모든 샤드에 동시 요청 후 (샤드 URL, JSON) 목록 반환 - 실패/시간 초과/차단된 샤드는 제외"""
+        async def fetch(base_url: str):
+            response = await MonitoringService._get(base_url, path)
+            response.raise_for_status()
+            return response.json()
+
+        results = await asyncio.gather(
+            *(fetch(base_url) for base_url in MONITOR_BASE_URLS), return_exceptions=True
+        )
+        succeeded = []
+        open_circuits = []
+        for base_url, result in zip(MONITOR_BASE_URLS, results):
+            if isinstance(result, CircuitOpenError):
+                open_circuits.append(result)
+            elif isinstance(result, BaseException):
+                print(f"모니터 샤드 {base_url}{path} 조회 실패: {result!r}")
+            else:
+                succeeded.append((base_url, result))
+        if not succeeded:
+            if len(open_circuits) == len(MONITOR_BASE_URLS):
+                # 모든 샤드 회로가 열려 있으면 대기 없이 즉시 503
+                raise open_circuits[0]
+            raise RuntimeError(f"모든 모니터 샤드 조회 실패: {path}")
+        return succeeded
+
     @staticmethod
     async def get_domains() -> List[DomainInfo]:
-        """등록된 모든 도메인 목록 조회"""
+        """등록된 모든 도메인 목록 조회 (전체 샤드 병합)"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{MONITOR_BASE_URL}/domains")
-                response.raise_for_status()
-                data = response.json()
-                return [DomainInfo(**domain) for domain in data.get("domains", [])]
+            shard_results = await MonitoringService._scatter_get("/domains")
+
+            merged: Dict[str, DomainInfo] = {}
+            for _, data in shard_results:
+                for domain in data.get("domains", []):
+                    info = DomainInfo(**domain)
+                    existing = merged.get(info.domain)
+                    if existing is None:
+                        merged[info.domain] = info
+                    else:
+                        # 샤드 이동 중에는 같은 도메인이 여러 샤드에 있을 수 있음
+                        existing.log_count += info.log_count
+            return list(merged.values())
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"도메인 목록 조회 실패: {e}")
             return []
@@ -37,24 +217,32 @@ class MonitoringService:
     async def get_domain_logs(domain: str, count: int = 20) -> List[LogItem]:
         """특정 도메인의 최근 로그 조회"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{MONITOR_BASE_URL}/recent/{domain}?n={count}")
-                response.raise_for_status()
-                data = response.json()
-                return [LogItem(**log) for log in data.get("logs", [])]
+            response = await MonitoringService._get(monitor_ring.get(domain), f"/recent/{domain}?n={count}")
+            response.raise_for_status()
+            data = response.json()
+            return [LogItem(**log) for log in data.get("logs", [])]
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"도메인 로그 조회 실패: {e}")
             return []
 
     @staticmethod
     async def get_all_logs(count: int = 20) -> List[LogItem]:
-        """전체 최근 로그 조회"""
+        """전체 최근 로그 조회 (샤드별 결과를 타임스탬프 기준 k-way 병합)"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{MONITOR_BASE_URL}/recent?n={count}")
-                response.raise_for_status()
-                data = response.json()
-                return [LogItem(**log) for log in data.get("logs", [])]
+            shard_results = await MonitoringService._scatter_get(f"/recent?n={count}")
+
+            shard_logs = [
+                sorted((LogItem(**log) for log in data.get("logs", [])), key=_log_sort_key, reverse=True)
+                for _, data in shard_results
+            ]
+            if len(shard_logs) == 1:
+                return shard_logs[0][:count]
+            merged = heapq.merge(*shard_logs, key=_log_sort_key, reverse=True)
+            return list(islice(merged, count))
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"전체 로그 조회 실패: {e}")
             return []
@@ -63,119 +251,122 @@ class MonitoringService:
     async def get_domain_stats(domain: str) -> Optional[Dict[str, Any]]:
         """특정 도메인의 통계 정보 조회"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{MONITOR_BASE_URL}/stats/{domain}")
-                response.raise_for_status()
-                return response.json()
+            response = await MonitoringService._get(monitor_ring.get(domain), f"/stats/{domain}")
+            response.raise_for_status()
+            return response.json()
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"도메인 통계 조회 실패: {e}")
             return None
 
     @staticmethod
     async def get_traffic_summary() -> List[DomainTrafficStats]:
-        """전체 도메인 트래픽 요약 조회"""
+        """전체 도메인 트래픽 요약 조회 (전체 샤드 병합)"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{MONITOR_BASE_URL}/traffic/summary")
-                response.raise_for_status()
-                data = response.json()
-                
-                # 데이터 변환 및 검증 로직 추가
-                converted_stats = []
-                
-                for stats in data:
-                    try:
-                        # 모니터링 서버 응답 구조에 맞게 변환
-                        if isinstance(stats, dict):
-                            # domain 필드가 없거나 잘못된 경우 처리
-                            domain = stats.get('domain', '')
-                            if not domain or domain == 'accurate' or domain == '211.45.204.26' or ':' in domain:
-                                # 잘못된 도메인 데이터는 건너뛰기
-                                continue
-                            
-                            # today와 last_hour 데이터 검증 및 변환
-                            today_data = stats.get('today', {})
-                            last_hour_data = stats.get('last_hour', {})
-                            
-                            # 필수 필드가 없는 경우 기본값 설정
-                            today = TrafficSummary(
-                                requests=today_data.get('requests', 0),
-                                bytes=today_data.get('bytes', 0),
-                                mb=today_data.get('mb', 0.0)
-                            )
-                            
-                            last_hour = TrafficSummary(
-                                requests=last_hour_data.get('requests', 0),
-                                bytes=last_hour_data.get('bytes', 0),
-                                mb=last_hour_data.get('mb', 0.0)
-                            )
+            shard_results = await MonitoringService._scatter_get("/traffic/summary")
+            data = [stats for _, shard_data in shard_results for stats in shard_data]
+            
+            # 데이터 변환 및 검증 로직 추가
+            converted_stats = []
+            
+            for stats in data:
+                try:
+                    # 모니터링 서버 응답 구조에 맞게 변환
+                    if isinstance(stats, dict):
+                        # domain 필드가 없거나 잘못된 경우 처리
+                        domain = stats.get('domain', '')
+                        if not domain or domain == 'accurate' or domain == '211.45.204.26' or ':' in domain:
+                            # 잘못된 도메인 데이터는 건너뛰기
+                            continue
+                        
+                        # today와 last_hour 데이터 검증 및 변환
+                        today_data = stats.get('today', {})
+                        last_hour_data = stats.get('last_hour', {})
+                        
+                        # 필수 필드가 없는 경우 기본값 설정
+                        today = TrafficSummary(
+                            requests=today_data.get('requests', 0),
+                            bytes=today_data.get('bytes', 0),
+                            mb=today_data.get('mb', 0.0)
+                        )
+                        
+                        last_hour = TrafficSummary(
+                            requests=last_hour_data.get('requests', 0),
+                            bytes=last_hour_data.get('bytes', 0),
+                            mb=last_hour_data.get('mb', 0.0)
+                        )
+                        
+                        # 실제 기간별 데이터 조회 (1주일, 1달)
+                        try:
+                            shard_url = monitor_ring.get(domain)
                             
-                            # 실제 기간별 데이터 조회 (1주일, 1달)
-                            try:
-                                # 1주일 데이터 조회
-                                week_response = await client.get(f"{MONITOR_BASE_URL}/traffic/{domain}?interval=day&period=7")
-                                if week_response.status_code == 200:
-                                    week_data = week_response.json()
-                                    week_requests = week_data.get('total_requests', 0)
-                                    week_bytes = week_data.get('total_bytes', 0)
-                                    week_mb = week_data.get('total_mb', 0.0)
-                                else:
-                                    week_requests = today.requests * 7  # 폴백
-                                    week_bytes = today.bytes * 7
-                                    week_mb = today.mb * 7
-                                
-                                # 1달 데이터 조회
-                                month_response = await client.get(f"{MONITOR_BASE_URL}/traffic/{domain}?interval=day&period=30")
-                                if month_response.status_code == 200:
-                                    month_data = month_response.json()
-                                    month_requests = month_data.get('total_requests', 0)
-                                    month_bytes = month_data.get('total_bytes', 0)
-                                    month_mb = month_data.get('total_mb', 0.0)
-                                else:
-                                    month_requests = today.requests * 30  # 폴백
-                                    month_bytes = today.bytes * 30
-                                    month_mb = today.mb * 30
-                                
-                            except Exception as e:
-                                print(f"도메인 {domain} 기간별 데이터 조회 실패: {e}")
-                                # 폴백: 단순 곱셈
-                                week_requests = today.requests * 7
+                            # 1주일 데이터 조회
+                            week_response = await MonitoringService._get(shard_url, f"/traffic/{domain}?interval=day&period=7")
+                            if week_response.status_code == 200:
+                                week_data = week_response.json()
+                                week_requests = week_data.get('total_requests', 0)
+                                week_bytes = week_data.get('total_bytes', 0)
+                                week_mb = week_data.get('total_mb', 0.0)
+                            else:
+                                week_requests = today.requests * 7  # 폴백
                                 week_bytes = today.bytes * 7
                                 week_mb = today.mb * 7
-                                month_requests = today.requests * 30
+                            
+                            # 1달 데이터 조회
+                            month_response = await MonitoringService._get(shard_url, f"/traffic/{domain}?interval=day&period=30")
+                            if month_response.status_code == 200:
+                                month_data = month_response.json()
+                                month_requests = month_data.get('total_requests', 0)
+                                month_bytes = month_data.get('total_bytes', 0)
+                                month_mb = month_data.get('total_mb', 0.0)
+                            else:
+                                month_requests = today.requests * 30  # 폴백
                                 month_bytes = today.bytes * 30
                                 month_mb = today.mb * 30
                             
-                            # week와 month 데이터를 TrafficSummary 객체로 변환
-                            week = TrafficSummary(
-                                requests=week_requests,
-                                bytes=week_bytes,
-                                mb=week_mb
-                            )
-                            
-                            month = TrafficSummary(
-                                requests=month_requests,
-                                bytes=month_bytes,
-                                mb=month_mb
-                            )
-                            
-                            # DomainTrafficStats 객체 생성
-                            domain_stats = DomainTrafficStats(
-                                domain=domain,
-                                today=today,
-                                last_hour=last_hour,
-                                week=week,
-                                month=month
-                            )
-                            
-                            converted_stats.append(domain_stats)
-                            
-                    except Exception as e:
-                        print(f"도메인 통계 변환 실패: {e}")
-                        continue
-                
-                return converted_stats
-                
+                        except Exception as e:
+                            print(f"도메인 {domain} 기간별 데이터 조회 실패: {e}")
+                            # 폴백: 단순 곱셈
+                            week_requests = today.requests * 7
+                            week_bytes = today.bytes * 7
+                            week_mb = today.mb * 7
+                            month_requests = today.requests * 30
+                            month_bytes = today.bytes * 30
+                            month_mb = today.mb * 30
+                        
+                        # week와 month 데이터를 TrafficSummary 객체로 변환
+                        week = TrafficSummary(
+                            requests=week_requests,
+                            bytes=week_bytes,
+                            mb=week_mb
+                        )
+                        
+                        month = TrafficSummary(
+                            requests=month_requests,
+                            bytes=month_bytes,
+                            mb=month_mb
+                        )
+                        
+                        # DomainTrafficStats 객체 생성
+                        domain_stats = DomainTrafficStats(
+                            domain=domain,
+                            today=today,
+                            last_hour=last_hour,
+                            week=week,
+                            month=month
+                        )
+                        
+                        converted_stats.append(domain_stats)
+                        
+                except Exception as e:
+                    print(f"도메인 통계 변환 실패: {e}")
+                    continue
+            
+            return converted_stats
+            
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"트래픽 요약 조회 실패: {e}")
             return []
@@ -188,24 +379,51 @@ class MonitoringService:
     ) -> Optional[TrafficStats]:
         """특정 도메인의 트래픽 통계 조회"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{MONITOR_BASE_URL}/traffic/{domain}?interval={interval}&period={period}"
-                )
-                response.raise_for_status()
-                data = response.json()
-                return TrafficStats(**data)
+            response = await MonitoringService._get(
+                monitor_ring.get(domain),
+                f"/traffic/{domain}?interval={interval}&period={period}",
+                timeout=30.0
+            )
+            response.raise_for_status()
+            data = response.json()
+            return TrafficStats(**data)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"도메인 트래픽 조회 실패: {e}")
             return None
 
     @staticmethod
     async def _sse_stream_from_monitor(domain: Optional[str] = None):
-        """모니터 서버에서 SSE 스트림 수신 - 개선된 버전"""
+        """모니터 서버에서 SSE 스트림 수신 - 도메인별은 담당 샤드, 전체는 모든 샤드 병합"""
+        if domain or len(MONITOR_BASE_URLS) == 1:
+            base_url = monitor_ring.get(domain) if domain else MONITOR_BASE_URLS[0]
+            async for data in MonitoringService._sse_stream_from_shard(base_url, domain):
+                yield data
+            return
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+
+        async def pump(base_url: str):
+            async for data in MonitoringService._sse_stream_from_shard(base_url):
+                await queue.put(data)
+
+        tasks = [asyncio.create_task(pump(base_url)) for base_url in MONITOR_BASE_URLS]
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _sse_stream_from_shard(base_url: str, domain: Optional[str] = None):
+        """로그 서버 하나에서 SSE 스트림 수신 - 개선된 버전"""
         backoff = RECONNECT_BACKOFF
         
         # 도메인별 또는 전체 이벤트 URL 구성
-        events_url = f"{MONITOR_BASE_URL}/events"
+        events_url = f"{base_url}/events"
         if domain:
             events_url += f"?domain={domain}"
             
@@ -243,7 +461,7 @@ class MonitoringService:
                 await asyncio.sleep(1)  # 재연결 전 잠시 대기
                 
             except Exception as e:
-                print(f"SSE 스트림 오류: {e}")
+                print(f"SSE 스트림 오류 ({base_url}): {e}")
                 err = json.dumps({"type": "error", "error": str(e)})
                 yield err
                 await asyncio.sleep(backoff)
@@ -273,24 +491,47 @@ class MonitoringService:
             await asyncio.sleep(0)
 
     @staticmethod
-    async def health_check() -> Dict[str, Any]:
-        """로그 서버 연결 상태 확인"""
+    async def _shard_health(client: httpx.AsyncClient, base_url: str) -> Dict[str, Any]:
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{MONITOR_BASE_URL}/health")
-                response.raise_for_status()
-                return {
-                    "status": "healthy",
-                    "monitor_server": "connected",
-                    "response": response.json()
-                }
+            response = await asyncio.wait_for(client.get(f"{base_url}/health"), 5.0)
+            response.raise_for_status()
+            return {
+                "status": "healthy",
+                "monitor_server": "connected",
+                "response": response.json(),
+                "circuit": monitor_breakers[base_url].snapshot()
+            }
         except Exception as e:
             return {
                 "status": "unhealthy", 
                 "monitor_server": "disconnected",
-                "error": str(e)
+                "error": str(e) or repr(e),
+                "circuit": monitor_breakers[base_url].snapshot()
             }
 
+    @staticmethod
+    async def health_check() -> Dict[str, Any]:
+        """로그 서버 연결 상태 확인 (샤드가 여러 개면 일부 장애 시 degraded)"""
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            results = await asyncio.gather(
+                *(MonitoringService._shard_health(client, base_url) for base_url in MONITOR_BASE_URLS)
+            )
+        if len(results) == 1:
+            return results[0]
+
+        healthy = sum(1 for r in results if r["status"] == "healthy")
+        if healthy == len(results):
+            status, monitor_server = "healthy", "connected"
+        elif healthy:
+            status, monitor_server = "degraded", "partially_connected"
+        else:
+            status, monitor_server = "unhealthy", "disconnected"
+        return {
+            "status": status,
+            "monitor_server": monitor_server,
+            "shards": dict(zip(MONITOR_BASE_URLS, results))
+        }
+
     @staticmethod
     async def calculate_domain_billing(
         domain: str,
@@ -345,10 +586,10 @@ class MonitoringService:
                     current_date += timedelta(days=period)
             
             # GB 단위로 변환 (1GB = 1,073,741,824 bytes)
-            total_traffic_gb = total_bytes / (1024 * 1024 * 1024)
+            total_traffic_gb = total_bytes / BYTES_PER_GB
             
             # 포인트 계산 (1GB당 10,000 포인트)
-            billing_points = math.ceil(total_traffic_gb * 10000)
+            billing_points = bytes_to_billing_points(total_bytes)
             
             # 원화 계산 (1포인트 = 1원)
             billing_amount_krw = billing_points
@@ -0,0 +1,329 @@
+# services/payment_queue.py
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import Row, and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from schema.payment_db import PaymentOrderORM
+from schema.payment_job_db import PaymentConfirmJobORM
+from services.payment_service import PaymentConfirmError, payment_service
+from services.toss_client import toss_client
+
+# 프로세스당 승인 워커 수 (0이면 이 프로세스는 작업만 넣고 처리하지 않음)
+PAYMENT_QUEUE_WORKERS = int(os.getenv("PAYMENT_QUEUE_WORKERS", "4"))
+# 새 작업 알림이 없을 때 DB를 다시 확인하는 주기(초) - 다른 프로세스가 넣은 작업/재시도 시각 도달 확인
+PAYMENT_QUEUE_POLL_INTERVAL = float(os.getenv("PAYMENT_QUEUE_POLL_INTERVAL", "2"))
+# 최대 시도 횟수와 재시도 지수 백오프 시작 간격(초), 이후에는 DEAD(관리자 확인)로 이동
+PAYMENT_QUEUE_MAX_ATTEMPTS = int(os.getenv("PAYMENT_QUEUE_MAX_ATTEMPTS", "6"))
+PAYMENT_QUEUE_RETRY_BACKOFF = float(os.getenv("PAYMENT_QUEUE_RETRY_BACKOFF", "5"))
+PAYMENT_QUEUE_RETRY_BACKOFF_MAX = 600.0
+# 작업 점유 시간(초) - 처리 중 워커가 죽으면 이후 다른 워커가 다시 실행 (토스 재시도 전체 시간보다 길게)
+PAYMENT_QUEUE_LEASE = float(os.getenv("PAYMENT_QUEUE_LEASE", "300"))
+# 종료 시 처리 중인 작업을 기다리는 시간(초) - 넘기면 취소하고 점유 만료 후 다시 실행
+PAYMENT_QUEUE_STOP_GRACE = 5.0
+
+
+class PaymentKeyConflictError(PaymentConfirmError):
+    """이미 다른 결제 키로 작업이 등록된 주문 (성공 리다이렉트는 409)"""
+
+    def __init__(self, order_id: str):
+        super().__init__(f"이미 다른 결제 키로 승인 작업이 등록된 주문입니다: {order_id}", retryable=False)
+
+
+class PaymentConfirmQueue:
+    """DB 기반 결제 승인 작업 큐
+
+    작업 점유는 조건부 UPDATE로 하므로 여러 워커/프로세스가 같은 작업을 동시에 실행하지 않음
+    승인과 포인트 충전이 멱등이라 점유 만료 후 다시 실행되어도 중복 반영되지 않음
+    """
+
+    def __init__(self, workers: int = PAYMENT_QUEUE_WORKERS):
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+
+    async def enqueue(self, db: AsyncSession, payment_key: str, order_id: str, amount: int) -> str:
+        """승인 작업 추가 (같은 주문의 작업이 이미 있으면 기존 작업 ID 반환)
+
+        성공 리다이렉트는 인증 없이 들어오므로 주문 금액/상태를 먼저 확인하고 (틀리면 PaymentConfirmError)
+        기존 작업과 결제 키가 다르면 먼저 등록된 키를 유지하고 PaymentKeyConflictError
+        (토스 조회로 새 키가 이 주문/금액의 결제임이 확인될 때만 교체 - _replace_key)
+        """
+        order = (await db.execute(
+            select(PaymentOrderORM.amount, PaymentOrderORM.status).where(PaymentOrderORM.order_id == order_id)
+        )).first()
+        if order is None:
+            raise PaymentConfirmError(f"주문을 찾을 수 없습니다: {order_id}", retryable=False)
+        if order.amount != amount:
+            raise PaymentConfirmError(f"결제 금액 불일치: 주문 {order.amount}, 요청 {amount}", retryable=False)
+        
+        existing = (await db.execute(
+            select(PaymentConfirmJobORM.id, PaymentConfirmJobORM.payment_key, PaymentConfirmJobORM.status)
+            .where(PaymentConfirmJobORM.order_id == order_id)
+        )).first()
+        if existing is not None:
+            # 성공 페이지 새로고침 등으로 같은 주문이 다시 오면 INSERT 충돌 없이 기존 작업 반환
+            if existing.payment_key != payment_key:
+                await self._replace_key(db, existing, payment_key, order_id, amount)
+            return existing.id
+        if order.status != "READY":
+            raise PaymentConfirmError(f"승인 대기 중인 주문이 아닙니다: {order_id} ({order.status})", retryable=False)
+        now = datetime.utcnow()
+        job = PaymentConfirmJobORM(
+            id=str(uuid.uuid4()),
+            order_id=order_id,
+            payment_key=payment_key,
+            amount=amount,
+            status="PENDING",
+            attempts=0,
+            next_run_at=now,
+            created_at=now,
+            updated_at=now
+        )
+        db.add(job)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            # 동시에 들어온 같은 주문 - 먼저 등록된 키와 다르면 위와 같이 거부
+            existing_key = await db.scalar(
+                select(PaymentConfirmJobORM.payment_key).where(PaymentConfirmJobORM.order_id == order_id)
+            )
+            if existing_key != payment_key:
+                raise PaymentKeyConflictError(order_id)
+            return await db.scalar(select(PaymentConfirmJobORM.id).where(PaymentConfirmJobORM.order_id == order_id))
+        self._wakeup.set()
+        return job.id
+
+    async def _replace_key(self, db: AsyncSession, job: Row, payment_key: str, order_id: str, amount: int) -> None:
+        """다른 결제 키로 다시 온 리다이렉트 처리 (교체할 수 없으면 PaymentKeyConflictError)
+
+        토스 결제 조회로 새 키가 같은 주문 ID/금액의 결제인지 확인된 경우에만, 아직 실행 중이 아닌(PENDING/DEAD) 작업의 키를 교체
+        시도 횟수는 초기화하지 않음 (DEAD 작업은 대기열로 돌아가 한 번 더 실행), 처리 중(RUNNING)/완료 작업은 건드리지 않음
+        """
+        if job.status not in ("PENDING", "DEAD"):
+            raise PaymentKeyConflictError(order_id)
+        # 조회만 한 트랜잭션은 끝내 토스 응답을 기다리는 동안 DB 연결을 잡고 있지 않음
+        await db.rollback()
+        try:
+            response = await toss_client.get_payment(payment_key)
+        except httpx.HTTPError as e:
+            print(f"결제 키 확인 실패 ({e.__class__.__name__}): {order_id}")
+            raise PaymentKeyConflictError(order_id) from e
+        payment = response.json() if response.status_code == 200 else {}
+        if payment.get("orderId") != order_id or payment.get("totalAmount") != amount:
+            raise PaymentKeyConflictError(order_id)
+        
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(PaymentConfirmJobORM)
+            .where(
+                PaymentConfirmJobORM.id == job.id,
+                PaymentConfirmJobORM.payment_key == job.payment_key,
+                PaymentConfirmJobORM.status.in_(("PENDING", "DEAD"))
+            )
+            .values(payment_key=payment_key, status="PENDING", next_run_at=now, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if result.rowcount != 1:
+            # 확인하는 사이 워커가 가져갔거나 다른 요청이 먼저 교체함
+            raise PaymentKeyConflictError(order_id)
+        print(f"결제 키 교체 (토스 조회로 주문/금액 확인): {order_id}")
+        self._wakeup.set()
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            and_(PaymentConfirmJobORM.status == "PENDING", PaymentConfirmJobORM.next_run_at <= now),
+            and_(PaymentConfirmJobORM.status == "RUNNING", PaymentConfirmJobORM.locked_until <= now),
+        )
+
+    async def _claim(self, db: AsyncSession) -> Optional[PaymentConfirmJobORM]:
+        """실행할 작업 하나를 점유 (다른 워커가 먼저 가져간 후보는 건너뜀)"""
+        now = datetime.utcnow()
+        candidates = (await db.scalars(
+            select(PaymentConfirmJobORM.id)
+            .where(self._claimable(now))
+            .order_by(PaymentConfirmJobORM.next_run_at)
+            .limit(max(self.workers, 1))
+        )).all()
+        for job_id in candidates:
+            result = await db.execute(
+                update(PaymentConfirmJobORM)
+                .where(PaymentConfirmJobORM.id == job_id, self._claimable(now))
+                .values(
+                    status="RUNNING",
+                    attempts=PaymentConfirmJobORM.attempts + 1,
+                    locked_until=now + timedelta(seconds=PAYMENT_QUEUE_LEASE),
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if result.rowcount == 1:
+                return await db.scalar(
+                    select(PaymentConfirmJobORM)
+                    .where(PaymentConfirmJobORM.id == job_id)
+                    .execution_options(populate_existing=True)
+                )
+        return None
+
+    async def _finish(self, db: AsyncSession, job: PaymentConfirmJobORM, **values) -> bool:
+        """점유한 작업의 결과 기록 (점유가 만료되어 다른 워커가 다시 가져갔으면 기록하지 않음)"""
+        result = await db.execute(
+            update(PaymentConfirmJobORM)
+            .where(
+                PaymentConfirmJobORM.id == job.id,
+                PaymentConfirmJobORM.status == "RUNNING",
+                PaymentConfirmJobORM.attempts == job.attempts
+            )
+            .values(locked_until=None, updated_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(PAYMENT_QUEUE_RETRY_BACKOFF * (2 ** (attempts - 1)), PAYMENT_QUEUE_RETRY_BACKOFF_MAX)
+
+    async def _run(self, job: PaymentConfirmJobORM) -> None:
+        async with AsyncSessionLocal() as db:
+            try:
+                await payment_service.confirm_order(job.payment_key, job.order_id, job.amount)
+            except Exception as e:
+                retryable = e.retryable if isinstance(e, PaymentConfirmError) else True
+                if retryable and job.attempts < PAYMENT_QUEUE_MAX_ATTEMPTS:
+                    delay = self._retry_delay(job.attempts)
+                    await self._finish(
+                        db, job, status="PENDING", last_error=str(e),
+                        next_run_at=datetime.utcnow() + timedelta(seconds=delay)
+                    )
+                    self.retried += 1
+                    print(f"결제 승인 재시도 예정 ({job.attempts}/{PAYMENT_QUEUE_MAX_ATTEMPTS}, {delay:.0f}초 후): {job.order_id} - {e}")
+                    return
+                if await self._finish(db, job, status="DEAD", last_error=str(e)):
+                    self.dead += 1
+                    print(f"결제 승인 포기 (DEAD): {job.order_id} - {e}")
+                    # 토스 승인은 됐는데 충전을 못 한 주문은 기존 복구 절차(FAILED 주문 목록)로도 보이게 표시
+                    if isinstance(e, PaymentConfirmError) and e.approved:
+                        await payment_service.mark_order_failed(db, job.order_id, job.payment_key)
+                return
+            if await self._finish(db, job, status="DONE", last_error=None):
+                self.succeeded += 1
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            try:
+                async with AsyncSessionLocal() as db:
+                    job = await self._claim(db)
+            except Exception as e:
+                print(f"결제 승인 작업 조회 실패: {e}")
+                job = None
+            if job is None:
+                if self._stopping:
+                    return
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), PAYMENT_QUEUE_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                # 결과 기록 실패 - 점유 만료 후 다시 실행됨
+                print(f"결제 승인 작업 처리 실패: {job.order_id} - {e}")
+
+    def start(self) -> None:
+        """승인 워커 태스크 시작"""
+        self._stopping = False
+        self._tasks = [task for task in self._tasks if not task.done()]
+        for _ in range(self.workers - len(self._tasks)):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        """워커 종료 (대기 중인 워커는 바로 끝나고, 처리 중인 작업은 PAYMENT_QUEUE_STOP_GRACE초까지 기다림)
+
+        DB 작업 도중 취소하면 세션의 연결이 반납되지 않고 남을 수 있어 (aiosqlite는 연결 스레드 때문에 프로세스가 종료되지 않음)
+        먼저 멈춤 신호를 보내고, 시간 안에 끝나지 않은 워커만 취소 - 그 작업은 점유 만료 후 다시 실행
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=PAYMENT_QUEUE_STOP_GRACE)
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._tasks = []
+
+    async def counts(self, db: AsyncSession) -> Dict[str, int]:
+        """상태별 작업 수"""
+        rows = await db.execute(
+            select(PaymentConfirmJobORM.status, func.count()).group_by(PaymentConfirmJobORM.status)
+        )
+        return {status: count for status, count in rows.all()}
+
+    async def list_dead(self, db: AsyncSession, limit: int = 100) -> List[Dict[str, Any]]:
+        """재시도를 포기한 작업 목록 (관리자 확인용)"""
+        jobs = (await db.scalars(
+            select(PaymentConfirmJobORM)
+            .where(PaymentConfirmJobORM.status == "DEAD")
+            .order_by(PaymentConfirmJobORM.updated_at.desc())
+            .limit(limit)
+        )).all()
+        return [
+            {
+                "job_id": job.id,
+                "order_id": job.order_id,
+                "payment_key": job.payment_key,
+                "amount": job.amount,
+                "attempts": job.attempts,
+                "last_error": job.last_error,
+                "created_at": job.created_at.isoformat() if job.created_at else None,
+                "updated_at": job.updated_at.isoformat() if job.updated_at else None
+            }
+            for job in jobs
+        ]
+
+    async def retry(self, db: AsyncSession, job_id: str) -> bool:
+        """DEAD 작업을 다시 대기열로 (시도 횟수 초기화)"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(PaymentConfirmJobORM)
+            .where(PaymentConfirmJobORM.id == job_id, PaymentConfirmJobORM.status == "DEAD")
+            .values(status="PENDING", attempts=0, next_run_at=now, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if result.rowcount == 1:
+            self._wakeup.set()
+            return True
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "workers": len([task for task in self._tasks if not task.done()]),
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead": self.dead,
+        }
+
+
+# 전역 인스턴스
+payment_queue = PaymentConfirmQueue()
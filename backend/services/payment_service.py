@@ -1,17 +1,23 @@
+import asyncio
+import base64
 import os
-import requests
 import uuid
-import base64
 from datetime import datetime
-from typing import Optional
-from sqlalchemy.orm import Session
+from typing import AsyncIterator, Dict, Optional, Tuple
+import httpx
+from sqlalchemy import func, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, init_engines
 from schema.user import User
 from schema.payment_db import PaymentOrderORM
-from dotenv import load_dotenv
+from schema.point_ledger_db import PointLedgerORM
+from services.user_cache import user_cache
+from services.toss_client import RETRY_STATUS_CODES, toss_client
 
-from schema.payment import PaymentPrepareRequest, PaymentPrepareResponse, PaymentOrder, UserBalance, DeductPointsRequest
+from schema.payment import PaymentPrepareRequest, PaymentPrepareResponse, PaymentOrder, PaymentHistoryPage, UserBalance, DeductPointsRequest
 
-load_dotenv(os.path.join(os.path.dirname(__file__), '../config', '.env'))
+import settings  # noqa: F401 .env 로드
 
 # 환경변수에서 직접 설정 로드
 TOSS_CLIENT_KEY = os.getenv("TOSS_CLIENT_KEY")
@@ -20,6 +26,14 @@ TOSS_API_URL = os.getenv("TOSS_API_URL")
 
 # 메모리 저장소 제거: DB 사용
 
+class PaymentConfirmError(Exception):
+    """결제 승인 실패 (retryable: 다시 시도하면 성공할 수 있음, approved: 토스 승인은 끝남)"""
+
+    def __init__(self, message: str, retryable: bool, approved: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+        self.approved = approved
+
 class PaymentService:
     """결제 관련 비즈니스 로직을 처리하는 서비스 클래스"""
     
@@ -27,8 +41,12 @@ class PaymentService:
         self.toss_api_url = TOSS_API_URL
         self.toss_client_key = TOSS_CLIENT_KEY
         self.toss_secret_key = TOSS_SECRET_KEY
+        # (주문 ID, 결제 키, 금액) -> 진행 중인 승인 작업 (동시 중복 요청은 같은 작업을 기다림)
+        self._confirming: Dict[Tuple[str, str, int], asyncio.Task] = {}
+        self.confirm_deduplicated = 0
+        self.confirm_short_circuited = 0
     
-    async def prepare_payment(self, db: Session, user_id: str, request: PaymentPrepareRequest) -> PaymentPrepareResponse:
+    async def prepare_payment(self, db: AsyncSession, user_id: str, request: PaymentPrepareRequest) -> PaymentPrepareResponse:
         """결제 준비 로직"""
         try:
             # 주문 ID 생성
@@ -44,7 +62,7 @@ class PaymentService:
                 created_at=datetime.utcnow()
             )
             db.add(orm)
-            db.commit()
+            await db.commit()
             
             return PaymentPrepareResponse(
                 orderId=order_id,
@@ -55,92 +73,118 @@ class PaymentService:
         except Exception as e:
             raise Exception(f"결제 준비 중 오류가 발생했습니다: {str(e)}")
     
-    async def confirm_payment(self, db: Session, payment_key: str, order_id: str, amount: int) -> bool:
-        """토스 페이먼츠 API를 통한 결제 승인"""
+    async def confirm_order(self, payment_key: str, order_id: str, amount: int) -> None:
+        """토스 결제 승인 + 포인트 충전 (실패하면 재시도 가능 여부를 담은 PaymentConfirmError)
+
+        같은 주문/결제 키/금액의 승인이 이 프로세스에서 진행 중이면 새로 시작하지 않고 그 결과를 함께 기다림
+        (공유 작업은 자체 DB 세션을 쓰므로 먼저 부른 쪽이 취소되어도 끝까지 진행)
+        결제 키나 금액이 다른 요청은 합치지 않고 따로 검증/승인 - 충전은 원장 키로 주문당 1회
+        """
+        key = (order_id, payment_key, amount)
+        task = self._confirming.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._confirm_order(payment_key, order_id, amount))
+            self._confirming[key] = task
+            task.add_done_callback(lambda _: self._confirming.pop(key, None))
+        else:
+            self.confirm_deduplicated += 1
+        await asyncio.shield(task)
+    
+    async def _confirm_order(self, payment_key: str, order_id: str, amount: int) -> None:
+        """주문 확인 -> 토스 승인 -> 충전/상태 변경 (토스 응답을 기다리는 동안은 DB 연결을 잡고 있지 않음)"""
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            db_order = (await db.execute(
+                select(PaymentOrderORM.user_id, PaymentOrderORM.amount, PaymentOrderORM.status)
+                .where(PaymentOrderORM.order_id == order_id)
+            )).first()
+        if db_order is None:
+            raise PaymentConfirmError(f"주문을 찾을 수 없습니다: {order_id}", retryable=False)
+        if db_order.status == "DONE":
+            # 이미 승인/충전 완료 (성공 페이지 새로고침 등) - 토스를 다시 호출하지 않음
+            self.confirm_short_circuited += 1
+            return
+        if db_order.amount != amount:
+            raise PaymentConfirmError(f"결제 금액 불일치: 주문 {db_order.amount}, 요청 {amount}", retryable=False)
+        user_id = db_order.user_id
+        
+        # 토스 페이먼츠 API 호출 (비동기, 일시 오류는 멱등 키로 재시도)
         try:
-            # 인증 헤더 생성
-            auth_string = base64.b64encode(f"{self.toss_secret_key}:".encode()).decode()
-            
-            headers = {
-                "Authorization": f"Basic {auth_string}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "paymentKey": payment_key,
-                "orderId": order_id,
-                "amount": amount
-            }
-            
-            # 토스 페이먼츠 API 호출
-            response = requests.post(
-                f"{self.toss_api_url}/confirm",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                
-                # 주문 조회 및 사용자 식별
-                db_order = db.query(PaymentOrderORM).filter(PaymentOrderORM.order_id == order_id).first()
-                if db_order:
-                    
-                    # 포인트 충전 시도 (최대 3회)
-                    max_retries = 3
-                    for attempt in range(max_retries):
-                        try:
-                            # 결제 성공 시 포인트 충전 (DB)
-                            await self.add_user_points(db, db_order.user_id, amount)
-                            
-                            # 주문 상태 업데이트 (DB)
-                            db_order.status = "DONE"
-                            db_order.payment_key = payment_key
-                            db_order.approved_at = datetime.utcnow()
-                            db.commit()
-                            
-                            return True
-                        except Exception as e:
-                            db.rollback()
-                            
-                            if attempt == max_retries - 1:
-                                # 주문 상태를 FAILED로 설정
-                                db_order.status = "FAILED"
-                                db_order.payment_key = payment_key
-                                db.commit()
-                                return False
-                            else:
-                                import time
-                                time.sleep(1)  # 1초 대기 후 재시도
-                else:
-                    return False
-            else:
-                # 결제 실패 로그
-                error_data = response.json() if response.content else {}
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            return False
-        except Exception as e:
-            return False
+            response = await toss_client.confirm(payment_key, order_id, amount)
+            if response.status_code != 200:
+                await self._check_confirm_response(response, payment_key, order_id, amount)
+        except httpx.HTTPError as e:
+            raise PaymentConfirmError(f"토스 승인 요청 실패: {e.__class__.__name__}", retryable=True) from e
+        
+        async with AsyncSessionLocal() as db:
+            try:
+                # 포인트 충전(원장 키로 주문당 1회)과 주문 상태 변경(DONE이 아닐 때만)을 한 트랜잭션으로 반영
+                # (그 사이 다른 승인이 먼저 끝냈으면 원장 키로 충전을 건너뛰고 상태도 그대로)
+                balance = await self._apply_points(
+                    db, user_id, amount, "charge", idempotency_key=f"order:{order_id}", reference=order_id, commit=False
+                )
+                if balance is None:
+                    raise Exception("사용자를 찾을 수 없습니다")
+                await db.execute(
+                    update(PaymentOrderORM)
+                    .where(PaymentOrderORM.order_id == order_id, PaymentOrderORM.status != "DONE")
+                    .values(status="DONE", payment_key=payment_key, approved_at=datetime.utcnow())
+                )
+                await db.commit()
+                user_cache.invalidate(user_id)
+            except Exception as e:
+                await db.rollback()
+                raise PaymentConfirmError(f"포인트 충전 실패: {e}", retryable=True, approved=True) from e
     
-    async def get_user_balance(self, db: Session, user_id: str) -> UserBalance:
+    async def _check_confirm_response(self, response: httpx.Response, payment_key: str, order_id: str, amount: int) -> None:
+        """승인 실패 응답 확인 (이미 승인된 결제면 조회로 주문/금액을 검증한 뒤 승인된 것으로 처리)"""
+        try:
+            error_data = response.json() if response.content else {}
+        except ValueError:
+            error_data = {}
+        if error_data.get("code") == "ALREADY_PROCESSED_PAYMENT":
+            payment = await toss_client.get_payment(payment_key)
+            data = payment.json() if payment.status_code == 200 else {}
+            if data.get("orderId") == order_id and data.get("status") == "DONE" and data.get("totalAmount") == amount:
+                return
+        raise PaymentConfirmError(
+            f"토스 승인 실패 ({response.status_code} {error_data.get('code')}): {error_data.get('message')}",
+            retryable=response.status_code in RETRY_STATUS_CODES
+        )
+    
+    def confirm_stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._confirming),
+            "deduplicated": self.confirm_deduplicated,
+            "already_done": self.confirm_short_circuited,
+        }
+    
+    async def mark_order_failed(self, db: AsyncSession, order_id: str, payment_key: str) -> None:
+        """승인됐지만 포인트 충전을 끝내지 못한 주문을 FAILED로 표시 (관리자 복구 대상)"""
+        await db.execute(
+            update(PaymentOrderORM)
+            .where(PaymentOrderORM.order_id == order_id, PaymentOrderORM.status != "DONE")
+            .values(status="FAILED", payment_key=payment_key)
+        )
+        await db.commit()
+    
+    async def get_user_balance(self, db: AsyncSession, user_id: str) -> UserBalance:
         """사용자 포인트 잔액 조회"""
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.scalar(select(User).where(User.id == user_id))
         
         if not user:
             raise Exception("사용자를 찾을 수 없습니다")
         
         # remaining_points가 None인 경우 데이터베이스에서 직접 업데이트
         if user.remaining_points is None:
-            from sqlalchemy import text
             update_query = text("UPDATE users SET remaining_points = 0 WHERE id = :user_id")
-            db.execute(update_query, {"user_id": user_id})
-            db.commit()
+            await db.execute(update_query, {"user_id": user_id})
+            await db.commit()
+            user_cache.invalidate(user_id)
             
             # 사용자 객체 새로고침
-            db.refresh(user)
+            await db.refresh(user)
         
         # remaining_points가 None인 경우 0으로 처리
         balance = user.remaining_points if user.remaining_points is not None else 0
@@ -154,99 +198,177 @@ class PaymentService:
         result = UserBalance(balance=balance_int)
         return result
     
-    async def add_user_points(self, db: Session, user_id: str, amount: int) -> None:
-        """사용자 포인트 추가"""
-        try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if user.remaining_points is None:
-                from sqlalchemy import text
-                update_query = text("UPDATE users SET remaining_points = 0 WHERE id = :user_id")
-                db.execute(update_query, {"user_id": user_id})
-                db.commit()
-                db.refresh(user)
-            
-            current_points = user.remaining_points if user.remaining_points is not None else 0
-            
-            new_points = current_points + amount
-            user.remaining_points = new_points
+    async def _apply_points(self, db: AsyncSession, user_id: str, delta: int, reason: str,
+                            idempotency_key: Optional[str] = None, reference: Optional[str] = None,
+                            commit: bool = True) -> Optional[int]:
+        """포인트 증감을 조건부 UPDATE 1회 + 원장 기록으로 한 트랜잭션에 반영 (파이썬에서 읽고 쓰지 않음)
 
-            db.commit()
-            
+        반영 후 잔액을 반환하고, 사용자가 없거나 차감할 잔액이 부족하면 None
+        같은 idempotency_key로 이미 반영된 요청이면 다시 반영하지 않고 당시 잔액을 반환
+        commit=False면 flush까지만 하고 커밋은 호출 측에서 (다른 변경과 같은 트랜잭션으로 묶을 때)
+        """
+        if idempotency_key is not None:
+            entry = await db.scalar(select(PointLedgerORM).where(PointLedgerORM.idempotency_key == idempotency_key))
+            if entry is not None:
+                return entry.balance_after
+        
+        balance = func.coalesce(User.remaining_points, 0)
+        statement = update(User).where(User.id == user_id).values(remaining_points=balance + delta)
+        if delta < 0:
+            statement = statement.where(balance >= -delta)
+        # 세션에 로드된 User 객체는 갱신하지 않음 - 잔액은 반환값이나 새 조회로 확인
+        result = await db.execute(statement.execution_options(synchronize_session=False))
+        if result.rowcount != 1:
+            if idempotency_key is not None and commit:
+                # 같은 키의 동시 요청이 먼저 반영해 잔액이 부족해졌을 수 있음 - 새 트랜잭션에서 원장을 다시 확인
+                await db.rollback()
+                entry = await db.scalar(select(PointLedgerORM).where(PointLedgerORM.idempotency_key == idempotency_key))
+                return entry.balance_after if entry else None
+            return None
+        
+        balance_after = await db.scalar(select(User.remaining_points).where(User.id == user_id))
+        db.add(PointLedgerORM(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            delta=delta,
+            balance_after=balance_after,
+            reason=reason,
+            reference=reference,
+            idempotency_key=idempotency_key,
+            created_at=datetime.utcnow()
+        ))
+        try:
+            if commit:
+                await db.commit()
+            else:
+                await db.flush()
+        except IntegrityError:
+            # 같은 키의 동시 요청이 먼저 커밋됨 - 이번 UPDATE는 함께 롤백
+            await db.rollback()
+            if idempotency_key is None:
+                raise
+            entry = await db.scalar(select(PointLedgerORM).where(PointLedgerORM.idempotency_key == idempotency_key))
+            return entry.balance_after if entry else None
+        if commit:
+            user_cache.invalidate(user_id)
+        return balance_after
+    
+    async def add_user_points(self, db: AsyncSession, user_id: str, amount: int, reason: str = "charge",
+                              idempotency_key: Optional[str] = None, reference: Optional[str] = None) -> int:
+        """사용자 포인트 추가 (반영 후 잔액 반환)"""
+        if amount <= 0:
+            raise Exception(f"포인트 추가 실패: 잘못된 금액 {amount}")
+        try:
+            balance = await self._apply_points(db, user_id, amount, reason, idempotency_key, reference)
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"포인트 추가 실패: {str(e)}")
+        if balance is None:
+            raise Exception("포인트 추가 실패: 사용자를 찾을 수 없습니다")
+        return balance
     
-    async def deduct_user_points(self, db: Session, user_id: str, amount: int) -> bool:
-        """사용자 포인트 차감"""
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+    async def deduct_user_points(self, db: AsyncSession, user_id: str, amount: int,
+                                 idempotency_key: Optional[str] = None, reference: Optional[str] = None) -> bool:
+        """사용자 포인트 차감 (잔액이 부족하거나 사용자가 없으면 False)"""
+        if amount <= 0:
             return False
-        
-        # remaining_points가 None인 경우 0으로 처리
-        current_points = user.remaining_points if user.remaining_points is not None else 0
-        if current_points < amount:
-            return False
-        
-        user.remaining_points = current_points - amount
-        db.commit()
-        return True
+        balance = await self._apply_points(db, user_id, -amount, "deduct", idempotency_key, reference)
+        return balance is not None
     
-    async def get_payment_order(self, db: Session, order_id: str) -> Optional[PaymentOrder]:
+    @staticmethod
+    def _order_model(row) -> PaymentOrder:
+        return PaymentOrder(
+            orderId=row.order_id,
+            amount=row.amount,
+            orderName=row.order_name,
+            status=row.status,
+            createdAt=row.created_at.isoformat() if row.created_at else None,
+            paymentKey=row.payment_key,
+            approvedAt=row.approved_at.isoformat() if row.approved_at else None
+        )
+    
+    async def get_payment_order(self, db: AsyncSession, order_id: str) -> Optional[PaymentOrder]:
         """주문 정보 조회"""
-        orm = db.query(PaymentOrderORM).filter(PaymentOrderORM.order_id == order_id).first()
+        orm = await db.scalar(select(PaymentOrderORM).where(PaymentOrderORM.order_id == order_id))
         if not orm:
             return None
-        return PaymentOrder(
-            orderId=orm.order_id,
-            amount=orm.amount,
-            orderName=orm.order_name,
-            status=orm.status,
-            createdAt=orm.created_at.isoformat() if orm.created_at else None,
-            paymentKey=orm.payment_key,
-            approvedAt=orm.approved_at.isoformat() if orm.approved_at else None
+        return self._order_model(orm)
+    
+    @staticmethod
+    def _encode_history_cursor(created_at: datetime, row_id: str) -> str:
+        return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def _decode_history_cursor(cursor: str) -> Tuple[datetime, str]:
+        """잘못된 cursor면 ValueError"""
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, _, row_id = raw.partition("|")
+        if not row_id:
+            raise ValueError("잘못된 cursor")
+        return datetime.fromisoformat(created_at), row_id
+    
+    async def get_payment_history(self, db: AsyncSession, user_id: str, limit: int = 20,
+                                  cursor: Optional[str] = None) -> PaymentHistoryPage:
+        """사용자 결제 내역 조회 (최신순 키셋 페이지네이션)
+
+        (user_id, created_at, id) 인덱스 범위를 cursor 위치부터 limit+1개만 읽으므로 페이지가 뒤로 가도 비용이 같음
+        """
+        statement = (
+            select(
+                PaymentOrderORM.id,
+                PaymentOrderORM.order_id,
+                PaymentOrderORM.amount,
+                PaymentOrderORM.order_name,
+                PaymentOrderORM.status,
+                PaymentOrderORM.created_at,
+                PaymentOrderORM.payment_key,
+                PaymentOrderORM.approved_at
+            )
+            .where(PaymentOrderORM.user_id == user_id)
+            .order_by(PaymentOrderORM.created_at.desc(), PaymentOrderORM.id.desc())
+            .limit(limit + 1)
         )
+        if cursor:
+            created_at, row_id = self._decode_history_cursor(cursor)
+            # created_at <= 조건으로 인덱스 범위 탐색, 같은 시각은 id로 이어서
+            statement = statement.where(
+                PaymentOrderORM.created_at <= created_at,
+                or_(PaymentOrderORM.created_at < created_at, PaymentOrderORM.id < row_id)
+            )
+        rows = (await db.execute(statement)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = self._encode_history_cursor(last.created_at, last.id)
+        return PaymentHistoryPage(items=[self._order_model(row) for row in rows[:limit]], nextCursor=next_cursor)
     
-    async def get_payment_history(self, db: Session, user_id: str) -> list:
-        """사용자 결제 내역 조회"""
-        rows = db.query(PaymentOrderORM).filter(PaymentOrderORM.user_id == user_id).order_by(PaymentOrderORM.created_at.desc()).all()
-        return [PaymentOrder(
-            orderId=r.order_id,
-            amount=r.amount,
-            orderName=r.order_name,
-            status=r.status,
-            createdAt=r.created_at.isoformat() if r.created_at else None,
-            paymentKey=r.payment_key,
-            approvedAt=r.approved_at.isoformat() if r.approved_at else None
-        ) for r in rows]
+    async def stream_payment_history(self, user_id: str, batch_size: int = 500) -> AsyncIterator[PaymentOrder]:
+        """전체 결제 내역을 최신순으로 이어서 반환 (내보내기용 - 페이지마다 DB 연결을 잠깐만 사용)"""
+        cursor = None
+        while True:
+            async with AsyncSessionLocal() as db:
+                page = await self.get_payment_history(db, user_id, batch_size, cursor)
+            for item in page.items:
+                yield item
+            if page.nextCursor is None:
+                return
+            cursor = page.nextCursor
     
-    async def cancel_payment(self, db: Session, user_id: str, payment_key: str, cancel_reason: str) -> bool:
+    async def cancel_payment(self, db: AsyncSession, user_id: str, payment_key: str, cancel_reason: str) -> bool:
         """결제 취소"""
         try:
-            auth_string = base64.b64encode(f"{self.toss_secret_key}:".encode()).decode()
-            
-            headers = {
-                "Authorization": f"Basic {auth_string}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "cancelReason": cancel_reason
-            }
-            
-            response = requests.post(
-                f"{self.toss_api_url}/{payment_key}/cancel",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
+            response = await toss_client.cancel(payment_key, cancel_reason)
             
             if response.status_code == 200:
-                db_order = db.query(PaymentOrderORM).filter(PaymentOrderORM.payment_key == payment_key).first()
+                db_order = await db.scalar(select(PaymentOrderORM).where(PaymentOrderORM.payment_key == payment_key))
                 if db_order:
                     db_order.status = "CANCELLED"
-                    db.commit()
+                    await db.commit()
                     # 포인트 환불
-                    await self.deduct_user_points(db, user_id, -db_order.amount)  # 환불은 마이너스 차감 = 추가
+                    await self.add_user_points(
+                        db, user_id, db_order.amount, reason="refund",
+                        idempotency_key=f"cancel:{payment_key}", reference=db_order.order_id
+                    )
                 
                 return True
             else:
@@ -258,3 +380,61 @@ class PaymentService:
 
 # 싱글톤 인스턴스
 payment_service = PaymentService()
+
+
+if __name__ == "__main__":
+    # 동시 포인트 차감 확인: python -m services.payment_service
+    # (임시 SQLite 파일을 aiosqlite로 사용 - 외부 DB/토스 호출 없음)
+    import tempfile
+    from collections import Counter
+
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from database import Base
+
+    START_BALANCE = 2000
+    AMOUNT = 100
+    SHARED_KEYS = 30  # 키마다 같은 요청 2번 (재시도/중복 클릭)
+    KEYLESS = 20
+
+    async def _main(path: str) -> None:
+        # 쓰기가 직렬화되므로 잠금 대기를 넉넉히, WAL로 읽기가 커밋을 막지 않게
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30})
+        event.listen(engine.sync_engine, "connect", lambda conn, _: conn.execute("PRAGMA journal_mode=WAL"))
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+        service = PaymentService()
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with sessions() as db:
+                db.add(User(id="user-1", email="user-1@example.com", name="check", remaining_points=START_BALANCE))
+                await db.commit()
+
+            async def deduct(key: Optional[str]) -> bool:
+                async with sessions() as db:
+                    return await service.deduct_user_points(db, "user-1", AMOUNT, idempotency_key=key, reference="check")
+
+            keys = [f"deduct:{i}" for i in range(SHARED_KEYS)] * 2 + [None] * KEYLESS
+            results = await asyncio.gather(*(deduct(key) for key in keys))
+
+            async with sessions() as db:
+                balance = await db.scalar(select(User.remaining_points).where(User.id == "user-1"))
+                entries = (await db.scalars(select(PointLedgerORM))).all()
+            applied = Counter(entry.idempotency_key for entry in entries if entry.idempotency_key)
+            # 잔액은 어느 시점에도 음수가 아님 (원장에 모든 변경 후 잔액이 남음)
+            assert min(entry.balance_after for entry in entries) >= 0 and balance >= 0
+            assert balance == START_BALANCE + sum(entry.delta for entry in entries)
+            assert len(entries) == START_BALANCE // AMOUNT and balance == 0, (len(entries), balance)
+            # 키마다 최대 1회 반영, 같은 키의 두 요청은 같은 결과
+            assert max(applied.values()) == 1
+            for i in range(SHARED_KEYS):
+                first, second = results[i], results[SHARED_KEYS + i]
+                assert first == second == (f"deduct:{i}" in applied), (i, first, second)
+            print(f"차감 요청 {len(keys)}건 (키 {SHARED_KEYS}개 x2, 키 없음 {KEYLESS}건): "
+                  f"성공 {sum(results)}건, 반영 {len(entries)}건 (키 {len(applied)}개 각 1회), 최종 잔액 {balance}")
+        finally:
+            await engine.dispose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_main(f"{tmp}/points.db"))
@@ -0,0 +1,164 @@
+# services/pool_metrics.py
+import bisect
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool
+
+# 체크아웃 대기 시간(ms) / 연결 수명(초) 히스토그램 버킷 상한
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LIFETIME_BUCKETS_S = (1, 10, 60, 300, 900, 1800, 3600, 7200)
+
+
+class Histogram:
+    """고정 버킷 히스토그램 (마지막 버킷은 +Inf)"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """버킷 상한 기준 근사 백분위수"""
+        if not self.count:
+            return None
+        rank = self.count * percentile / 100
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": round(self.max, 3),
+            "buckets": buckets,
+        }
+
+
+class PoolMetrics:
+    """커넥션 풀 이벤트 계측 (체크아웃 대기, 사용 중 연결 수, 오버플로, 연결 수명)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.pool: Optional[Pool] = None
+        self.checkout_wait_ms = Histogram(WAIT_BUCKETS_MS)
+        self.connection_lifetime_s = Histogram(LIFETIME_BUCKETS_S)
+        self.in_use = 0
+        self.max_in_use = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.invalidations = 0
+
+    def pool_class(self, base: Type[Pool]) -> Type[Pool]:
+        """체크아웃 대기 시간을 측정하는 풀 클래스 (풀 재생성 시에도 유지)"""
+        metrics = self
+
+        class InstrumentedPool(base):
+            def _do_get(self):
+                # 공개 이벤트에는 체크아웃 '시도' 시점이 없어 풀 내부 획득 구간을 직접 측정
+                metrics.pool = self  # dispose() 후 재생성된 풀 추적
+                started = time.perf_counter()
+                try:
+                    return super()._do_get()
+                except exc.TimeoutError:
+                    metrics.record_timeout()
+                    raise
+                finally:
+                    metrics.record_wait((time.perf_counter() - started) * 1000)
+
+        InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+        return InstrumentedPool
+
+    def record_wait(self, wait_ms: float) -> None:
+        with self._lock:
+            self.checkout_wait_ms.observe(wait_ms)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def attach(self, pool: Pool) -> None:
+        """풀 이벤트 리스너 등록"""
+        self.pool = pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "close", self._on_close)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        connection_record.info["connected_at"] = time.monotonic()
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        size = self.pool.size() if self.pool is not None and hasattr(self.pool, "size") else None
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            if self.in_use > self.max_in_use:
+                self.max_in_use = self.in_use
+            # pool_size를 넘어 오버플로 연결을 사용하게 된 체크아웃
+            if size is not None and self.in_use > size:
+                self.overflow_checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def _on_close(self, dbapi_connection, connection_record) -> None:
+        connected_at = connection_record.info.pop("connected_at", None)
+        if connected_at is not None:
+            with self._lock:
+                self.connection_lifetime_s.observe(time.monotonic() - connected_at)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool: Dict[str, Any] = {}
+        if self.pool is not None and hasattr(self.pool, "checkedout"):
+            pool = {
+                "size": self.pool.size(),
+                "checked_out": self.pool.checkedout(),
+                "checked_in": self.pool.checkedin(),
+                "overflow": self.pool.overflow(),
+            }
+        with self._lock:
+            return {
+                "name": self.name,
+                "pool": pool,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "checkout_wait_ms": self.checkout_wait_ms.snapshot(),
+                "connection_lifetime_s": self.connection_lifetime_s.snapshot(),
+            }
@@ -1,14 +1,11 @@
+import asyncio
+import importlib
 import os
-import requests
-import cloudflare
-from cloudflare import APIError
 from typing import Optional
-from dotenv import load_dotenv
 
 from models.proxy_and_waf import SubdomainRegisterRequest, SubdomainUnregisterRequest, WAFResponse
 
-# .env 파일 경로를 명시적으로 지정
-load_dotenv(os.path.join(os.path.dirname(__file__), '../config', '.env'))
+import settings  # noqa: F401 .env 로드
 
 class WAFService:
     """WAF 자동화 관련 비즈니스 로직을 처리하는 서비스 클래스"""
@@ -20,15 +17,44 @@ class WAFService:
         self.base_domain = os.getenv("BASE_DOMAIN")
         self.waf_server_ip = os.getenv("WAF_SERVER_IP")
         
-        # Cloudflare 클라이언트 초기화
-        self.cf = None
+        # Cloudflare 클라이언트는 처음 사용할 때 생성
+        self._cf = None
+        self._cf_initialized = False
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    def _import_sdks(self) -> None:
+        importlib.import_module("requests")
         if self.cloudflare_api_token:
-            try:
-                self.cf = cloudflare.Cloudflare(api_token=self.cloudflare_api_token)
-            except Exception as e:
-                print(f"Cloudflare 클라이언트 초기화 실패: {e}")
-        else:
-            print("경고: CLOUDFLARE_API_TOKEN이 설정되지 않았습니다.")
+            importlib.import_module("cloudflare")
+
+    def start_warm_up(self) -> None:
+        """기동 후 Cloudflare SDK/requests를 스레드에서 미리 import (첫 요청이 이벤트 루프에서 수 초 import 하지 않도록)"""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(asyncio.to_thread(self._import_sdks))
+
+    async def _ensure_sdks(self) -> None:
+        """SDK import 완료 대기 (미리 로드가 끝나지 않았으면 스레드에서 마저 기다림)"""
+        self.start_warm_up()
+        try:
+            await asyncio.shield(self._warm_up_task)
+        except Exception as e:
+            print(f"SDK 로드 실패: {e}")
+    
+    @property
+    def cf(self):
+        """Cloudflare 클라이언트 (최초 접근 시 초기화, 토큰이 없거나 실패하면 None)"""
+        if not self._cf_initialized:
+            self._cf_initialized = True
+            if self.cloudflare_api_token:
+                try:
+                    # Cloudflare SDK는 import만 수 초 걸려 기동 후 start_warm_up()에서 로드
+                    import cloudflare
+                    self._cf = cloudflare.Cloudflare(api_token=self.cloudflare_api_token)
+                except Exception as e:
+                    print(f"Cloudflare 클라이언트 초기화 실패: {e}")
+            else:
+                print("경고: CLOUDFLARE_API_TOKEN이 설정되지 않았습니다.")
+        return self._cf
     
     def _validate_settings(self) -> bool:
         """필수 설정값 검증"""
@@ -60,6 +86,7 @@ class WAFService:
         if not self.waf_server_ip:
             return {"status": "warning", "message": "WAF 서버 IP가 설정되지 않았습니다."}
         
+        import requests
         try:
             if action == "register":
                 url = f"http://{self.waf_server_ip}/manage?action=register&host={host}&target={target}&waf={waf}"
@@ -76,9 +103,11 @@ class WAFService:
     
     async def register_subdomain(self, request: SubdomainRegisterRequest) -> WAFResponse:
         """서브도메인을 Cloudflare에 등록하고 WAF 서버에 알립니다."""
+        await self._ensure_sdks()
         # 설정 검증
         if not self._validate_settings() or not self.cf:
             raise Exception("Cloudflare 설정이 올바르지 않습니다.")
+        from cloudflare import APIError
         
         full_domain = f"{request.subdomain}.{self.base_domain}"
         
@@ -115,9 +144,11 @@ class WAFService:
     
     async def unregister_subdomain(self, request: SubdomainUnregisterRequest) -> WAFResponse:
         """Cloudflare에서 서브도메인을 삭제하고 WAF 서버에 알립니다."""
+        await self._ensure_sdks()
         # 설정 검증
         if not self._validate_settings() or not self.cf:
             raise Exception("Cloudflare 설정이 올바르지 않습니다.")
+        from cloudflare import APIError
         
         full_domain = f"{request.subdomain}.{self.base_domain}"
         
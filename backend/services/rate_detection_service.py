@@ -0,0 +1,230 @@
+# services/rate_detection_service.py
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from models.log_record import LogRecord
+from models.monitoring import AttackAlert
+from services.monitor_stream import log_domain, monitor_event_stream
+
+# 감지 윈도우: RATE_BUCKET_SECONDS 초 버킷 RATE_WINDOW_BUCKETS 개 (기본 60초)
+RATE_BUCKET_SECONDS = int(os.getenv("RATE_BUCKET_SECONDS", "5"))
+RATE_WINDOW_BUCKETS = int(os.getenv("RATE_WINDOW_BUCKETS", "12"))
+# 기준선 윈도우: 60초 버킷 RATE_BASELINE_BUCKETS 개 (기본 1시간)
+RATE_BASELINE_BUCKETS = int(os.getenv("RATE_BASELINE_BUCKETS", "60"))
+# 감지 임계값
+RATE_SPIKE_FACTOR = float(os.getenv("RATE_SPIKE_FACTOR", "3.0"))
+RATE_MIN_REQUESTS = int(os.getenv("RATE_MIN_REQUESTS", "100"))
+RATE_BLOCK_RATIO = float(os.getenv("RATE_BLOCK_RATIO", "0.3"))
+RATE_ERROR_RATIO = float(os.getenv("RATE_ERROR_RATIO", "0.3"))
+RATE_IP_THRESHOLD = int(os.getenv("RATE_IP_THRESHOLD", "300"))
+# 도메인당 추적할 최대 클라이언트 IP 수 (초과 시 가장 오래 전에 본 IP부터 제거)
+RATE_MAX_IPS_PER_DOMAIN = int(os.getenv("RATE_MAX_IPS_PER_DOMAIN", "5000"))
+# 같은 종류의 알림 재발송 최소 간격(초)
+RATE_ALERT_COOLDOWN = float(os.getenv("RATE_ALERT_COOLDOWN", "60"))
+# 도메인별 보관할 최근 알림 수
+RATE_RECENT_ALERTS = 50
+# 유휴 도메인 상태 정리 주기 (처리한 로그 건수 기준)
+RATE_PRUNE_EVERY = 10000
+
+BLOCK_ACTIONS = {"block", "blocked", "deny", "denied", "drop", "reject"}
+STATUS_CLASSES = ("2xx", "3xx", "4xx", "5xx")
+
+
+class RingCounter:
+    """고정 크기 링 버킷 기반 슬라이딩 윈도우 카운터"""
+
+    __slots__ = ("width", "buckets", "head", "total")
+
+    def __init__(self, size: int, width: int):
+        self.width = width
+        self.buckets = [0] * size
+        self.head: Optional[int] = None  # 마지막으로 기록한 버킷의 절대 인덱스
+        self.total = 0
+
+    def _advance(self, index: int) -> None:
+        if self.head is None:
+            self.head = index
+            return
+        gap = index - self.head
+        if gap <= 0:
+            return
+        size = len(self.buckets)
+        if gap >= size:
+            for i in range(size):
+                self.buckets[i] = 0
+            self.total = 0
+        else:
+            for i in range(1, gap + 1):
+                pos = (self.head + i) % size
+                self.total -= self.buckets[pos]
+                self.buckets[pos] = 0
+        self.head = index
+
+    def add(self, now: float, amount: int = 1) -> None:
+        index = int(now // self.width)
+        self._advance(index)
+        self.buckets[index % len(self.buckets)] += amount
+        self.total += amount
+
+    def count(self, now: float) -> int:
+        self._advance(int(now // self.width))
+        return self.total
+
+    @property
+    def span(self) -> int:
+        """윈도우 길이(초)"""
+        return self.width * len(self.buckets)
+
+
+def _window_counter() -> RingCounter:
+    return RingCounter(RATE_WINDOW_BUCKETS, RATE_BUCKET_SECONDS)
+
+
+class DomainRateState:
+    """도메인별 슬라이딩 윈도우 카운터 묶음"""
+
+    __slots__ = ("started", "requests", "blocked", "status", "baseline", "ips")
+
+    def __init__(self, now: float):
+        self.started = now
+        self.requests = _window_counter()
+        self.blocked = _window_counter()
+        self.status: Dict[str, RingCounter] = {cls: _window_counter() for cls in STATUS_CLASSES}
+        self.baseline = RingCounter(RATE_BASELINE_BUCKETS, 60)
+        self.ips: "OrderedDict[str, RingCounter]" = OrderedDict()
+
+    def ip_counter(self, client_ip: str) -> RingCounter:
+        counter = self.ips.get(client_ip)
+        if counter is None:
+            counter = _window_counter()
+            self.ips[client_ip] = counter
+            if len(self.ips) > RATE_MAX_IPS_PER_DOMAIN:
+                self.ips.popitem(last=False)
+        else:
+            self.ips.move_to_end(client_ip)
+        return counter
+
+
+def _is_blocked(log: LogRecord) -> bool:
+    action = (log.waf_action or "").lower()
+    return action in BLOCK_ACTIONS
+
+
+class RateDetectionService:
+    """이벤트 스트림 기반 도메인별 요청률 급증/차단율 급증 감지 및 SSE 알림"""
+
+    def __init__(self):
+        self._domains: Dict[str, DomainRateState] = {}
+        # (도메인, 종류, 키) -> 마지막 알림 시각 (monotonic)
+        self._last_alert: Dict[Tuple[str, str, str], float] = {}
+        self._recent: Dict[str, Deque[AttackAlert]] = {}
+        self._events = 0
+
+    def record(self, log: LogRecord) -> None:
+        """로그 한 건을 카운터에 반영하고 임계값 검사 (이벤트 스트림 처리 단계)"""
+        domain = log_domain(log)
+        if not domain:
+            return
+        now = time.monotonic()
+        self._events += 1
+        if self._events % RATE_PRUNE_EVERY == 0:
+            self.prune()
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = DomainRateState(now)
+
+        state.requests.add(now)
+        state.baseline.add(now)
+        blocked = _is_blocked(log)
+        if blocked:
+            state.blocked.add(now)
+        status_class = None
+        if log.status:
+            status_class = f"{log.status // 100}xx"
+            if status_class in state.status:
+                state.status[status_class].add(now)
+
+        ip_count = 0
+        if log.client_ip:
+            counter = state.ip_counter(log.client_ip)
+            counter.add(now)
+            ip_count = counter.total
+
+        self._check(domain, state, now, log.client_ip, ip_count, blocked, status_class)
+
+    def _check(
+        self,
+        domain: str,
+        state: DomainRateState,
+        now: float,
+        client_ip: Optional[str],
+        ip_count: int,
+        blocked: bool,
+        status_class: Optional[str]
+    ) -> None:
+        window = state.requests.span
+        total = state.requests.total
+        if client_ip and ip_count >= RATE_IP_THRESHOLD:
+            self._alert(domain, "ip_rate", client_ip, ip_count, RATE_IP_THRESHOLD, window, now)
+
+        if total < RATE_MIN_REQUESTS:
+            return
+
+        # 기준선(최근 1시간 평균) 대비 현재 윈도우 요청률 - 기준선이 쌓인 뒤에만 판단
+        elapsed = now - state.started
+        if elapsed >= 4 * window:
+            baseline_rate = state.baseline.count(now) / min(elapsed, state.baseline.span)
+            current_rate = total / window
+            if current_rate > RATE_SPIKE_FACTOR * baseline_rate:
+                self._alert(domain, "rate_spike", "", total, int(RATE_SPIKE_FACTOR * baseline_rate * window), window, now)
+
+        if blocked:
+            ratio = state.blocked.total / total
+            if ratio >= RATE_BLOCK_RATIO:
+                self._alert(domain, "block_surge", "", round(ratio, 3), RATE_BLOCK_RATIO, window, now)
+
+        if status_class == "5xx":
+            ratio = state.status["5xx"].total / total
+            if ratio >= RATE_ERROR_RATIO:
+                self._alert(domain, "error_surge", "", round(ratio, 3), RATE_ERROR_RATIO, window, now)
+
+    def _alert(self, domain: str, kind: str, key: str, value: float, threshold: float, window: int, now: float) -> None:
+        alert_key = (domain, kind, key)
+        last = self._last_alert.get(alert_key)
+        if last is not None and now - last < RATE_ALERT_COOLDOWN:
+            return
+        self._last_alert[alert_key] = now
+
+        alert = AttackAlert(
+            domain=domain,
+            kind=kind,
+            client_ip=key or None,
+            value=value,
+            threshold=threshold,
+            window_seconds=window,
+            detected_at=datetime.now().isoformat()
+        )
+        recent = self._recent.get(domain)
+        if recent is None:
+            recent = self._recent[domain] = deque(maxlen=RATE_RECENT_ALERTS)
+        recent.append(alert)
+        monitor_event_stream.publish({"type": "alert", "payload": alert.dict()}, domain=domain)
+
+    def get_recent_alerts(self, domain: str) -> List[AttackAlert]:
+        """도메인의 최근 알림 (최신순)"""
+        return list(reversed(self._recent.get(domain, ())))
+
+    def prune(self) -> None:
+        """윈도우 내 요청이 없는 도메인 상태와 만료된 알림 쿨다운 정리"""
+        now = time.monotonic()
+        for domain in [d for d, s in self._domains.items() if s.baseline.count(now) == 0]:
+            del self._domains[domain]
+        for key in [k for k, t in self._last_alert.items() if now - t >= RATE_ALERT_COOLDOWN]:
+            del self._last_alert[key]
+
+
+# 전역 인스턴스
+rate_detection_service = RateDetectionService()
@@ -1,14 +1,24 @@
 # services/session_auth.py
+import os
 from fastapi import Depends, HTTPException, status, Header
 from typing import Optional
 from services.session_service import session_service
+from services.user_cache import user_cache
 from schema.user import User
-from database import get_db
-from sqlalchemy.orm import Session
+from database import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import settings  # noqa: F401 .env 로드
+
+# 관리자 API를 쓸 수 있는 계정 이메일 (콤마 구분, 비워두면 관리자 API는 모두 거부)
+ADMIN_EMAILS = frozenset(
+    email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()
+)
 
 async def get_current_user_by_session(
     authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """세션을 통해 현재 사용자 정보를 가져오는 의존성 함수"""
     if not authorization:
@@ -27,15 +37,20 @@ async def get_current_user_by_session(
     session_id = authorization.replace("Bearer ", "")
     
     # 세션 검증
-    session = session_service.validate_session(session_id)
+    session = await session_service.validate_session(session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="유효하지 않거나 만료된 세션입니다"
         )
     
+    # 짧은 TTL 캐시 우선 (페이지 로드 시 동시에 오는 인증 요청의 DB 조회 생략)
+    user = user_cache.get(session["user_id"])
+    if user is not None:
+        return user
+    
     # 데이터베이스에서 사용자 정보 가져오기 (remaining_points 포함)
-    user = db.query(User).filter(User.id == session["user_id"]).first()
+    user = await db.scalar(select(User).where(User.id == session["user_id"]))
     if not user:
         # 데이터베이스에 사용자가 없으면 세션 정보로 생성
         user = User(
@@ -46,11 +61,21 @@ async def get_current_user_by_session(
             remaining_points=0  # 기본값 설정
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     
+    user_cache.put(user)
     return user
 
+async def get_current_admin_user(current_user: User = Depends(get_current_user_by_session)) -> User:
+    """관리자 API용 의존성 함수 (세션 사용자의 이메일이 ADMIN_EMAILS에 있어야 함)"""
+    if not current_user.email or current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="관리자 권한이 필요합니다"
+        )
+    return current_user
+
 async def get_current_session_id(
     authorization: Optional[str] = Header(None)
 ) -> str:
@@ -70,7 +95,7 @@ async def get_current_session_id(
     session_id = authorization.replace("Bearer ", "")
     
     # 세션 존재 여부만 확인 (사용자 정보는 필요 없음)
-    if not session_service.validate_session(session_id):
+    if not await session_service.validate_session(session_id):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="유효하지 않거나 만료된 세션입니다"
@@ -1,103 +1,331 @@
 # services/session_service.py
+import asyncio
+import os
 import secrets
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
-import json
-from fastapi import HTTPException, status
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
+
+from services.session_store import SESSION_STORE, SESSION_TTL_SECONDS, SessionStore, create_session_store, session_expires_ts
+from services.session_tokens import USER_REVOCATION_PREFIX, RevocationList, RevocationRecord, SessionTokenSigner
+
+# 공유 저장소 조회 결과를 워커 메모리에 보관하는 시간(초)과 최대 개수
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "5"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+# 만료 세션 일괄 정리 주기(초)
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+# 세션 토큰 방식: opaque(저장소 조회) / signed(HMAC 서명 토큰, 저장소 조회 없이 검증)
+SESSION_TOKEN_MODE = os.getenv("SESSION_TOKEN_MODE", "opaque").lower()
+SESSION_TOKEN_SECRET = os.getenv("SESSION_TOKEN_SECRET") or os.getenv("JWT_SECRET_KEY")
+# 다른 워커의 토큰 폐기 기록을 공유 저장소에서 가져오는 주기(초)
+SESSION_REVOCATION_SYNC_INTERVAL = float(os.getenv("SESSION_REVOCATION_SYNC_INTERVAL", "2"))
 
 class SessionService:
-    def __init__(self):
-        # 실제 운영환경에서는 Redis나 데이터베이스 사용 권장
-        self.sessions: Dict[str, Dict[str, Any]] = {}
-    
-    def create_session(self, user_id: str, email: str, name: str, picture: Optional[str] = None) -> str:
-        """새로운 세션 생성"""
-        session_id = secrets.token_urlsafe(32)
-        expires_at = datetime.utcnow() + timedelta(hours=24)
-        
-        session_data = {
+    def __init__(self, store: Optional[SessionStore] = None, token_mode: str = SESSION_TOKEN_MODE):
+        # 저장소는 SESSION_STORE 설정으로 선택 (여러 워커로 실행할 때는 database/redis)
+        self.store = store or create_session_store()
+        # 세션 ID -> (세션 정보, 조회 시각) : 공유 저장소 read-through 캐시
+        self._cache: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        # signed 모드: 새 세션은 서명 토큰으로 발급하고 로그아웃/갱신은 폐기 목록으로 처리
+        self.token_mode = token_mode
+        self.signer = SessionTokenSigner(SESSION_TOKEN_SECRET) if token_mode == "signed" else None
+        self.revocations = RevocationList()
+        self._revocations_synced_at = 0.0
+        self._sync_task: Optional[asyncio.Task] = None
+        self.created = 0
+        self.expired_on_access = 0
+        self.swept = 0
+        self.revoked = 0
+
+    def _new_session(self, user_id: str, email: str, name: str, picture: Optional[str]) -> Dict[str, Any]:
+        # 만료 판단은 expires_ts(epoch 초)로 하고 ISO 문자열은 응답용으로만 유지
+        now = time.time()
+        expires_ts = now + SESSION_TTL_SECONDS
+        return {
             "user_id": user_id,
             "email": email,
             "name": name,
             "picture": picture,
-            "expires_at": expires_at.isoformat(),
-            "created_at": datetime.utcnow().isoformat()
+            "created_ts": now,
+            "expires_ts": expires_ts,
+            "expires_at": datetime.utcfromtimestamp(expires_ts).isoformat(),
+            "created_at": datetime.utcfromtimestamp(now).isoformat()
         }
-        
-        self.sessions[session_id] = session_data
+
+    def _cache_get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(session_id)
+        if entry is None:
+            return None
+        session, fetched_at = entry
+        if time.monotonic() - fetched_at > SESSION_CACHE_TTL:
+            del self._cache[session_id]
+            return None
+        self._cache.move_to_end(session_id)
+        return session
+
+    def _cache_put(self, session_id: str, session: Dict[str, Any]) -> None:
+        if not self.store.shared:
+            return
+        self._cache[session_id] = (session, time.monotonic())
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > SESSION_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _is_signed(self, session_id: str) -> bool:
+        # opaque 세션 ID(token_urlsafe)에는 '.'이 없음 - 모드 전환 전 세션도 만료 시까지 유효
+        return self.signer is not None and "." in session_id
+
+    async def _issue(self, session_data: Dict[str, Any]) -> str:
+        if self.signer is not None:
+            session_id = self.signer.issue(secrets.token_urlsafe(16), session_data)
+        else:
+            session_id = secrets.token_urlsafe(32)
+            await self.store.set(session_id, session_data)
+            self._cache_put(session_id, session_data)
+        self.created += 1
         return session_id
-    
-    def validate_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """세션 유효성 검증"""
-        if session_id not in self.sessions:
+
+    async def _revoke(self, record: RevocationRecord) -> None:
+        self.revocations.add(record)
+        await self.store.add_revocation(record)
+
+    async def create_session(self, user_id: str, email: str, name: str, picture: Optional[str] = None) -> str:
+        """새로운 세션 생성"""
+        return await self._issue(self._new_session(user_id, email, name, picture))
+
+    def _validate_signed(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """서명 토큰 검증 (서명, 만료, 폐기 목록 - 저장소 조회 없음)"""
+        verified = self.signer.verify(session_id)
+        if verified is None:
+            return None
+        token_id, session = verified
+        if time.time() > session["expires_ts"]:
+            self.expired_on_access += 1
             return None
-        
-        session = self.sessions[session_id]
-        expires_at = datetime.fromisoformat(session["expires_at"])
-        
-        if datetime.utcnow() > expires_at:
+        if self.revocations.is_revoked(token_id, session["user_id"], session["created_ts"]):
+            return None
+        session["token_id"] = token_id
+        return session
+
+    async def validate_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """세션 유효성 검증 (서명 토큰은 CPU만으로, 공유 저장소는 캐시 우선 조회)"""
+        if self._is_signed(session_id):
+            return self._validate_signed(session_id)
+
+        session = self._cache_get(session_id)
+        if session is None:
+            session = await self.store.get(session_id)
+            if session is None:
+                return None
+            self._cache_put(session_id, session)
+
+        if time.time() > session_expires_ts(session):
             # 만료된 세션 삭제
-            self.delete_session(session_id)
+            await self.delete_session(session_id)
+            self.expired_on_access += 1
             return None
-        
+
         return session
-    
-    def delete_session(self, session_id: str) -> bool:
-        """세션 삭제"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+
+    async def delete_session(self, session_id: str) -> bool:
+        """세션 삭제 (다른 워커의 캐시/폐기 목록에는 최대 SESSION_CACHE_TTL/SESSION_REVOCATION_SYNC_INTERVAL 지연)"""
+        if self._is_signed(session_id):
+            session = self._validate_signed(session_id)
+            if session is None:
+                return False
+            await self._revoke((session["token_id"], time.time(), session["expires_ts"]))
             return True
-        return False
-    
-    def refresh_session(self, session_id: str) -> Optional[str]:
+
+        self._cache.pop(session_id, None)
+        return await self.store.delete(session_id)
+
+    async def refresh_session(self, session_id: str) -> Optional[str]:
         """세션 갱신 (24시간 연장)"""
-        session = self.validate_session(session_id)
+        session = await self.validate_session(session_id)
         if not session:
             return None
-        
-        # 새로운 세션 ID 생성
-        new_session_id = secrets.token_urlsafe(32)
-        expires_at = datetime.utcnow() + timedelta(hours=24)
-        
-        session_data = {
-            "user_id": session["user_id"],
-            "email": session["email"],
-            "name": session["name"],
-            "picture": session["picture"],
-            "expires_at": expires_at.isoformat(),
-            "created_at": datetime.utcnow().isoformat()
-        }
-        
+
         # 기존 세션 삭제 후 새 세션 생성
-        self.delete_session(session_id)
-        self.sessions[new_session_id] = session_data
-        
-        return new_session_id
-    
-    def get_user_sessions(self, user_id: str) -> list:
-        """사용자의 모든 활성 세션 조회"""
-        active_sessions = []
-        for session_id, session in self.sessions.items():
-            if session["user_id"] == user_id and self.validate_session(session_id):
-                active_sessions.append({
-                    "session_id": session_id,
-                    "created_at": session["created_at"],
-                    "expires_at": session["expires_at"]
-                })
-        return active_sessions
-    
-    def cleanup_expired_sessions(self):
-        """만료된 세션 정리"""
-        expired_sessions = []
-        for session_id, session in self.sessions.items():
-            expires_at = datetime.fromisoformat(session["expires_at"])
-            if datetime.utcnow() > expires_at:
-                expired_sessions.append(session_id)
-        
-        for session_id in expired_sessions:
-            self.delete_session(session_id)
-        
-        return len(expired_sessions)
+        await self.delete_session(session_id)
+        return await self._issue(
+            self._new_session(session["user_id"], session["email"], session["name"], session["picture"])
+        )
+
+    async def get_user_sessions(self, user_id: str) -> list:
+        """사용자의 모든 활성 세션 조회 (사용자별 인덱스로 해당 사용자 세션만 조회, 서명 토큰은 저장되지 않아 제외)"""
+        now = time.time()
+        return [
+            {
+                "session_id": session_id,
+                "created_at": session["created_at"],
+                "expires_at": session["expires_at"]
+            }
+            for session_id, session in await self.store.find_by_user(user_id)
+            if session_expires_ts(session) > now
+        ]
+
+    async def revoke_user_sessions(self, user_id: str) -> int:
+        """사용자의 모든 세션 삭제 (모든 기기에서 로그아웃) 후 삭제 수 반환"""
+        session_ids = await self.store.delete_user(user_id)
+        for session_id in session_ids:
+            self._cache.pop(session_id, None)
+        if self.signer is not None:
+            # 지금까지 발급된 사용자의 서명 토큰 전체 거부 (개수는 알 수 없어 삭제 수에 미포함)
+            now = time.time()
+            await self._revoke((f"{USER_REVOCATION_PREFIX}{user_id}", now, now + SESSION_TTL_SECONDS))
+        self.revoked += len(session_ids)
+        return len(session_ids)
+
+    async def cleanup_expired_sessions(self) -> int:
+        """만료된 세션 일괄 정리 (로컬 캐시는 SESSION_CACHE_TTL로 자연 소멸)"""
+        now = time.time()
+        purged = await self.store.purge_expired(now)
+        self.revocations.prune(now)
+        self.swept += purged
+        return purged
+
+    async def sync_revocations(self) -> int:
+        """공유 저장소에서 다른 워커의 토큰 폐기 기록을 가져와 로컬 폐기 목록에 반영"""
+        # 시계 오차를 고려해 직전 동기화 시각보다 조금 앞부터 조회 (중복 반영은 무해)
+        since = self._revocations_synced_at - 5
+        self._revocations_synced_at = time.time()
+        records = await self.store.revocations_since(since)
+        for record in records:
+            self.revocations.add(record)
+        return len(records)
+
+    async def metrics(self) -> Dict[str, Any]:
+        """세션 수와 만료/제거 누계"""
+        return {
+            "store": SESSION_STORE,
+            "token_mode": self.token_mode,
+            "revocations": len(self.revocations),
+            "live": await self.store.count(time.time()),
+            "created": self.created,
+            "expired_on_access": self.expired_on_access,
+            "expired_swept": self.swept,
+            "evicted": getattr(self.store, "evicted", 0),
+            "revoked": self.revoked,
+            "cache_size": len(self._cache),
+        }
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+            try:
+                await self.cleanup_expired_sessions()
+            except Exception as e:
+                print(f"만료 세션 정리 실패: {e}")
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await self.sync_revocations()
+            except Exception as e:
+                print(f"세션 폐기 목록 동기화 실패: {e}")
+            await asyncio.sleep(SESSION_REVOCATION_SYNC_INTERVAL)
+
+    def start(self) -> None:
+        """만료 세션 정리 태스크 (signed 모드 + 공유 저장소면 폐기 목록 동기화 태스크도) 시작"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sweep_loop())
+        if self.signer is not None and self.store.shared and (self._sync_task is None or self._sync_task.done()):
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self) -> None:
+        """정리/동기화 태스크 종료 후 저장소 연결 정리"""
+        for task in (self._task, self._sync_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._sync_task = None
+        await self.store.close()
 
 # 전역 인스턴스
 session_service = SessionService()
+
+
+if __name__ == "__main__":
+    # 저장소별 read-through 캐시/무효화 확인: python -m services.session_service
+    # (database는 DATABASE_URL 사용 - SQLite 가능, redis는 SESSION_REDIS_URL에 연결되지 않으면 건너뜀)
+    from database import create_schema
+    from services.session_store import SESSION_REDIS_URL
+
+    SESSION_CACHE_TTL = 0.2
+
+    class CountingStore:
+        """저장소 조회 횟수를 세는 래퍼"""
+
+        def __init__(self, store: SessionStore):
+            self._store = store
+            self.gets = 0
+
+        def __getattr__(self, name):
+            return getattr(self._store, name)
+
+        async def get(self, session_id: str):
+            self.gets += 1
+            return await self._store.get(session_id)
+
+    async def _check(kind: str) -> None:
+        store = CountingStore(create_session_store(kind))
+        if kind == "database":
+            create_schema()
+        if kind == "redis":
+            try:
+                await store._redis.ping()
+            except Exception as e:
+                print(f"{kind}: 건너뜀 ({SESSION_REDIS_URL} 연결 실패: {e.__class__.__name__})")
+                await store.close()
+                return
+        # 같은 저장소를 쓰는 두 워커
+        worker_a = SessionService(store=store, token_mode="opaque")
+        worker_b = SessionService(store=store, token_mode="opaque")
+        user_id = secrets.token_hex(8)
+        session_id = await worker_a.create_session(user_id, f"{user_id}@example.com", "check")
+
+        assert await worker_a.validate_session(session_id) is not None
+        if not store.shared:
+            # 메모리 저장소는 워커마다 따로 - 캐시 없이 저장소 조회
+            assert store.gets == 1
+            assert await worker_a.delete_session(session_id)
+            assert await worker_a.validate_session(session_id) is None
+            print(f"{kind}: 생성/조회/삭제 확인 (워커 간 공유 없음)")
+            return
+        # 발급한 워커는 캐시에서, 다른 워커는 처음 한 번만 저장소에서 읽음
+        assert store.gets == 0
+        for _ in range(3):
+            assert (await worker_b.validate_session(session_id))["user_id"] == user_id
+        assert store.gets == 1, store.gets
+
+        # 로그아웃한 워커는 즉시 무효, 다른 워커는 캐시 TTL이 지나면 저장소에서 다시 읽고 무효
+        assert await worker_a.delete_session(session_id)
+        assert await worker_a.validate_session(session_id) is None
+        assert await worker_b.validate_session(session_id) is not None
+        await asyncio.sleep(SESSION_CACHE_TTL * 1.5)
+        assert await worker_b.validate_session(session_id) is None
+
+        # 모든 기기 로그아웃도 같은 방식으로 반영
+        session_ids = [await worker_a.create_session(user_id, "", "check") for _ in range(3)]
+        for sid in session_ids:
+            assert await worker_b.validate_session(sid) is not None
+        assert await worker_a.revoke_user_sessions(user_id) == 3
+        assert all([await worker_a.validate_session(sid) is None for sid in session_ids])
+        await asyncio.sleep(SESSION_CACHE_TTL * 1.5)
+        assert all([await worker_b.validate_session(sid) is None for sid in session_ids])
+        await store.close()
+        print(f"{kind}: read-through 캐시, 로그아웃/전체 로그아웃 무효화 확인 (저장소 조회 {store.gets}회)")
+
+    async def _main() -> None:
+        for kind in ("memory", "database", "redis"):
+            await _check(kind)
+        from database import dispose_engines
+        await dispose_engines()
+
+    asyncio.run(_main())
@@ -0,0 +1,352 @@
+# services/session_store.py
+import heapq
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, select
+
+from database import AsyncSessionLocal, init_engines
+from schema.session_db import SessionORM, SessionRevocationORM
+from services.session_tokens import RevocationRecord
+
+# 세션 저장소 종류: memory(단일 워커), database(공유 DB), redis(Redis 프로토콜 서버)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+SESSION_REDIS_PREFIX = os.getenv("SESSION_REDIS_PREFIX", "session:")
+# 메모리 저장소 최대 세션 수 (초과 시 가장 오래 사용하지 않은 세션부터 제거, 0이면 제한 없음)
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "0"))
+# 세션 유효 시간(초) - 세션/폐기 기록은 발급(폐기) 후 이 시간 안에 만료
+SESSION_TTL_SECONDS = 24 * 3600
+# Redis 사용자별 세션 SET 크기가 이 값을 넘으면 세션 추가 시 만료된 세션 ID 정리
+SESSION_REDIS_USER_PRUNE_SIZE = 32
+
+SessionData = Dict[str, Any]
+
+
+def session_expires_ts(session: SessionData) -> float:
+    """세션 만료 시각 (epoch 초) - expires_ts가 없는 이전 형식만 ISO 문자열 파싱"""
+    expires_ts = session.get("expires_ts")
+    if expires_ts is not None:
+        return expires_ts
+    return datetime.fromisoformat(session["expires_at"]).replace(tzinfo=timezone.utc).timestamp()
+
+
+def session_expires_at(session: SessionData) -> datetime:
+    """세션 만료 시각 (UTC naive datetime, DB 컬럼용)"""
+    return datetime.utcfromtimestamp(session_expires_ts(session))
+
+
+class SessionStore(ABC):
+    """세션 저장소 인터페이스 (세션 ID -> 세션 정보, 만료 시각 포함)"""
+
+    # 워커 간 공유 저장소인지 (공유 저장소만 로컬 캐시 대상)
+    shared = False
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[SessionData]:
+        ...
+
+    @abstractmethod
+    async def set(self, session_id: str, session: SessionData) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def find_by_user(self, user_id: str) -> List[Tuple[str, SessionData]]:
+        ...
+
+    @abstractmethod
+    async def delete_user(self, user_id: str) -> List[str]:
+        """사용자의 모든 세션 삭제 후 삭제한 세션 ID 반환"""
+
+    @abstractmethod
+    async def purge_expired(self, now: float) -> int:
+        """만료된 세션 일괄 삭제 후 삭제 수 반환 (now: epoch 초)"""
+
+    async def count(self, now: float) -> Optional[int]:
+        """유효한 세션 수 (저장소에서 싸게 셀 수 없으면 None)"""
+        return None
+
+    async def add_revocation(self, record: RevocationRecord) -> None:
+        """서명 토큰 폐기 기록 (공유 저장소만 - 다른 워커가 revocations_since로 가져감)"""
+
+    async def revocations_since(self, since: float) -> List[RevocationRecord]:
+        return []
+
+    async def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """프로세스 메모리 저장소 (워커 1개 또는 개발용)
+
+    만료 시각 최소 힙으로 만료된 세션만 꺼내 정리하고, max_sessions를 넘으면 LRU 순으로 제거
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.sessions: "OrderedDict[str, SessionData]" = OrderedDict()
+        self.max_sessions = max_sessions
+        # (만료 시각, 세션 ID) - 삭제/덮어쓴 세션 항목은 꺼낼 때 건너뜀
+        self._expiry_heap: List[Tuple[float, str]] = []
+        # 사용자 ID -> 세션 ID 집합 (사용자별 조회/일괄 삭제용 보조 인덱스)
+        self._by_user: Dict[str, Set[str]] = {}
+        self.evicted = 0
+
+    def _remove(self, session_id: str) -> Optional[SessionData]:
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            user_sessions = self._by_user.get(session["user_id"])
+            if user_sessions is not None:
+                user_sessions.discard(session_id)
+                if not user_sessions:
+                    del self._by_user[session["user_id"]]
+        return session
+
+    async def get(self, session_id: str) -> Optional[SessionData]:
+        session = self.sessions.get(session_id)
+        if session is not None and self.max_sessions:
+            self.sessions.move_to_end(session_id)
+        return session
+
+    async def set(self, session_id: str, session: SessionData) -> None:
+        self._remove(session_id)
+        self.sessions[session_id] = session
+        self._by_user.setdefault(session["user_id"], set()).add(session_id)
+        heapq.heappush(self._expiry_heap, (session_expires_ts(session), session_id))
+        if self.max_sessions:
+            while len(self.sessions) > self.max_sessions:
+                self._remove(next(iter(self.sessions)))
+                self.evicted += 1
+        # 삭제된 세션 항목이 쌓이면 힙 재구성
+        if len(self._expiry_heap) > 2 * len(self.sessions) + 1024:
+            self._expiry_heap = [(session_expires_ts(s), sid) for sid, s in self.sessions.items()]
+            heapq.heapify(self._expiry_heap)
+
+    async def delete(self, session_id: str) -> bool:
+        return self._remove(session_id) is not None
+
+    async def find_by_user(self, user_id: str) -> List[Tuple[str, SessionData]]:
+        return [(sid, self.sessions[sid]) for sid in self._by_user.get(user_id, ())]
+
+    async def delete_user(self, user_id: str) -> List[str]:
+        session_ids = list(self._by_user.get(user_id, ()))
+        for session_id in session_ids:
+            self._remove(session_id)
+        return session_ids
+
+    async def purge_expired(self, now: float) -> int:
+        purged = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_ts, session_id = heapq.heappop(heap)
+            session = self.sessions.get(session_id)
+            if session is not None and session_expires_ts(session) == expires_ts:
+                self._remove(session_id)
+                purged += 1
+        return purged
+
+    async def count(self, now: float) -> Optional[int]:
+        return len(self.sessions)
+
+
+class DatabaseSessionStore(SessionStore):
+    """user_sessions 테이블 저장소 (DATABASE_URL의 DB 공유)"""
+
+    shared = True
+
+    async def get(self, session_id: str) -> Optional[SessionData]:
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            row = await db.get(SessionORM, session_id)
+            return json.loads(row.data) if row else None
+
+    async def set(self, session_id: str, session: SessionData) -> None:
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            await db.merge(SessionORM(
+                session_id=session_id,
+                user_id=session["user_id"],
+                data=json.dumps(session),
+                expires_at=session_expires_at(session),
+            ))
+            await db.commit()
+
+    async def delete(self, session_id: str) -> bool:
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(delete(SessionORM).where(SessionORM.session_id == session_id))
+            await db.commit()
+            return result.rowcount > 0
+
+    async def find_by_user(self, user_id: str) -> List[Tuple[str, SessionData]]:
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(select(SessionORM).where(SessionORM.user_id == user_id))).all()
+            return [(row.session_id, json.loads(row.data)) for row in rows]
+
+    async def delete_user(self, user_id: str) -> List[str]:
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            session_ids = list(await db.scalars(
+                select(SessionORM.session_id).where(SessionORM.user_id == user_id)
+            ))
+            if session_ids:
+                await db.execute(delete(SessionORM).where(SessionORM.session_id.in_(session_ids)))
+                await db.commit()
+            return session_ids
+
+    async def purge_expired(self, now: float) -> int:
+        # 만료 인덱스를 이용한 단일 DELETE
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            expired_at = datetime.utcfromtimestamp(now)
+            result = await db.execute(delete(SessionORM).where(SessionORM.expires_at <= expired_at))
+            await db.execute(delete(SessionRevocationORM).where(SessionRevocationORM.expires_at <= expired_at))
+            await db.commit()
+            return result.rowcount
+
+    async def count(self, now: float) -> Optional[int]:
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(func.count()).select_from(SessionORM)
+                .where(SessionORM.expires_at > datetime.utcfromtimestamp(now))
+            )
+
+    async def add_revocation(self, record: RevocationRecord) -> None:
+        key, revoked_at, until = record
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            await db.merge(SessionRevocationORM(
+                revocation_key=key,
+                revoked_at=datetime.utcfromtimestamp(revoked_at),
+                expires_at=datetime.utcfromtimestamp(until),
+            ))
+            await db.commit()
+
+    async def revocations_since(self, since: float) -> List[RevocationRecord]:
+        init_engines()
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(
+                select(SessionRevocationORM)
+                .where(SessionRevocationORM.revoked_at >= datetime.utcfromtimestamp(since))
+            )).all()
+            return [
+                (
+                    row.revocation_key,
+                    row.revoked_at.replace(tzinfo=timezone.utc).timestamp(),
+                    row.expires_at.replace(tzinfo=timezone.utc).timestamp(),
+                )
+                for row in rows
+            ]
+
+
+class RedisSessionStore(SessionStore):
+    """Redis 프로토콜 저장소 (키 TTL로 만료 처리, 사용자별 세션 ID는 SET으로 관리)
+
+    사용자 SET에도 세션 유효 시간만큼 TTL을 걸어 마지막 세션이 만료되면 함께 사라짐
+    """
+
+    shared = True
+
+    def __init__(self, url: str = SESSION_REDIS_URL, prefix: str = SESSION_REDIS_PREFIX):
+        # redis 패키지는 이 저장소를 쓸 때만 필요
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _user_key(self, user_id: str) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    @property
+    def _revocations_key(self) -> str:
+        # 폐기 시각을 score로 하는 sorted set (보관 만료는 폐기 후 SESSION_TTL_SECONDS 이내)
+        return f"{self.prefix}revocations"
+
+    async def get(self, session_id: str) -> Optional[SessionData]:
+        raw = await self._redis.get(self._key(session_id))
+        return json.loads(raw) if raw else None
+
+    async def set(self, session_id: str, session: SessionData) -> None:
+        ttl = max(1, int(session_expires_ts(session) - time.time()))
+        user_key = self._user_key(session["user_id"])
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(session_id), json.dumps(session), ex=ttl)
+            pipe.sadd(user_key, session_id)
+            # 이 SET의 다른 세션은 모두 이보다 먼저 저장되어 SESSION_TTL_SECONDS 안에 만료
+            pipe.expire(user_key, max(ttl, SESSION_TTL_SECONDS))
+            pipe.scard(user_key)
+            results = await pipe.execute()
+        if results[-1] > SESSION_REDIS_USER_PRUNE_SIZE:
+            # 자주 로그인하는 사용자는 SET이 계속 연장되므로 만료된 세션 ID를 정리
+            await self.find_by_user(session["user_id"])
+
+    async def delete(self, session_id: str) -> bool:
+        session = await self.get(session_id)
+        if session is None:
+            return False
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(session_id))
+            pipe.srem(self._user_key(session["user_id"]), session_id)
+            results = await pipe.execute()
+        return bool(results[0])
+
+    async def find_by_user(self, user_id: str) -> List[Tuple[str, SessionData]]:
+        user_key = self._user_key(user_id)
+        session_ids = sorted(await self._redis.smembers(user_key))
+        if not session_ids:
+            return []
+        values = await self._redis.mget([self._key(sid) for sid in session_ids])
+        # TTL로 사라진 세션 ID는 사용자 SET에서도 정리
+        stale = [sid for sid, raw in zip(session_ids, values) if raw is None]
+        if stale:
+            await self._redis.srem(user_key, *stale)
+        return [(sid, json.loads(raw)) for sid, raw in zip(session_ids, values) if raw is not None]
+
+    async def delete_user(self, user_id: str) -> List[str]:
+        user_key = self._user_key(user_id)
+        session_ids = sorted(await self._redis.smembers(user_key))
+        async with self._redis.pipeline(transaction=True) as pipe:
+            if session_ids:
+                pipe.delete(*[self._key(sid) for sid in session_ids])
+            pipe.delete(user_key)
+            await pipe.execute()
+        return session_ids
+
+    async def purge_expired(self, now: float) -> int:
+        # 세션 키와 사용자 SET은 Redis TTL로 만료되므로 보관 만료된 폐기 기록만 정리
+        # (폐기 기록은 폐기 후 SESSION_TTL_SECONDS 안에 만료되므로 폐기 시각 score로 범위 삭제)
+        await self._redis.zremrangebyscore(self._revocations_key, "-inf", now - SESSION_TTL_SECONDS)
+        return 0
+
+    async def add_revocation(self, record: RevocationRecord) -> None:
+        await self._redis.zadd(self._revocations_key, {json.dumps(list(record)): record[1]})
+
+    async def revocations_since(self, since: float) -> List[RevocationRecord]:
+        records = await self._redis.zrangebyscore(self._revocations_key, since, "+inf")
+        return [tuple(json.loads(raw)) for raw in records]
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_session_store(kind: str = SESSION_STORE) -> SessionStore:
+    """SESSION_STORE 설정에 맞는 저장소 생성"""
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "database":
+        return DatabaseSessionStore()
+    if kind == "redis":
+        return RedisSessionStore()
+    raise ValueError(f"지원하지 않는 SESSION_STORE: {kind}")
@@ -0,0 +1,108 @@
+# services/session_tokens.py
+import base64
+import hmac
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+SessionData = Dict[str, Any]
+# (폐기 키, 폐기 시각, 보관 만료 시각) - 키는 토큰 ID 또는 "user:<user_id>"
+RevocationRecord = Tuple[str, float, float]
+
+USER_REVOCATION_PREFIX = "user:"
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokenSigner:
+    """HMAC-SHA256 서명 세션 토큰 (저장소 조회 없이 CPU만으로 검증)
+
+    형식: base64url(payload JSON).base64url(서명)
+    """
+
+    def __init__(self, secret: str):
+        if not secret:
+            raise ValueError("서명 세션 토큰에는 SESSION_TOKEN_SECRET(또는 JWT_SECRET_KEY)이 필요합니다.")
+        self._key = secret.encode()
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.digest(self._key, payload.encode(), "sha256"))
+
+    def issue(self, token_id: str, session: SessionData) -> str:
+        claims = {
+            "sid": token_id,
+            "uid": session["user_id"],
+            "em": session["email"],
+            "nm": session["name"],
+            "pic": session["picture"],
+            "iat": session["created_ts"],
+            "exp": session["expires_ts"],
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token: str) -> Optional[Tuple[str, SessionData]]:
+        """서명이 맞으면 (토큰 ID, 세션 정보), 아니면 None (만료 여부는 호출 측에서 확인)"""
+        payload, _, signature = token.partition(".")
+        # bytes로 비교 - str 비교는 ASCII가 아닌 문자가 섞이면 TypeError
+        if not signature or not hmac.compare_digest(signature.encode(), self._sign(payload).encode()):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        return claims["sid"], {
+            "user_id": claims["uid"],
+            "email": claims["em"],
+            "name": claims["nm"],
+            "picture": claims["pic"],
+            "created_ts": claims["iat"],
+            "expires_ts": claims["exp"],
+            "expires_at": datetime.utcfromtimestamp(claims["exp"]).isoformat(),
+            "created_at": datetime.utcfromtimestamp(claims["iat"]).isoformat(),
+        }
+
+
+class RevocationList:
+    """폐기된 서명 토큰 목록 (워커 메모리의 정확한 집합 - 공유 저장소 기록은 주기적으로 동기화)"""
+
+    def __init__(self):
+        # 토큰 ID -> 보관 만료 시각 (토큰 만료 후에는 폐기 기록 불필요)
+        self._tokens: Dict[str, float] = {}
+        # 사용자 ID -> (폐기 시각, 보관 만료 시각) : 폐기 시각 이전에 발급된 토큰 전체 거부
+        self._users: Dict[str, Tuple[float, float]] = {}
+
+    def add(self, record: RevocationRecord) -> None:
+        key, revoked_at, until = record
+        if key.startswith(USER_REVOCATION_PREFIX):
+            user_id = key[len(USER_REVOCATION_PREFIX):]
+            current = self._users.get(user_id)
+            if current is None or current[0] < revoked_at:
+                self._users[user_id] = (revoked_at, until)
+            return
+        self._tokens.setdefault(key, until)
+
+    def is_revoked(self, token_id: str, user_id: str, issued_at: float) -> bool:
+        user = self._users.get(user_id)
+        if user is not None and issued_at <= user[0]:
+            return True
+        return token_id in self._tokens
+
+    def prune(self, now: float) -> int:
+        """보관 만료된 기록 제거"""
+        expired = [key for key, until in self._tokens.items() if until <= now]
+        for key in expired:
+            del self._tokens[key]
+        expired_users = [uid for uid, (_, until) in self._users.items() if until <= now]
+        for user_id in expired_users:
+            del self._users[user_id]
+        return len(expired) + len(expired_users)
+
+    def __len__(self) -> int:
+        return len(self._tokens) + len(self._users)
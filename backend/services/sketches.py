@@ -0,0 +1,149 @@
+# services/sketches.py
+import base64
+import hashlib
+import heapq
+import math
+from typing import Dict, List, Tuple
+
+
+def _hash64(value: str) -> int:
+    """문자열을 64비트 정수 해시로 변환"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """고정 메모리(2^p 바이트) 고유값 개수 추정기 - 표준 오차 약 1.04 / sqrt(2^p)"""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    def add(self, value: str) -> None:
+        x = _hash64(value)
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        # 남은 비트에서 선행 0의 개수 + 1
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = self.m
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        elif m == 64:
+            alpha = 0.709
+        elif m == 32:
+            alpha = 0.697
+        else:
+            alpha = 0.673
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # 작은 범위 보정 (linear counting)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def copy(self) -> "HyperLogLog":
+        hll = HyperLogLog(self.precision)
+        hll.registers = bytearray(self.registers)
+        return hll
+
+    def to_dict(self) -> Dict:
+        return {"p": self.precision, "registers": base64.b64encode(bytes(self.registers)).decode()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HyperLogLog":
+        hll = cls(data["p"])
+        registers = base64.b64decode(data["registers"])
+        if len(registers) == hll.m:
+            hll.registers = bytearray(registers)
+        return hll
+
+
+class SpaceSaving:
+    """Space-Saving 상위 K 빈도 추정기 - 최대 capacity 개 항목만 유지
+
+    교체 대상(최소 카운터)은 값마다 항목 하나를 둔 최소 힙에서 찾음
+    힙의 빈도는 증가를 바로 반영하지 않아 실제보다 작을 수 있으므로, 꺼낸 항목이 현재 빈도와 다르면 갱신해서 다시 넣음
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        # 값 -> [추정 빈도, 최대 과대추정 오차]
+        self.counters: Dict[str, List[int]] = {}
+        # (추가/갱신 시점의 빈도, 값) 최소 힙
+        self._heap: List[Tuple[int, str]] = []
+
+    def add(self, value: str, weight: int = 1) -> None:
+        counter = self.counters.get(value)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[value] = [weight, 0]
+            heapq.heappush(self._heap, (weight, value))
+            return
+        # 가장 작은 카운터를 새 값으로 교체
+        min_count = self._pop_min()
+        self.counters[value] = [min_count + weight, min_count]
+        heapq.heappush(self._heap, (min_count + weight, value))
+
+    def _pop_min(self) -> int:
+        """최소 카운터를 제거하고 그 빈도 반환"""
+        while True:
+            count, victim = self._heap[0]
+            current = self.counters[victim][0]
+            if current == count:
+                heapq.heappop(self._heap)
+                del self.counters[victim]
+                return count
+            heapq.heapreplace(self._heap, (current, victim))
+
+    def min_count(self) -> int:
+        """가득 찼을 때 추적하지 않는 값의 최대 빈도 (아니면 0)"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """다른 스케치 합산 - 한쪽에 없는 값은 그쪽 최소 빈도를 빈도/오차에 더해 과소추정하지 않음"""
+        self_min, other_min = self.min_count(), other.min_count()
+        merged: Dict[str, List[int]] = {}
+        for value in self.counters.keys() | other.counters.keys():
+            count, error = self.counters.get(value, (self_min, self_min))
+            other_count, other_error = other.counters.get(value, (other_min, other_min))
+            merged[value] = [count + other_count, error + other_error]
+        if len(merged) > self.capacity:
+            merged = dict(heapq.nlargest(self.capacity, merged.items(), key=lambda kv: kv[1][0]))
+        self._set_counters(merged)
+
+    def _set_counters(self, counters: Dict[str, List[int]]) -> None:
+        self.counters = counters
+        self._heap = [(count, value) for value, (count, _) in counters.items()]
+        heapq.heapify(self._heap)
+
+    def copy(self) -> "SpaceSaving":
+        sketch = SpaceSaving(self.capacity)
+        sketch._set_counters({value: list(counter) for value, counter in self.counters.items()})
+        return sketch
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """(값, 추정 빈도, 오차) 목록을 빈도 내림차순으로 반환"""
+        items = heapq.nlargest(k, self.counters.items(), key=lambda kv: kv[1][0])
+        return [(value, count, error) for value, (count, error) in items]
+
+    def to_dict(self) -> Dict:
+        return {"capacity": self.capacity, "counters": [[k, c, e] for k, (c, e) in self.counters.items()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SpaceSaving":
+        sketch = cls(data["capacity"])
+        sketch._set_counters({
+            value: [count, error] for value, count, error in data["counters"][:sketch.capacity]
+        })
+        return sketch
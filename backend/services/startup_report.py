@@ -0,0 +1,151 @@
+# services/startup_report.py
+import importlib
+import importlib.abc
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# true면 모든 모듈 import 시간을 계측 (python -X importtime과 같은 정보를 /metrics/startup으로 제공)
+STARTUP_PROFILE_IMPORTS = os.getenv("STARTUP_PROFILE_IMPORTS", "false").lower() == "true"
+# 라우터 import 합계 예산(ms) - 초과 시 기동 요약에 경고, 검사 명령은 실패 (0이면 검사 안 함)
+# Cloudflare SDK(수 초)가 다시 import 경로에 들어오면 넘도록 현재 합계(약 0.5초)에 여유를 둔 값
+STARTUP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+# 기동 시 import 하는 라우터 모듈 (main.py와 예산 검사가 같은 목록 사용)
+ROUTER_MODULES = ("routers.payments", "routers.monitoring", "routers.auth", "routers.proxy_and_waf_automation")
+# 프로파일 결과에서 보여줄 모듈 수
+PROFILE_TOP_N = 25
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """다른 finder가 찾은 모듈의 exec_module을 감싸 모듈별 실행 시간 측정"""
+
+    def __init__(self):
+        self.cumulative_ms: Dict[str, float] = {}
+        self.self_ms: Dict[str, float] = {}
+        self._stack: List[List[float]] = []  # [시작 시각, 하위 모듈 누적 시간]
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # 내장/frozen 모듈은 클래스 자체가 loader라 감싸지 않음
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return spec
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            frame = [time.perf_counter(), 0.0]
+            self._stack.append(frame)
+            try:
+                exec_module(module)
+            finally:
+                self._stack.pop()
+                elapsed = (time.perf_counter() - frame[0]) * 1000
+                self.cumulative_ms[fullname] = elapsed
+                self.self_ms[fullname] = elapsed - frame[1]
+                if self._stack:
+                    self._stack[-1][1] += elapsed
+
+        loader.exec_module = timed_exec_module
+        return spec
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        names = sorted(self.self_ms, key=self.self_ms.get, reverse=True)[:limit]
+        return [
+            {
+                "module": name,
+                "self_ms": round(self.self_ms[name], 1),
+                "cumulative_ms": round(self.cumulative_ms[name], 1),
+            }
+            for name in names
+        ]
+
+
+class StartupReport:
+    """기동 단계별 소요 시간 기록 (모듈 import, lifespan 초기화)"""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.imports: List[Dict[str, Any]] = []
+        self.steps: List[Dict[str, Any]] = []
+        self.ready_ms: float = 0.0
+        self._profiler: Optional[_ImportTimer] = None
+
+    def enable_import_profiling(self) -> None:
+        """이후 import되는 모든 모듈의 실행 시간 계측 시작"""
+        if self._profiler is None:
+            self._profiler = _ImportTimer()
+            sys.meta_path.insert(0, self._profiler)
+
+    def timed_import(self, name: str):
+        """모듈을 import 하며 소요 시간 기록 (이미 import된 하위 모듈은 먼저 import한 쪽에 포함)"""
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        self.imports.append({"module": name, "ms": round((time.perf_counter() - started) * 1000, 1)})
+        return module
+
+    @contextmanager
+    def step(self, name: str):
+        """초기화 단계 소요 시간 기록"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append({"step": name, "ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    def mark_ready(self) -> None:
+        self.ready_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        import_ms = round(sum(i["ms"] for i in self.imports), 1)
+        report = {
+            "ready_ms": self.ready_ms,
+            "import_ms": import_ms,
+            "import_budget_ms": STARTUP_IMPORT_BUDGET_MS or None,
+            "over_budget": bool(STARTUP_IMPORT_BUDGET_MS) and import_ms > STARTUP_IMPORT_BUDGET_MS,
+            "init_ms": round(sum(s["ms"] for s in self.steps), 1),
+            "imports": sorted(self.imports, key=lambda i: i["ms"], reverse=True),
+            "steps": self.steps,
+        }
+        if self._profiler is not None:
+            report["modules"] = self._profiler.top(PROFILE_TOP_N)
+        return report
+
+    def print_summary(self) -> None:
+        report = self.to_dict()
+        print(f"기동 완료: {report['ready_ms']}ms (import {report['import_ms']}ms, 초기화 {report['init_ms']}ms)")
+        if report["over_budget"]:
+            print(f"경고: 라우터 import {report['import_ms']}ms가 예산 {STARTUP_IMPORT_BUDGET_MS}ms를 초과했습니다.")
+        for item in report["imports"][:5]:
+            print(f"  import {item['module']}: {item['ms']}ms")
+        for item in report["steps"]:
+            print(f"  init {item['step']}: {item['ms']}ms")
+        for item in report.get("modules", [])[:10]:
+            print(f"  module {item['module']}: {item['self_ms']}ms (누적 {item['cumulative_ms']}ms)")
+
+
+# 전역 인스턴스
+startup_report = StartupReport()
+
+
+if __name__ == "__main__":
+    # 라우터 import 예산 검사 (새 프로세스에서 측정, 초과 시 종료 코드 1): python -m services.startup_report
+    # main.py와 같은 순서로 .env 로드와 FastAPI import 후 라우터만 측정
+    import settings  # noqa: F401
+    import fastapi  # noqa: F401
+
+    for module_name in ROUTER_MODULES:
+        startup_report.timed_import(module_name)
+    result = startup_report.to_dict()
+    for item in result["imports"]:
+        print(f"import {item['module']}: {item['ms']}ms")
+    print(f"합계 {result['import_ms']}ms / 예산 {result['import_budget_ms']}ms")
+    sys.exit(1 if result["over_budget"] else 0)
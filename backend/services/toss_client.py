@@ -0,0 +1,204 @@
+# services/toss_client.py
+import asyncio
+import base64
+import os
+import random
+from typing import Optional
+
+import httpx
+
+import settings  # noqa: F401 .env 로드
+
+TOSS_SECRET_KEY = os.getenv("TOSS_SECRET_KEY")
+TOSS_API_URL = os.getenv("TOSS_API_URL")
+# 연결/응답 대기 시간(초) - 승인 응답은 카드사를 거쳐 느릴 수 있어 응답 대기를 길게
+TOSS_CONNECT_TIMEOUT = float(os.getenv("TOSS_CONNECT_TIMEOUT", "5"))
+TOSS_READ_TIMEOUT = float(os.getenv("TOSS_READ_TIMEOUT", "30"))
+TOSS_HTTP_MAX_CONNECTIONS = int(os.getenv("TOSS_HTTP_MAX_CONNECTIONS", "20"))
+# 재시도 횟수와 지수 백오프 시작 간격(초) - 멱등 키가 있는 요청만 재시도
+TOSS_MAX_RETRIES = int(os.getenv("TOSS_MAX_RETRIES", "3"))
+TOSS_RETRY_BACKOFF = float(os.getenv("TOSS_RETRY_BACKOFF", "0.5"))
+TOSS_RETRY_BACKOFF_MAX = 8.0
+
+# 409: 같은 멱등 키 요청이 아직 처리 중 (IDEMPOTENT_REQUEST_PROCESSING)
+RETRY_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class TossClient:
+    """토스 페이먼츠 비동기 클라이언트 (연결 풀 공유, 대기 중에도 이벤트 루프를 막지 않음)
+
+    Idempotency-Key 헤더를 붙인 요청은 토스가 같은 키로 한 번만 처리하므로
+    타임아웃/5xx 후 재시도해도 승인이나 취소가 중복되지 않음
+    """
+
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def _http(cls) -> httpx.AsyncClient:
+        """토스 API 공유 클라이언트 (연결 재사용)"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(TOSS_READ_TIMEOUT, connect=TOSS_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=TOSS_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=TOSS_HTTP_MAX_CONNECTIONS,
+                ),
+            )
+        return cls._client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """공유 클라이언트 종료 (앱 종료 시)"""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    def __init__(self, api_url: Optional[str] = TOSS_API_URL, secret_key: Optional[str] = TOSS_SECRET_KEY,
+                 max_retries: int = TOSS_MAX_RETRIES, backoff: float = TOSS_RETRY_BACKOFF):
+        self.api_url = (api_url or "").rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._authorization = "Basic " + base64.b64encode(f"{secret_key}:".encode()).decode()
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """지수 백오프 + 지터 (Retry-After 헤더가 있으면 우선)"""
+        if retry_after:
+            try:
+                return min(float(retry_after), TOSS_RETRY_BACKOFF_MAX)
+            except ValueError:
+                pass
+        delay = min(self.backoff * (2 ** attempt), TOSS_RETRY_BACKOFF_MAX)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _request(self, method: str, path: str, payload: Optional[dict] = None,
+                       idempotency_key: Optional[str] = None) -> httpx.Response:
+        headers = {
+            "Authorization": self._authorization,
+            "Content-Type": "application/json"
+        }
+        # 멱등 키가 없는 POST는 응답을 못 받은 요청이 처리됐는지 알 수 없으므로 재시도하지 않음 (조회는 항상 재시도)
+        retries = self.max_retries if idempotency_key or method == "GET" else 0
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+
+        for attempt in range(retries + 1):
+            try:
+                response = await self._http().request(method, f"{self.api_url}{path}", json=payload, headers=headers)
+            except httpx.TransportError as e:
+                if attempt == retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                print(f"토스 API 요청 실패 ({e.__class__.__name__}), {delay:.1f}초 후 재시도: {path}")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                    return response
+                delay = self._retry_delay(attempt, response.headers.get("retry-after"))
+                print(f"토스 API 응답 {response.status_code}, {delay:.1f}초 후 재시도: {path}")
+            await asyncio.sleep(delay)
+
+    async def confirm(self, payment_key: str, order_id: str, amount: int) -> httpx.Response:
+        """결제 승인 (주문 ID + 결제 키 기준 멱등 키 - 잘못된 키로 먼저 온 요청의 실패 응답을 다시 받지 않도록)"""
+        return await self._request(
+            "POST", "/confirm",
+            {"paymentKey": payment_key, "orderId": order_id, "amount": amount},
+            idempotency_key=f"confirm-{order_id}-{payment_key}",
+        )
+
+    async def cancel(self, payment_key: str, cancel_reason: str) -> httpx.Response:
+        """결제 전액 취소 (결제 키 기준 멱등 키)"""
+        return await self._request(
+            "POST", f"/{payment_key}/cancel",
+            {"cancelReason": cancel_reason},
+            idempotency_key=f"cancel-{payment_key}",
+        )
+
+    async def get_payment(self, payment_key: str) -> httpx.Response:
+        """결제 조회 (이미 승인된 결제의 주문/금액 확인용)"""
+        return await self._request("GET", f"/{payment_key}")
+
+
+# 전역 인스턴스
+toss_client = TossClient()
+
+
+if __name__ == "__main__":
+    # 재시도/백오프/멱등 키 확인: python -m services.toss_client
+    # (토스 API 대신 응답 순서를 정해 둔 로컬 HTTP 서버 사용 - 외부 호출 없음)
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    BACKOFF = 0.05
+    script = []  # 다음 요청들에 돌려줄 (상태 코드, 헤더), None이면 응답 없이 연결 종료
+    received = []  # (도착 시각, 메서드, 경로, Idempotency-Key)
+
+    class TossHandler(BaseHTTPRequestHandler):
+        """토스 결제 API 대역"""
+
+        def _reply(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            received.append((time.perf_counter(), self.command, self.path, self.headers.get("Idempotency-Key")))
+            step = script.pop(0) if script else (200, {})
+            if step is None:
+                self.close_connection = True
+                return
+            status, headers = step
+            body = json.dumps({"code": "CHECK", "status": status}).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = _reply
+
+        def log_message(self, *args):
+            pass
+
+    async def _call(label: str, steps: list, request) -> tuple:
+        script[:] = steps
+        received.clear()
+        response = await request
+        gaps = [later[0] - earlier[0] for earlier, later in zip(received, received[1:])]
+        print(f"{label}: 요청 {len(received)}회, 최종 {response.status_code}, "
+              f"간격 {', '.join(f'{gap * 1000:.0f}ms' for gap in gaps) or '-'}")
+        return response.status_code, gaps
+
+    async def _main() -> None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), TossHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = TossClient(f"http://127.0.0.1:{server.server_port}/v1/payments", "test_sk", max_retries=3, backoff=BACKOFF)
+        try:
+            # 5xx 후 성공 - 같은 멱등 키로 재시도, 간격은 지수 백오프(지터 포함 BACKOFF*2^n의 절반 이상)
+            status, gaps = await _call("승인 503→503→200", [(503, {}), (503, {}), (200, {})],
+                                       client.confirm("pk_1", "order_1", 1000))
+            assert status == 200 and len(received) == 3
+            assert {key for *_, key in received} == {"confirm-order_1-pk_1"}
+            assert gaps[0] >= BACKOFF / 2 and gaps[1] >= BACKOFF
+            # 409 (같은 키 요청 처리 중) - Retry-After 우선
+            status, gaps = await _call("승인 409(Retry-After 0.2)→200", [(409, {"Retry-After": "0.2"}), (200, {})],
+                                       client.confirm("pk_1", "order_1", 1000))
+            assert status == 200 and len(received) == 2 and gaps[0] >= 0.2
+            # 응답 없이 끊긴 연결도 같은 키로 재시도
+            status, _ = await _call("취소 연결 끊김→200", [None, (200, {})], client.cancel("pk_1", "check"))
+            assert status == 200 and len(received) == 2 and {key for *_, key in received} == {"cancel-pk_1"}
+            # 계속 실패하면 max_retries 후 마지막 응답 반환
+            status, _ = await _call("승인 503 계속", [(503, {})] * 10, client.confirm("pk_2", "order_2", 1000))
+            assert status == 503 and len(received) == client.max_retries + 1
+            # 재시도 대상이 아닌 오류는 한 번만
+            status, _ = await _call("승인 400", [(400, {}), (200, {})], client.confirm("pk_3", "order_3", 1000))
+            assert status == 400 and len(received) == 1
+            # 멱등 키 없는 POST는 처리 여부를 알 수 없으므로 재시도하지 않음, 조회는 재시도
+            status, _ = await _call("키 없는 POST 503", [(503, {}), (200, {})], client._request("POST", "/check", {}))
+            assert status == 503 and len(received) == 1 and received[0][3] is None
+            status, _ = await _call("조회 503→200", [(503, {}), (200, {})], client.get_payment("pk_1"))
+            assert status == 200 and len(received) == 2
+        finally:
+            await TossClient.aclose()
+            server.shutdown()
+
+    asyncio.run(_main())
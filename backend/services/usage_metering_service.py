@@ -0,0 +1,267 @@
+# services/usage_metering_service.py
+import asyncio
+import os
+import socket
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models.log_record import LogRecord
+from models.monitoring import DomainUsageSnapshot
+from schema.usage_db import DomainUsageORM, UsageWriterLeaseORM
+from services.monitor_stream import log_domain
+from services.monitoring_service import BYTES_PER_GB, bytes_to_billing_points
+
+# DB 반영 주기(초)와 메모리에 유지할 일 단위 사용량 보관 기간
+METERING_FLUSH_INTERVAL = float(os.getenv("METERING_FLUSH_INTERVAL", "30"))
+METERING_RETENTION_DAYS = int(os.getenv("METERING_RETENTION_DAYS", "62"))
+# DB 반영 담당 점유 시간(초) - 담당 워커가 죽으면 이 시간 후 다른 워커가 이어서 반영
+METERING_LEASE_TTL = float(os.getenv("METERING_LEASE_TTL", str(METERING_FLUSH_INTERVAL * 3)))
+METERING_LEASE_NAME = "domain_usage"
+
+UsageKey = Tuple[str, date]
+# (증분 누적을 시작한 시각, 증분)
+UsageBatch = Tuple[datetime, Dict[UsageKey, List[int]]]
+
+
+def traffic_bytes(log: LogRecord) -> int:
+    """로그 traffic 에서 요청 + 응답 바이트 수 추출"""
+    traffic = log.traffic or {}
+    total = traffic.get("total_bytes")
+    if total is not None:
+        return int(total)
+    request_size = traffic.get("request_size") or 0
+    response_size = traffic.get("response_size") or traffic.get("body_bytes_sent") or 0
+    return int(request_size) + int(response_size)
+
+
+class UsageMeter:
+    """모니터 이벤트 스트림 기반 도메인별 실시간 사용량 미터링
+
+    워커 프로세스마다 전체 스트림을 소비하므로 조회용 누계는 각자 유지하고,
+    DB 반영은 점유를 가진 한 워커만 함 (나머지 워커는 담당 워커가 죽었을 때 이어서 반영할 만큼만 증분을 보관)
+    """
+
+    def __init__(self):
+        # (도메인, 날짜) -> [요청 수, 바이트] : DB 반영분 + 미반영분 누계
+        self._totals: Dict[UsageKey, List[int]] = {}
+        # 아직 DB에 반영되지 않은 증분
+        self._pending: Dict[UsageKey, List[int]] = {}
+        self._pending_since = datetime.utcnow()
+        # 담당 워커가 아닐 때 떼어낸 증분 (점유 시간 동안만 보관)
+        self._standby: List[UsageBatch] = []
+        self._task: Optional[asyncio.Task] = None
+        self._holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_writer = False
+
+    def record(self, log: LogRecord) -> None:
+        """로그 한 건을 사용량에 누적 (이벤트 스트림 처리 단계)"""
+        domain = log_domain(log)
+        if not domain:
+            return
+        key = (domain, date.today())
+        size = traffic_bytes(log)
+        for store in (self._totals, self._pending):
+            counters = store.get(key)
+            if counters is None:
+                store[key] = [1, size]
+            else:
+                counters[0] += 1
+                counters[1] += size
+
+    def get_usage(self, domain: str, start: datetime, end: datetime) -> Tuple[int, int]:
+        """기간 내 (요청 수, 바이트) 합계 - 원격 조회 없이 메모리에서 계산"""
+        start_date, end_date = start.date(), end.date()
+        requests = 0
+        total_bytes = 0
+        for (key_domain, usage_date), (count, size) in self._totals.items():
+            if key_domain == domain and start_date <= usage_date <= end_date:
+                requests += count
+                total_bytes += size
+        return requests, total_bytes
+
+    def get_period_snapshot(self, domain: str, created_at: datetime, billing_date: datetime) -> DomainUsageSnapshot:
+        """현재 결제 주기의 사용량과 결제일 기준 예상 포인트"""
+        now = datetime.now()
+        requests, total_bytes = self.get_usage(domain, created_at, min(now, billing_date))
+
+        # 경과 시간 비율로 결제일까지의 사용량 추정
+        elapsed = (now - created_at).total_seconds()
+        period = (billing_date - created_at).total_seconds()
+        if elapsed > 0 and period > elapsed:
+            projected_bytes = int(total_bytes * period / elapsed)
+        else:
+            projected_bytes = total_bytes
+
+        return DomainUsageSnapshot(
+            domain=domain,
+            period_start=created_at.isoformat(),
+            period_end=billing_date.isoformat(),
+            requests=requests,
+            bytes=total_bytes,
+            traffic_gb=round(total_bytes / BYTES_PER_GB, 4),
+            points=bytes_to_billing_points(total_bytes),
+            projected_points=bytes_to_billing_points(projected_bytes),
+        )
+
+    def _read_recent(self) -> List[Tuple[str, date, int, int]]:
+        """최근 보관 기간의 일 단위 사용량을 DB에서 조회"""
+        since = date.today() - timedelta(days=METERING_RETENTION_DAYS)
+        db = SessionLocal()
+        try:
+            rows = db.query(DomainUsageORM).filter(DomainUsageORM.usage_date >= since).all()
+            return [(r.domain, r.usage_date, r.request_count, r.total_bytes) for r in rows]
+        finally:
+            db.close()
+
+    async def load_recent(self) -> None:
+        """DB에 반영된 사용량으로 메모리 누계 초기화 (미반영 증분은 유지)"""
+        rows = await asyncio.to_thread(self._read_recent)
+        for domain, usage_date, count, size in rows:
+            key = (domain, usage_date)
+            pending = self._pending.get(key, [0, 0])
+            self._totals[key] = [count + pending[0], size + pending[1]]
+
+    def _acquire_lease(self, db, now: datetime, taken_at: datetime) -> Tuple[bool, Optional[datetime]]:
+        """DB 반영 담당 점유 획득/연장 (만료됐거나 자신이 가진 점유만 가져옴)
+
+        점유 만료 시각은 반영하는 증분을 떼어낸 시각 기준이므로 (만료 - 점유 시간)이 담당 워커가 반영한 구간의 끝
+        (획득 여부, 다른 워커가 반영한 구간의 끝) 반환 - 자신이 계속 담당 중이면 None
+        """
+        lease_ttl = timedelta(seconds=METERING_LEASE_TTL)
+        current = db.get(UsageWriterLeaseORM, METERING_LEASE_NAME)
+        if current is None:
+            try:
+                with db.begin_nested():
+                    db.add(UsageWriterLeaseORM(name=METERING_LEASE_NAME, holder=self._holder, expires_at=taken_at + lease_ttl))
+            except IntegrityError:
+                # 다른 워커가 먼저 점유 생성
+                return False, None
+            return True, None
+        previous_holder, covered_until = current.holder, current.expires_at - lease_ttl
+        updated = db.query(UsageWriterLeaseORM).filter(
+            UsageWriterLeaseORM.name == METERING_LEASE_NAME,
+            (UsageWriterLeaseORM.holder == self._holder) | (UsageWriterLeaseORM.expires_at < now)
+        ).update({
+            UsageWriterLeaseORM.holder: self._holder,
+            UsageWriterLeaseORM.expires_at: taken_at + lease_ttl,
+        }, synchronize_session=False)
+        if not updated:
+            return False, covered_until
+        if previous_holder == self._holder:
+            return True, None
+        return True, covered_until
+
+    def _write_pending(self, batches: List[UsageBatch], taken_at: datetime) -> Tuple[bool, Optional[datetime]]:
+        """점유를 가진 경우에만 미반영 증분을 DB에 누적 (행 단위 증가 UPDATE, 없으면 INSERT)
+
+        점유 연장과 증분 반영을 한 트랜잭션으로 커밋하므로 담당이 바뀌는 시점에도 중복 반영되지 않음
+        점유를 이어받으면 이전 담당 워커가 반영한 구간 이후에 누적을 시작한 보관 증분까지 반영
+        (획득 여부, 다른 워커가 반영한 구간의 끝) 반환
+        """
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            acquired, covered_until = self._acquire_lease(db, now, taken_at)
+            if not acquired:
+                db.rollback()
+                return False, covered_until
+            pending: Dict[UsageKey, List[int]] = {}
+            for started_at, batch in batches:
+                if covered_until is not None and started_at < covered_until:
+                    continue
+                for key, (count, size) in batch.items():
+                    counters = pending.setdefault(key, [0, 0])
+                    counters[0] += count
+                    counters[1] += size
+            for (domain, usage_date), (count, size) in pending.items():
+                updated = db.query(DomainUsageORM).filter(
+                    DomainUsageORM.domain == domain,
+                    DomainUsageORM.usage_date == usage_date
+                ).update({
+                    DomainUsageORM.request_count: DomainUsageORM.request_count + count,
+                    DomainUsageORM.total_bytes: DomainUsageORM.total_bytes + size,
+                    DomainUsageORM.updated_at: now,
+                }, synchronize_session=False)
+                if not updated:
+                    db.add(DomainUsageORM(
+                        domain=domain,
+                        usage_date=usage_date,
+                        request_count=count,
+                        total_bytes=size,
+                        updated_at=now,
+                    ))
+            db.commit()
+            return True, None
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _prune(self) -> None:
+        """보관 기간이 지난 일 단위 누계 제거"""
+        cutoff = date.today() - timedelta(days=METERING_RETENTION_DAYS)
+        for key in [k for k in self._totals if k[1] < cutoff]:
+            del self._totals[key]
+
+    async def flush(self) -> int:
+        """미반영 증분을 DB에 반영하고 반영한 키 수 반환 (담당 워커가 아니면 증분을 보관하고 0)"""
+        if not self._pending:
+            return 0
+        started_at, taken_at = self._pending_since, datetime.utcnow()
+        pending, self._pending, self._pending_since = self._pending, {}, taken_at
+        batches = self._standby + [(started_at, pending)]
+        try:
+            self.is_writer, covered_until = await asyncio.to_thread(self._write_pending, batches, taken_at)
+        except Exception as e:
+            print(f"사용량 DB 반영 실패: {e}")
+            # 실패한 증분은 다음 주기에 다시 반영
+            self._pending_since = started_at
+            for key, (count, size) in pending.items():
+                counters = self._pending.setdefault(key, [0, 0])
+                counters[0] += count
+                counters[1] += size
+            return 0
+        self._prune()
+        if self.is_writer:
+            self._standby = []
+            return len(pending)
+        # 담당 워커가 반영한 구간에 걸친 증분은 담당 워커도 받은 이벤트이므로 버림
+        cutoff = taken_at - timedelta(seconds=METERING_LEASE_TTL)
+        if covered_until is not None:
+            cutoff = max(cutoff, covered_until)
+        self._standby = [batch for batch in batches if batch[0] >= cutoff]
+        return 0
+
+    async def _flush_loop(self):
+        try:
+            await self.load_recent()
+        except Exception as e:
+            print(f"사용량 초기 로드 실패: {e}")
+        while True:
+            await asyncio.sleep(METERING_FLUSH_INTERVAL)
+            await self.flush()
+
+    def start(self) -> None:
+        """주기적 DB 반영 태스크 시작"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """반영 태스크 종료 후 남은 증분 반영"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# 전역 인스턴스
+usage_meter = UsageMeter()
@@ -0,0 +1,76 @@
+# services/user_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from schema.user import User
+
+# 인증된 사용자 정보 캐시 유지 시간(초)과 최대 사용자 수
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "10"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+
+class UserCache:
+    """세션 인증용 사용자 캐시 (user_id -> 컬럼 값, 짧은 TTL + 쓰기 시 명시적 무효화)
+
+    포인트 잔액 조회/차감은 항상 DB에서 다시 읽으므로, 여기 값은 인증과 프로필 표시에만 사용
+    """
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_size: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        # 동기 JWT 의존성(get_current_user)은 스레드풀에서 실행되므로 OrderedDict 변경을 잠금으로 보호
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[User]:
+        """캐시된 사용자 (요청마다 새 detached 객체 - 요청 간 ORM 객체를 공유하지 않음)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                if entry is not None:
+                    self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+        user = User(**entry[0])
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, user: User) -> None:
+        if self.ttl <= 0:
+            return
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        with self._lock:
+            self._entries[user.id] = (values, time.monotonic())
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """사용자 정보 변경 시 호출 (다른 워커의 캐시는 TTL 후 갱신)"""
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+# 전역 인스턴스
+user_cache = UserCache()
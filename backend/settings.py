@@ -0,0 +1,19 @@
+# settings.py
+import os
+from dotenv import load_dotenv
+
+# .env 파일 경로 (프로세스당 한 번만 로드)
+ENV_PATH = os.path.join(os.path.dirname(__file__), 'config', '.env')
+
+_loaded = False
+
+
+def load_settings() -> None:
+    """config/.env를 환경변수로 로드 (이미 로드했으면 무시, 기존 환경변수가 우선)"""
+    global _loaded
+    if not _loaded:
+        load_dotenv(ENV_PATH)
+        _loaded = True
+
+
+load_settings()